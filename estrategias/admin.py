@@ -1,6 +1,155 @@
-from django.contrib import admin
-from .models import Empresa, Estrategia # Importa tus modelos
+import datetime
 
-# Registra tus modelos para que aparezcan en el panel de administración
-admin.site.register(Empresa)
-admin.site.register(Estrategia)
+from django.contrib import admin, messages
+from django.db.models import F, Max, Min
+from django.utils import timezone
+
+from .models import Empresa, Estrategia, EstrategiaQuerySet, normalizar_nombre # Importa tus modelos
+from . import busqueda
+from .forms import SECTORES_VALIDOS
+from .pagination import ORDEN_KEYSET, PaginadorEstimado
+
+# Los dos listados deben seguir siendo rápidos con millones de filas:
+#   - PaginadorEstimado en lugar de COUNT(*) exacto, y sin el total sin filtrar
+#     (show_full_result_count) ni los recuentos por opción de los filtros (facetas),
+#   - orden, filtros y búsqueda sobre columnas con índice (migraciones 0002 y 0010, y el
+#     índice de texto completo de la 0004),
+#   - la empresa de cada estrategia en la misma consulta (list_select_related), y en el
+#     formulario un autocompletado en vez de un <select> con todas las empresas,
+#   - la jerarquía de fechas sin truncar la fecha de todas las filas (JerarquiaFechasQuerySet).
+
+
+class SectorFilter(admin.SimpleListFilter):
+    # Las opciones son los sectores que acepta EmpresaForm: un SELECT DISTINCT recorrería la tabla
+    title = 'sector'
+    parameter_name = 'sector'
+
+    def lookups(self, request, model_admin):
+        return [(sector, sector) for sector in SECTORES_VALIDOS]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(sector=self.value())
+        return queryset
+
+
+def _siguiente_periodo(inicio, nivel):
+    if nivel == 'year':
+        return inicio.replace(year=inicio.year + 1)
+    if nivel == 'month':
+        return inicio.replace(year=inicio.year + inicio.month // 12, month=inicio.month % 12 + 1)
+    return inicio + datetime.timedelta(days=1)
+
+
+class JerarquiaFechasQuerySet(EstrategiaQuerySet):
+    """
+    QuerySet del listado de estrategias del admin. La jerarquía de fechas pide los años,
+    meses o días con estrategias con datetimes(), un SELECT DISTINCT de la fecha truncada
+    que evalúa la función de truncado en cada fila (segundos con un millón de filas). Aquí
+    se leen el mínimo y el máximo de la fecha y se comprueba cada periodo intermedio con
+    un exists() por rango; las tres cosas se resuelven con los índices de fecha_generacion.
+    """
+
+    def aggregate(self, *args, **kwargs):
+        # La jerarquía pide MIN y MAX de la fecha en la misma consulta; SQLite solo lee el
+        # extremo del índice si la consulta tiene un único MIN o MAX, y si no recorre la tabla
+        if args or not kwargs or not all(
+            isinstance(agregado, (Min, Max)) and isinstance(agregado.source_expressions[0], F)
+            and agregado.filter is None for agregado in kwargs.values()
+        ):
+            return super().aggregate(*args, **kwargs)
+        resultado = {}
+        for alias, agregado in kwargs.items():
+            campo = agregado.source_expressions[0].name
+            orden = campo if isinstance(agregado, Min) else f'-{campo}'
+            resultado[alias] = (
+                self.filter(**{f'{campo}__isnull': False}).order_by(orden).values_list(campo, flat=True).first()
+            )
+        return resultado
+
+    def datetimes(self, field_name, kind, order='ASC', tzinfo=None):
+        if kind not in ('year', 'month', 'day'):
+            return super().datetimes(field_name, kind, order, tzinfo)
+        rango = self.aggregate(primero=Min(field_name), ultimo=Max(field_name))
+        if rango['primero'] is None:
+            return []
+        zona = tzinfo or timezone.get_current_timezone()
+        primero, ultimo = (
+            timezone.make_naive(valor, zona) if timezone.is_aware(valor) else valor
+            for valor in (rango['primero'], rango['ultimo'])
+        )
+        inicio = primero.replace(
+            month=1 if kind == 'year' else primero.month, day=1 if kind != 'day' else primero.day,
+            hour=0, minute=0, second=0, microsecond=0,
+        )
+        periodos = []
+        while inicio <= ultimo:
+            fin = _siguiente_periodo(inicio, kind)
+            limites = [timezone.make_aware(valor, zona) if timezone.is_aware(rango['primero']) else valor
+                       for valor in (inicio, fin)]
+            if self.filter(**{f'{field_name}__gte': limites[0], f'{field_name}__lt': limites[1]}).exists():
+                periodos.append(limites[0])
+            inicio = fin
+        return periodos if order == 'ASC' else periodos[::-1]
+
+
+class ListadoGrandeAdmin(admin.ModelAdmin):
+    paginator = PaginadorEstimado
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+
+@admin.register(Empresa)
+class EmpresaAdmin(ListadoGrandeAdmin):
+    list_display = ('nombre', 'sector', 'tamano', 'fecha_creacion')
+    list_filter = (SectorFilter, 'tamano')
+    ordering = ('-id',)
+    sortable_by = ()
+    search_fields = ('nombre_normalizado',)
+    search_help_text = 'Empresas cuyo nombre empieza por el texto buscado.'
+
+    def get_search_results(self, request, queryset, search_term):
+        # Prefijo del nombre normalizado como rango sobre su índice único: un LIKE 'texto%'
+        # sin distinguir mayúsculas (lo que haría '^nombre') no usa el índice
+        prefijo = normalizar_nombre(search_term)
+        if not prefijo:
+            return queryset, False
+        return queryset.filter(nombre_normalizado__gte=prefijo, nombre_normalizado__lt=prefijo + '\U0010ffff'), False
+
+
+@admin.register(Estrategia)
+class EstrategiaAdmin(ListadoGrandeAdmin):
+    # Estrategia.__str__ lee empresa.nombre: se muestran las columnas por separado
+    list_display = ('id', 'empresa', 'tipo_estrategia', 'fecha_generacion')
+    list_select_related = ('empresa',)
+    list_filter = ('tipo_estrategia',)
+    date_hierarchy = 'fecha_generacion'
+    ordering = ORDEN_KEYSET
+    sortable_by = ('fecha_generacion',)
+    autocomplete_fields = ('empresa',)
+    search_fields = ('empresa__nombre', 'descripcion_estrategia', 'impacto_estimado')
+    search_help_text = 'Búsqueda de texto completo en la empresa y la estrategia.'
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return JerarquiaFechasQuerySet(queryset.model, queryset.query, queryset.db)
+
+    def get_search_results(self, request, queryset, search_term):
+        # El índice de texto completo de busqueda.py, como el ?q= del listado público. Con un
+        # término muy común no se ordenan todas las coincidencias por fecha: solo las
+        # BUSQUEDA_CANDIDATOS más recientes, las mismas que puntúa la búsqueda por relevancia,
+        # y se avisa encima del listado
+        filtro = busqueda.filtro_ids(search_term, limite=busqueda.BUSQUEDA_CANDIDATOS)
+        if filtro is None:
+            return queryset, False
+        if busqueda.supera_candidatos(search_term):
+            self.message_user(request, (
+                f'La búsqueda tiene más de {busqueda.BUSQUEDA_CANDIDATOS} coincidencias: se muestran solo las '
+                f'{busqueda.BUSQUEDA_CANDIDATOS} más recientes. Añade términos para afinarla.'
+            ), messages.WARNING)
+        # Los ids que cumplen también los filtros se leen una vez, y el listado parte de ellos
+        # sin los filtros: el paginador y la jerarquía de fechas hacen varias consultas, y con
+        # la búsqueda y un rango de fechas juntos SQLite recorre el rango en lugar de buscar los ids
+        ids = list(queryset.filter(id__in=filtro).values_list('id', flat=True))
+        resultados = self.get_queryset(request).filter(id__in=ids).select_related(*self.list_select_related)
+        return resultados.order_by(*queryset.query.order_by), False
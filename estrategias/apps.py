@@ -1,6 +1,52 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class EstrategiasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'estrategias'
+
+    def ready(self):
+        # Cuenta y cronometra las consultas SQL de las peticiones medidas (ver metricas.py)
+        from django.db.backends.signals import connection_created
+        from .metricas import instalar_en_conexion
+        connection_created.connect(instalar_en_conexion, dispatch_uid='estrategias_metricas_db')
+        # PRAGMA de SQLite del perfil de base de datos (ver conexiones.py)
+        from .conexiones import configurar_sqlite
+        connection_created.connect(configurar_sqlite, dispatch_uid='estrategias_sqlite_pragmas')
+        # Invalidación de la caché de la página de detalle (ver cache_detalle.py)
+        from django.db.models.signals import post_delete, post_save
+        from . import cache_detalle
+        post_save.connect(cache_detalle.estrategia_cambiada, sender='estrategias.Estrategia',
+                          dispatch_uid='estrategias_cache_detalle_estrategia_guardada')
+        post_delete.connect(cache_detalle.estrategia_cambiada, sender='estrategias.Estrategia',
+                            dispatch_uid='estrategias_cache_detalle_estrategia_borrada')
+        post_save.connect(cache_detalle.empresa_cambiada, sender='estrategias.Empresa',
+                          dispatch_uid='estrategias_cache_detalle_empresa_guardada')
+        post_delete.connect(cache_detalle.empresa_cambiada, sender='estrategias.Empresa',
+                            dispatch_uid='estrategias_cache_detalle_empresa_borrada')
+        # Las empresas modificadas se vuelven a leer en el índice de similares (ver similares.py)
+        from . import similares
+        post_save.connect(similares.empresa_guardada, sender='estrategias.Empresa',
+                          dispatch_uid='estrategias_similares_empresa_guardada')
+        # Las estrategias borradas restan de las estadísticas diarias (ver estadisticas.py);
+        # las nuevas suman desde Estrategia.save() y EstrategiaQuerySet.bulk_create
+        from django.db.models.signals import pre_delete
+        from . import estadisticas
+        pre_delete.connect(estadisticas.empresa_por_borrar, sender='estrategias.Empresa',
+                           dispatch_uid='estrategias_estadisticas_empresa_por_borrar')
+        pre_delete.connect(estadisticas.estrategia_por_borrar, sender='estrategias.Estrategia',
+                           dispatch_uid='estrategias_estadisticas_estrategia_por_borrar')
+        post_delete.connect(estadisticas.estrategia_borrada, sender='estrategias.Estrategia',
+                            dispatch_uid='estrategias_estadisticas_estrategia_borrada')
+
+        # Por defecto el modelo de PLN se carga en la primera petición que lo necesita.
+        # En producción puede preferirse pagar ese coste al arrancar el proceso.
+        # Con ESTRATEGIAS_NLP_PREFORK además se calienta y se congela para compartirlo con
+        # los workers que el servidor cree después mediante fork.
+        if getattr(settings, 'ESTRATEGIAS_NLP_PREFORK', False):
+            from . import nlp
+            nlp.preparar_para_fork()
+        elif getattr(settings, 'ESTRATEGIAS_NLP_CARGA_ANTICIPADA', False):
+            from . import nlp
+            nlp.precargar()
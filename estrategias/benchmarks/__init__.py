@@ -0,0 +1,116 @@
+# estrategias/benchmarks
+# Benchmarks de rendimiento de la app, ejecutables sin conexión con:
+#     python manage.py benchmark <suite> [<suite> ...] [--salida r.json] [--base base.json]
+# Cada suite es un módulo con una función ejecutar(iteraciones, escribir, **opciones)
+# que devuelve un diccionario plano {métrica: valor}.
+#
+# Convención de nombres de métricas, usada al comparar con una base guardada:
+#   *_consultas     -> número de consultas SQL; cualquier aumento es una regresión
+#   *_por_segundo   -> rendimiento; más es mejor
+#   el resto        -> tiempos o memoria; menos es mejor
+import contextlib
+import importlib
+import os
+import statistics
+import tempfile
+
+SUITES = {
+    'admin': 'estrategias.benchmarks.admin',
+    'busqueda': 'estrategias.benchmarks.busqueda',
+    'clasificador': 'estrategias.benchmarks.clasificador',
+    'concurrencia': 'estrategias.benchmarks.concurrencia',
+    'memoria': 'estrategias.benchmarks.memoria',
+    'generacion': 'estrategias.benchmarks.generacion',
+    'indices': 'estrategias.benchmarks.indices',
+    'nlp': 'estrategias.benchmarks.nlp',
+    'reglas': 'estrategias.benchmarks.reglas',
+    'similares': 'estrategias.benchmarks.similares',
+    'validacion': 'estrategias.benchmarks.validacion',
+    'vistas': 'estrategias.benchmarks.vistas',
+}
+
+# Textos representativos de lo que llega al formulario de generación
+DESCRIPCIONES_MUESTRA = [
+    'Pequeña cafetería artesanal con enfoque en productos locales y servicio a domicilio.',
+    'Tienda de ropa juvenil con énfasis en tendencias rápidas. Buscando expandir online.',
+    'Consultoría especializada en optimización de procesos y software para pymes.',
+    'Desarrollo de software a medida para startups. Necesita visibilidad frente a la competencia.',
+    'Ofrece talleres de arte y música para niños. Busca más inscripciones.',
+    'Clínica de fisioterapia con 3 sucursales, buscando eficiencia operativa y crecimiento.',
+    'Empresa de limpieza y mantenimiento para oficinas y hogares. Compite por precio.',
+    'Panadería artesanal con productos de horno tradicionales. Tiene costos altos y retrasos.',
+]
+
+RECURSOS_MUESTRA = [
+    'Buen local, equipo pequeño, bajo presupuesto.',
+    'Inventario variado, poca presencia online.',
+    'Equipo experto, amplia cartera de clientes.',
+    'Experiencia tecnica, marketing limitado.',
+]
+
+
+def cargar_suite(nombre):
+    return importlib.import_module(SUITES[nombre])
+
+
+def resumir_tiempos(prefijo, segundos):
+    """Convierte una lista de duraciones en segundos a métricas en milisegundos."""
+    ordenados = sorted(segundos)
+    p95 = ordenados[min(len(ordenados) - 1, int(len(ordenados) * 0.95))]
+    return {
+        f'{prefijo}_media_ms': statistics.fmean(ordenados) * 1000,
+        f'{prefijo}_p95_ms': p95 * 1000,
+    }
+
+
+def comparar(resultados, base, tolerancia):
+    """
+    Compara {suite: {métrica: valor}} con una base del mismo formato y devuelve la lista
+    de regresiones como textos. Las métricas ausentes en la base se ignoran.
+    """
+    regresiones = []
+    for suite, metricas in resultados.items():
+        for metrica, valor in metricas.items():
+            referencia = base.get(suite, {}).get(metrica)
+            if referencia is None:
+                continue
+            if metrica.endswith('_consultas'):
+                peor = valor > referencia
+            elif metrica.endswith('_por_segundo'):
+                peor = valor < referencia * (1 - tolerancia)
+            else:
+                peor = valor > referencia * (1 + tolerancia)
+            if peor:
+                regresiones.append(f'{suite}.{metrica}: {valor:,.3f} (base {referencia:,.3f})')
+    return regresiones
+
+
+@contextlib.contextmanager
+def base_de_datos_temporal(en_archivo=False):
+    """
+    Crea una base de datos de prueba desechable (como hace `manage.py test`), para que
+    los benchmarks que escriben filas nunca toquen la base de datos real.
+
+    Con SQLite la base de pruebas vive en memoria; `en_archivo=True` la crea en un archivo
+    temporal, necesario para abrirla desde varios procesos y para que WAL tenga efecto.
+    """
+    from django.db import connection
+    from django.test.utils import setup_test_environment, teardown_test_environment
+
+    directorio = None
+    if en_archivo and connection.vendor == 'sqlite':
+        directorio = tempfile.TemporaryDirectory()
+        connection.settings_dict['TEST'] = {
+            **connection.settings_dict.get('TEST', {}), 'NAME': os.path.join(directorio.name, 'benchmark.sqlite3'),
+        }
+
+    setup_test_environment()
+    nombre_original = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+    try:
+        yield connection
+    finally:
+        connection.creation.destroy_test_db(nombre_original, verbosity=0)
+        teardown_test_environment()
+        if directorio is not None:
+            connection.settings_dict['TEST'].pop('NAME')
+            directorio.cleanup()
@@ -0,0 +1,68 @@
+# estrategias/benchmarks/admin.py
+# Listados del admin (admin.py) con datos sintéticos de seed_db, a través del cliente de
+# pruebas con un superusuario, para cada tamaño de tabla de --filas:
+#   - empresas: primera página, filtro por sector y tamaño, búsqueda por nombre y una
+#     página profunda,
+#   - estrategias: primera página, filtro por tipo, un mes de la jerarquía de fechas,
+#     búsqueda de texto completo y una página profunda,
+#   - el autocompletado de empresas del formulario de estrategia,
+# con su número de consultas (no depende del número de filas).
+from django.contrib.auth import get_user_model
+from django.db import reset_queries
+from django.test import Client
+from django.urls import reverse
+from django.utils import timezone
+
+from estrategias.models import Empresa
+from estrategias.sintetico import sembrar_lote
+
+from . import base_de_datos_temporal
+from .vistas import medir_get
+
+FILAS_DEFECTO = (100_000, 1_000_000)
+TAMANO_LOTE = 10_000
+SEMILLA = 0
+
+
+def urls_listados(iteraciones, nombres):
+    empresas = reverse('admin:estrategias_empresa_changelist')
+    estrategias = reverse('admin:estrategias_estrategia_changelist')
+    hoy = timezone.localdate()
+    return {
+        'empresas': [empresas] * iteraciones,
+        'empresas_filtro': [f'{empresas}?sector=salud&tamano__exact=micro'] * iteraciones,
+        'empresas_busqueda': [f'{empresas}?q={nombres[i % len(nombres)][:8]}' for i in range(iteraciones)],
+        'empresas_pagina_profunda': [f'{empresas}?p=50'] * iteraciones,
+        'estrategias': [estrategias] * iteraciones,
+        'estrategias_filtro': [f'{estrategias}?tipo_estrategia__exact=ventas'] * iteraciones,
+        'estrategias_mes': [
+            f'{estrategias}?fecha_generacion__year={hoy.year}&fecha_generacion__month={hoy.month}'
+        ] * iteraciones,
+        'estrategias_busqueda': [f'{estrategias}?q=clientes'] * iteraciones,
+        'estrategias_pagina_profunda': [f'{estrategias}?p=50'] * iteraciones,
+        'autocompletado': [
+            f"{reverse('admin:autocomplete')}?app_label=estrategias&model_name=estrategia&field_name=empresa"
+            f"&term={nombres[i % len(nombres)][:8]}"
+            for i in range(iteraciones)
+        ],
+    }
+
+
+def ejecutar(iteraciones=20, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    resultados = {}
+    with base_de_datos_temporal():
+        usuario = get_user_model().objects.create_superuser('benchmark', 'benchmark@example.com', 'benchmark')
+        cliente = Client()
+        cliente.force_login(usuario)
+        existentes = 0
+        for cantidad in sorted(filas):
+            escribir(f'  poblando hasta {cantidad:,} empresas y estrategias...')
+            for inicio in range(existentes, cantidad, TAMANO_LOTE):
+                sembrar_lote(SEMILLA, inicio, min(inicio + TAMANO_LOTE, cantidad))
+            existentes = max(existentes, cantidad)
+            nombres = list(Empresa.objects.order_by('?').values_list('nombre', flat=True)[:iteraciones])
+
+            reset_queries() # Con DEBUG, el registro de consultas de la siembra está lleno
+            for nombre, urls in urls_listados(iteraciones, nombres).items():
+                resultados.update(medir_get(cliente, f'{nombre}_{cantidad}', urls))
+    return resultados
@@ -0,0 +1,66 @@
+# estrategias/benchmarks/busqueda.py
+# Latencia de la búsqueda de texto completo (busqueda.buscar, primera y segunda página) y
+# del filtro ?q= del listado, con datos sintéticos de seed_db (textos variados) para cada
+# tamaño de tabla de --filas. Se buscan términos de frecuencia muy distinta:
+#   rara    el número de una empresa sintética concreta (unas pocas coincidencias)
+#   media   una actividad de un solo sector (~1/32 de las estrategias)
+#   comun   un sector entero (~1/8 de las estrategias)
+import time
+
+from estrategias import busqueda
+from estrategias.models import Estrategia
+from estrategias.pagination import ORDEN_KEYSET, PAGINA_TAMANO_DEFECTO
+from estrategias.sintetico import sembrar_lote
+
+from . import base_de_datos_temporal, resumir_tiempos
+
+FILAS_DEFECTO = (10_000, 100_000, 1_000_000)
+TAMANO_LOTE = 10_000
+SEMILLA = 0
+
+
+def terminos(cantidad):
+    return {
+        # Los nombres sintéticos terminan en "<semilla>-<índice>"
+        'rara': str(cantidad // 2),
+        'media': 'ciberseguridad',
+        'comun': 'restaurante',
+    }
+
+
+def medir(prefijo, funcion, iteraciones):
+    tiempos = []
+    for _ in range(iteraciones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir_tiempos(prefijo, tiempos)
+
+
+def ejecutar(iteraciones=200, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    resultados = {}
+    with base_de_datos_temporal():
+        existentes = 0
+        for cantidad in sorted(filas):
+            escribir(f'  poblando hasta {cantidad:,} estrategias...')
+            for inicio in range(existentes, cantidad, TAMANO_LOTE):
+                sembrar_lote(SEMILLA, inicio, min(inicio + TAMANO_LOTE, cantidad))
+            existentes = max(existentes, cantidad)
+
+            for frecuencia, texto in terminos(cantidad).items():
+                _, cursor = busqueda.buscar(texto)
+                resultados.update(medir(
+                    f'buscar_{frecuencia}_{cantidad}', lambda: busqueda.buscar(texto), iteraciones
+                ))
+                if cursor:
+                    resultados.update(medir(
+                        f'buscar_{frecuencia}_pagina2_{cantidad}', lambda: busqueda.buscar(texto, cursor), iteraciones
+                    ))
+                filtro = Estrategia.objects.filter(
+                    id__in=busqueda.filtro_ids(texto, limite=busqueda.BUSQUEDA_CANDIDATOS)
+                ).order_by(*ORDEN_KEYSET)
+                resultados.update(medir(
+                    f'lista_filtrada_{frecuencia}_{cantidad}',
+                    lambda: list(filtro.values('id')[:PAGINA_TAMANO_DEFECTO + 1]), iteraciones,
+                ))
+    return resultados
@@ -0,0 +1,95 @@
+# estrategias/benchmarks/clasificador.py
+# Clasificador de tipo_estrategia (clasificador.py) frente al camino de spaCy + reglas:
+#   - entrenamiento sobre un historial sintético de seed_db para cada tamaño de --filas
+#     (filas por segundo) y carga del archivo con mmap,
+#   - latencia por empresa: predicción del clasificador frente a generar_estrategia_ia,
+#   - rendimiento por lotes: predicción de un lote entero (una multiplicación de matrices)
+#     frente a generar_estrategias_ia_lote (nlp.pipe + reglas), y la generación completa
+#     por lotes con el clasificador activado.
+# Los sectores de las empresas medidas son genéricos (sin reglas propias), los únicos en
+# los que se consulta el clasificador.
+import os
+import tempfile
+import time
+
+from django.test import override_settings
+
+from estrategias import clasificador
+from estrategias import nlp as proveedor_nlp
+from estrategias.generacion import generar_estrategia_ia, generar_estrategias_ia_lote
+from estrategias.models import Estrategia
+from estrategias.sintetico import sembrar_lote
+
+from . import base_de_datos_temporal, resumir_tiempos
+from .generacion import empresas_muestra
+
+FILAS_DEFECTO = (10_000,)
+TAMANO_LOTE = 10_000
+TAMANO_LOTE_PREDICCION = 1000
+SEMILLA = 0
+SECTOR = 'salud'
+
+
+def medir_latencias(prefijo, funcion, empresas):
+    tiempos = []
+    for empresa_data in empresas:
+        inicio = time.perf_counter()
+        funcion(empresa_data)
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir_tiempos(prefijo, tiempos)
+
+
+def medir_lote(funcion, empresas):
+    inicio = time.perf_counter()
+    funcion(empresas)
+    return len(empresas) / (time.perf_counter() - inicio)
+
+
+def ejecutar(iteraciones=200, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    nlp_model = proveedor_nlp.obtener_nlp()
+    stopwords_set = proveedor_nlp.obtener_stopwords()
+    clases = [valor for valor, _ in Estrategia._meta.get_field('tipo_estrategia').choices]
+    empresas = empresas_muestra(SECTOR, iteraciones)
+    lote = empresas_muestra(SECTOR, TAMANO_LOTE_PREDICCION)
+    resultados = {}
+
+    # Camino de spaCy + reglas, sin clasificador
+    resultados.update(medir_latencias(
+        'spacy_empresa', lambda datos: generar_estrategia_ia(datos, nlp_model, stopwords_set), empresas
+    ))
+    resultados['spacy_lote_por_segundo'] = medir_lote(
+        lambda datos: generar_estrategias_ia_lote(datos, nlp_model, stopwords_set), lote
+    )
+
+    with base_de_datos_temporal(), tempfile.TemporaryDirectory() as directorio:
+        ruta = os.path.join(directorio, 'clasificador.joblib')
+        existentes = 0
+        for cantidad in sorted(filas):
+            escribir(f'  poblando hasta {cantidad:,} estrategias...')
+            for inicio in range(existentes, cantidad, TAMANO_LOTE):
+                sembrar_lote(SEMILLA, inicio, min(inicio + TAMANO_LOTE, cantidad))
+            existentes = max(existentes, cantidad)
+
+            inicio = time.perf_counter()
+            datos = clasificador.entrenar(lambda: clasificador.filas_historial(), clases, epocas=1)
+            resultados[f'entrenamiento_{cantidad}_por_segundo'] = datos['filas'] / (time.perf_counter() - inicio)
+            clasificador.guardar(datos, ruta)
+
+        inicio = time.perf_counter()
+        modelo = clasificador.cargar(ruta)
+        resultados['carga_ms'] = (time.perf_counter() - inicio) * 1000
+        resultados['archivo_mb'] = os.path.getsize(ruta) / 1e6
+
+        resultados.update(medir_latencias('clasificador_empresa', lambda datos: modelo.predecir([datos]), empresas))
+        resultados['clasificador_lote_por_segundo'] = medir_lote(modelo.predecir, lote)
+
+        # Generación completa con el clasificador decidiendo el tipo
+        with override_settings(ESTRATEGIAS_CLASIFICADOR_ARCHIVO=ruta):
+            clasificador.reiniciar()
+            try:
+                resultados['generacion_con_clasificador_lote_por_segundo'] = medir_lote(
+                    lambda datos: generar_estrategias_ia_lote(datos, nlp_model, stopwords_set), lote
+                )
+            finally:
+                clasificador.reiniciar()
+    return resultados
@@ -0,0 +1,90 @@
+# estrategias/benchmarks/concurrencia.py
+# Rendimiento de lectura y escritura con varios procesos a la vez sobre la misma base de
+# datos, con el perfil de ESTRATEGIAS_DB_PERFIL (ver settings.py). Para comparar perfiles
+# se ejecuta una vez por perfil; las métricas llevan el nombre del perfil delante:
+#     ESTRATEGIAS_DB_PERFIL=sqlite-basico python manage.py benchmark concurrencia --salida basico.json
+#     ESTRATEGIAS_DB_PERFIL=sqlite python manage.py benchmark concurrencia --salida wal.json
+#
+# Dos fases, cada proceso hace --iteraciones peticiones con el cliente de pruebas:
+#   solo_lectura  LECTORES procesos pidiendo el listado
+#   mixta         los mismos lectores y además ESCRITORES procesos generando estrategias
+# Sin WAL los escritores bloquean a los lectores y aparecen errores "database is locked".
+import logging
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+
+from estrategias import nlp as proveedor_nlp
+
+from . import DESCRIPCIONES_MUESTRA, RECURSOS_MUESTRA, base_de_datos_temporal, resumir_tiempos
+from .vistas import poblar_hasta
+
+LECTORES = 4
+ESCRITORES = 2
+FILAS_DEFECTO = (10_000,)
+
+
+def _trabajar(argumentos):
+    # Se ejecuta en un proceso hijo; devuelve (rol, duraciones, errores)
+    rol, indice, peticiones = argumentos
+    # Los 500 por "database is locked" se cuentan como errores; sin trazas por consola
+    logging.getLogger('django.request').setLevel(logging.CRITICAL)
+    cliente = Client(raise_request_exception=False)
+    url_lista = reverse('estrategias:listar_estrategias')
+    url_generar = reverse('estrategias:generar_estrategia')
+
+    tiempos, errores = [], 0
+    for n in range(peticiones):
+        inicio = time.perf_counter()
+        if rol == 'escritura':
+            respuesta = cliente.post(url_generar, {
+                'nombre': f'Empresa concurrente {indice}-{n}', 'sector': 'restaurante', 'tamano': 'micro',
+                'descripcion_negocio': DESCRIPCIONES_MUESTRA[n % len(DESCRIPCIONES_MUESTRA)],
+                'recursos_disponibles': RECURSOS_MUESTRA[n % len(RECURSOS_MUESTRA)],
+            }, content_type='application/json')
+        else:
+            respuesta = cliente.get(url_lista)
+        tiempos.append(time.perf_counter() - inicio)
+        errores += respuesta.status_code != 200
+    connections.close_all()
+    return rol, tiempos, errores
+
+
+def medir_fase(prefijo, roles, iteraciones):
+    tareas = [(rol, indice, iteraciones) for indice, rol in enumerate(roles)]
+    # Los hijos abren sus propias conexiones; no deben heredar las del padre
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(len(tareas)) as pool:
+        resultados = pool.map(_trabajar, tareas)
+
+    metricas, errores = {}, 0
+    for rol in sorted(set(roles)):
+        del_rol = [(tiempos, fallos) for otro_rol, tiempos, fallos in resultados if otro_rol == rol]
+        # Suma del ritmo de cada proceso mientras estuvo activo
+        metricas[f'{prefijo}_{rol}_por_segundo'] = sum(len(tiempos) / sum(tiempos) for tiempos, _ in del_rol)
+        metricas.update(resumir_tiempos(f'{prefijo}_{rol}', [t for tiempos, _ in del_rol for t in tiempos]))
+        errores += sum(fallos for _, fallos in del_rol)
+    metricas[f'{prefijo}_errores'] = errores
+    return metricas
+
+
+def ejecutar(iteraciones=200, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    perfil = getattr(settings, 'ESTRATEGIAS_DB_PERFIL', 'sqlite')
+    resultados = {}
+    # El modelo se carga antes del fork para que los escritores no lo carguen cada uno
+    proveedor_nlp.precargar()
+    with base_de_datos_temporal(en_archivo=True):
+        escribir(f'  perfil {perfil}: poblando hasta {max(filas):,} estrategias...')
+        poblar_hasta(max(filas))
+
+        escribir(f'  {LECTORES} lectores...')
+        resultados.update(medir_fase(f'{perfil}_solo', ['lectura'] * LECTORES, iteraciones))
+        escribir(f'  {LECTORES} lectores y {ESCRITORES} escritores...')
+        resultados.update(medir_fase(
+            f'{perfil}_mixta', ['lectura'] * LECTORES + ['escritura'] * ESCRITORES, iteraciones
+        ))
+    return resultados
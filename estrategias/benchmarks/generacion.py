@@ -0,0 +1,58 @@
+# estrategias/benchmarks/generacion.py
+# Rendimiento del camino caliente de generar_estrategia_ia (sin caché):
+#   - estrategias por segundo en cada rama de sector de las reglas,
+#   - cuánto del tiempo se va en spaCy y cuánto en el motor de reglas.
+import time
+
+from estrategias import nlp as proveedor_nlp
+from estrategias.generacion import generar_estrategia_ia
+from estrategias.reglas import obtener_motor
+
+from . import DESCRIPCIONES_MUESTRA, RECURSOS_MUESTRA, resumir_tiempos
+
+# Rama de reglas -> sector que la ejercita ('generico' cubre los sectores sin reglas propias)
+RAMAS = {
+    'restaurante': 'restaurante',
+    'tienda_de_ropa': 'tienda de ropa',
+    'consultoria': 'consultoria',
+    'generico': 'salud',
+}
+
+
+def empresas_muestra(sector, cantidad):
+    return [
+        {
+            'nombre': f'Empresa {i}', 'sector': sector, 'tamano': ('micro', 'pequena', 'mediana')[i % 3],
+            'descripcion_negocio': DESCRIPCIONES_MUESTRA[i % len(DESCRIPCIONES_MUESTRA)],
+            'recursos_disponibles': RECURSOS_MUESTRA[i % len(RECURSOS_MUESTRA)],
+        }
+        for i in range(cantidad)
+    ]
+
+
+def ejecutar(iteraciones=200, escribir=print, **opciones):
+    nlp_model = proveedor_nlp.obtener_nlp()
+    stopwords_set = proveedor_nlp.obtener_stopwords()
+    motor = obtener_motor(nlp_model)
+    resultados = {}
+
+    for rama, sector in RAMAS.items():
+        empresas = empresas_muestra(sector, iteraciones)
+        inicio = time.perf_counter()
+        for empresa_data in empresas:
+            generar_estrategia_ia(empresa_data, nlp_model, stopwords_set)
+        resultados[f'rama_{rama}_por_segundo'] = iteraciones / (time.perf_counter() - inicio)
+
+    # Desglose: mismo trabajo que generar_estrategia_ia, cronometrando cada fase por separado
+    tiempos_nlp, tiempos_reglas = [], []
+    for empresa_data in empresas_muestra('restaurante', iteraciones):
+        inicio = time.perf_counter()
+        docs = (nlp_model(empresa_data['descripcion_negocio'].lower()),
+                nlp_model(empresa_data['recursos_disponibles'].lower()))
+        medio = time.perf_counter()
+        motor.aplicar(empresa_data, docs)
+        tiempos_nlp.append(medio - inicio)
+        tiempos_reglas.append(time.perf_counter() - medio)
+    resultados.update(resumir_tiempos('fase_nlp', tiempos_nlp))
+    resultados.update(resumir_tiempos('fase_reglas', tiempos_reglas))
+    return resultados
@@ -0,0 +1,73 @@
+# estrategias/benchmarks/indices.py
+# Coste de las consultas que dependen de los índices de la migración 0002, medido con el
+# ORM directamente (sin vistas ni plantillas) para cada tamaño de tabla de --filas:
+#   - búsqueda de una empresa por nombre normalizado (lo que hace get_or_create),
+#   - primera página del listado (ORDER BY fecha_generacion DESC, id DESC),
+#   - últimas estrategias de una empresa.
+# Además de los tiempos se cuenta cuántas de esas consultas recorren la tabla entera según
+# el plan de la base de datos (*_recorridos_completos, debe ser 0) y cuánto crece cada
+# tiempo entre el tamaño menor y el mayor (*_crecimiento, ~1 si el coste es plano).
+import random
+import re
+import time
+
+from django.db import connection
+
+from estrategias.models import Empresa, Estrategia
+from estrategias.pagination import ORDEN_KEYSET, PAGINA_TAMANO_DEFECTO
+
+from . import base_de_datos_temporal, resumir_tiempos
+from .vistas import FILAS_DEFECTO, poblar_hasta
+
+
+def recorre_tabla_entera(queryset):
+    plan = queryset.explain()
+    if connection.vendor == 'sqlite':
+        # "SCAN tabla" sin índice, u ordenar todas las filas en un B-tree temporal;
+        # "SCAN tabla USING INDEX ..." con LIMIT solo lee las primeras entradas del índice
+        return bool(re.search(r'SCAN \S+$|USE TEMP B-TREE', plan, re.MULTILINE))
+    return 'Seq Scan' in plan
+
+
+def consultas_de_prueba(nombre_normalizado, empresa_id):
+    return {
+        'busqueda_empresa': Empresa.objects.filter(nombre_normalizado=nombre_normalizado),
+        'lista': Estrategia.objects.order_by(*ORDEN_KEYSET).values('id')[:PAGINA_TAMANO_DEFECTO + 1],
+        'lista_empresa': Estrategia.objects.filter(empresa_id=empresa_id).order_by(*ORDEN_KEYSET)
+                         .values('id')[:PAGINA_TAMANO_DEFECTO + 1],
+    }
+
+
+def ejecutar(iteraciones=200, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    resultados = {}
+    medias = {} # consulta -> [media en ms por tamaño, de menor a mayor]
+    azar = random.Random(0)
+    with base_de_datos_temporal():
+        for cantidad in sorted(filas):
+            escribir(f'  poblando hasta {cantidad:,} estrategias...')
+            poblar_hasta(cantidad)
+
+            # Empresas al azar, elegidas fuera de la medición
+            ids = list(Empresa.objects.values_list('id', flat=True))
+            muestra = list(Empresa.objects.filter(
+                id__in=[azar.choice(ids) for _ in range(iteraciones)]
+            ).values_list('nombre_normalizado', 'id'))
+            del ids
+
+            recorridos = 0
+            for nombre_consulta in consultas_de_prueba(*muestra[0]):
+                tiempos = []
+                for i in range(iteraciones):
+                    queryset = consultas_de_prueba(*muestra[i % len(muestra)])[nombre_consulta]
+                    inicio = time.perf_counter()
+                    list(queryset)
+                    tiempos.append(time.perf_counter() - inicio)
+                prefijo = f'{nombre_consulta}_{cantidad}'
+                resultados.update(resumir_tiempos(prefijo, tiempos))
+                medias.setdefault(nombre_consulta, []).append(resultados[f'{prefijo}_media_ms'])
+                recorridos += recorre_tabla_entera(consultas_de_prueba(*muestra[0])[nombre_consulta])
+            resultados[f'indices_{cantidad}_recorridos_completos'] = recorridos
+
+    for nombre_consulta, valores in medias.items():
+        resultados[f'{nombre_consulta}_crecimiento'] = valores[-1] / valores[0]
+    return resultados
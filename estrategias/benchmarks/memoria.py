@@ -0,0 +1,79 @@
+# estrategias/benchmarks/memoria.py
+# Memoria por worker con 1, 4 y 16 procesos hijos creados con fork:
+#   - 'independiente': cada hijo carga su propia copia del modelo (comportamiento por defecto)
+#   - 'compartido': el padre carga, calienta y congela el modelo antes del fork
+#     (ESTRATEGIAS_NLP_PREFORK), y los hijos lo heredan por copy-on-write.
+# Se informa RSS, USS (memoria exclusiva del hijo) y PSS (RSS repartiendo las páginas
+# compartidas); USS y PSS son las métricas que de verdad cambian entre ambos modos.
+import gc
+import multiprocessing
+
+from estrategias import nlp as proveedor_nlp
+from estrategias.generacion import generar_estrategia_ia
+from estrategias.reglas import obtener_motor
+
+from . import DESCRIPCIONES_MUESTRA, RECURSOS_MUESTRA
+
+CANTIDADES_WORKERS = (1, 4, 16)
+MODOS = ('independiente', 'compartido')
+
+
+def _trabajar(nlp_model, listos, continuar, iteraciones):
+    # Cuerpo de cada hijo: genera estrategias como lo haría un worker web y espera a ser medido
+    if nlp_model is None:
+        nlp_model = proveedor_nlp.cargar_nlp()
+    stopwords_set = proveedor_nlp.cargar_stopwords()
+    for i in range(iteraciones):
+        generar_estrategia_ia({
+            'nombre': 'Benchmark', 'sector': 'restaurante', 'tamano': 'micro',
+            'descripcion_negocio': DESCRIPCIONES_MUESTRA[i % len(DESCRIPCIONES_MUESTRA)],
+            'recursos_disponibles': RECURSOS_MUESTRA[i % len(RECURSOS_MUESTRA)],
+        }, nlp_model, stopwords_set)
+    listos.put(True)
+    continuar.wait()
+
+
+def medir(modo, workers, iteraciones):
+    import psutil
+
+    contexto = multiprocessing.get_context('fork')
+    nlp_model = None
+    if modo == 'compartido':
+        nlp_model = proveedor_nlp.cargar_nlp()
+        obtener_motor(nlp_model)
+        for _ in nlp_model.pipe(proveedor_nlp.TEXTOS_CALENTAMIENTO):
+            pass
+        gc.collect()
+        gc.freeze()
+
+    listos, continuar = contexto.Queue(), contexto.Event()
+    hijos = [
+        contexto.Process(target=_trabajar, args=(nlp_model, listos, continuar, iteraciones))
+        for _ in range(workers)
+    ]
+    try:
+        for hijo in hijos:
+            hijo.start()
+        for _ in hijos:
+            listos.get(timeout=300)
+        memorias = [psutil.Process(hijo.pid).memory_full_info() for hijo in hijos]
+    finally:
+        continuar.set()
+        for hijo in hijos:
+            hijo.join()
+        gc.unfreeze()
+
+    return {
+        f'{modo}_{workers}w_rss_mb': sum(m.rss for m in memorias) / workers / 2**20,
+        f'{modo}_{workers}w_uss_mb': sum(m.uss for m in memorias) / workers / 2**20,
+        f'{modo}_{workers}w_pss_total_mb': sum(getattr(m, 'pss', m.rss) for m in memorias) / 2**20,
+    }
+
+
+def ejecutar(iteraciones=200, escribir=print, **opciones):
+    resultados = {}
+    for modo in MODOS:
+        for workers in CANTIDADES_WORKERS:
+            escribir(f'  {modo}: {workers} worker(s)...')
+            resultados.update(medir(modo, workers, iteraciones))
+    return resultados
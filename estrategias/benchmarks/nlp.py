@@ -0,0 +1,60 @@
+# estrategias/benchmarks/nlp.py
+# Compara los modos de carga de estrategias/nlp.py: tiempo de arranque en frío,
+# memoria residual (RSS) del proceso y latencia por documento.
+import json
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+
+from estrategias import nlp as proveedor_nlp
+
+from . import DESCRIPCIONES_MUESTRA, resumir_tiempos
+
+# El arranque en frío se mide en un proceso nuevo para que no influyan cachés ni
+# módulos ya importados por este proceso
+_SCRIPT_ARRANQUE = """
+import json, resource, sys, time
+inicio = time.perf_counter()
+from estrategias.nlp import cargar_nlp
+nlp = cargar_nlp(sys.argv[1], sys.argv[2])
+nlp('calentamiento')
+print(json.dumps({
+    'segundos': time.perf_counter() - inicio,
+    'rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    'componentes': nlp.pipe_names,
+}))
+"""
+
+
+def medir_arranque(modo, modelo):
+    salida = subprocess.run(
+        [sys.executable, '-c', _SCRIPT_ARRANQUE, modo, modelo],
+        cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def medir_latencia(nlp_model, iteraciones):
+    tiempos = []
+    for i in range(iteraciones):
+        texto = DESCRIPCIONES_MUESTRA[i % len(DESCRIPCIONES_MUESTRA)].lower()
+        inicio = time.perf_counter()
+        nlp_model(texto)
+        tiempos.append(time.perf_counter() - inicio)
+    return tiempos
+
+
+def ejecutar(iteraciones=200, escribir=print, **opciones):
+    modelo = getattr(settings, 'ESTRATEGIAS_NLP_MODELO', proveedor_nlp.MODELO_DEFECTO)
+    resultados = {}
+    for modo in proveedor_nlp.MODOS:
+        arranque = medir_arranque(modo, modelo)
+        escribir(f"  {modo}: componentes={arranque['componentes'] or ['(solo tokenizador)']}")
+        resultados[f'{modo}_arranque_s'] = arranque['segundos']
+        resultados[f'{modo}_rss_mb'] = arranque['rss_mb']
+        resultados.update(resumir_tiempos(
+            f'{modo}_documento', medir_latencia(proveedor_nlp.cargar_nlp(modo, modelo), iteraciones)
+        ))
+    return resultados
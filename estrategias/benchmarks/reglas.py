@@ -0,0 +1,77 @@
+# estrategias/benchmarks/reglas.py
+# Coste por llamada del motor de reglas a medida que crece el número de reglas,
+# comparado con el recorrido lineal del antiguo if/elif. Solo mide las reglas:
+# los documentos se analizan con spaCy una vez, antes de cronometrar.
+import random
+import time
+
+from estrategias import nlp as proveedor_nlp
+from estrategias.reglas import MotorReglas, obtener_tabla
+
+from . import DESCRIPCIONES_MUESTRA, RECURSOS_MUESTRA, resumir_tiempos
+
+CANTIDADES_REGLAS = (10, 100, 1000, 5000)
+SECTOR_SINTETICO = 'sintetico'
+
+
+def tabla_sintetica(cantidad, semilla=0):
+    # Reglas inventadas con 3 frases cada una (una de ellas de dos palabras) en un sector propio
+    azar = random.Random(semilla)
+    tabla = dict(obtener_tabla())
+    reglas = [
+        {
+            'frases': [f'clave{i}a', f'clave{i}b', f'frase {i}'],
+            'tipo': azar.choice(tabla['generico']['tipos']),
+            'estrategia': f'Regla sintética {i} para tu {{tamano}} empresa.',
+            'impacto': f'Impacto {i}.',
+        }
+        for i in range(cantidad)
+    ]
+    tabla['sectores'] = {**tabla['sectores'], SECTOR_SINTETICO: {'reglas': reglas, 'defecto': reglas[0]}}
+    return tabla
+
+
+def aplicar_lineal(reglas, defecto, palabras_clave):
+    # Equivalente al antiguo if/elif: cada regla se comprueba con búsquedas en una lista
+    for regla in reglas:
+        if any(frase in palabras_clave for frase in regla['frases']):
+            return regla
+    return defecto
+
+
+def ejecutar(iteraciones=200, escribir=print, **opciones):
+    nlp_model = proveedor_nlp.cargar_nlp()
+    stopwords_set = proveedor_nlp.cargar_stopwords()
+    resultados = {}
+    for cantidad in CANTIDADES_REGLAS:
+        tabla = tabla_sintetica(cantidad)
+        inicio = time.perf_counter()
+        motor = MotorReglas(tabla, nlp_model)
+        resultados[f'reglas_{cantidad}_compilacion_ms'] = (time.perf_counter() - inicio) * 1000
+
+        # La última regla es el peor caso para el recorrido lineal
+        casos = []
+        for i in range(iteraciones):
+            descripcion = f'{DESCRIPCIONES_MUESTRA[i % len(DESCRIPCIONES_MUESTRA)]} clave{cantidad - 1}b'
+            recursos = RECURSOS_MUESTRA[i % len(RECURSOS_MUESTRA)]
+            casos.append((
+                {'sector': SECTOR_SINTETICO, 'tamano': 'micro',
+                 'descripcion_negocio': descripcion, 'recursos_disponibles': recursos},
+                (nlp_model(descripcion.lower()), nlp_model(recursos.lower())),
+            ))
+
+        tiempos_motor, tiempos_lineal = [], []
+        reglas = tabla['sectores'][SECTOR_SINTETICO]['reglas']
+        for empresa_data, docs in casos:
+            inicio = time.perf_counter()
+            motor.aplicar(empresa_data, docs)
+            tiempos_motor.append(time.perf_counter() - inicio)
+
+            inicio = time.perf_counter()
+            palabras_clave = [t.text for t in docs[0] if t.is_alpha and t.text not in stopwords_set]
+            aplicar_lineal(reglas, reglas[0], palabras_clave)
+            tiempos_lineal.append(time.perf_counter() - inicio)
+
+        resultados.update(resumir_tiempos(f'reglas_{cantidad}_motor', tiempos_motor))
+        resultados.update(resumir_tiempos(f'reglas_{cantidad}_lineal', tiempos_lineal))
+    return resultados
@@ -0,0 +1,86 @@
+# estrategias/benchmarks/similares.py
+# Índice de empresas parecidas (similares.py) con datos sintéticos de seed_db, para cada
+# tamaño de tabla de --filas:
+#   - construcción del índice base (filas por segundo) y tamaño de sus archivos,
+#   - búsqueda en el índice (mapeado en memoria) con descripciones que no están en la tabla,
+#   - la consulta completa del endpoint (búsqueda + empresas y su última estrategia),
+#   - lectura de CAMBIOS empresas creadas después de construir la base y búsqueda con ellas
+#     en memoria.
+import os
+import tempfile
+import time
+
+from django.db import connection, reset_queries
+from django.test.utils import CaptureQueriesContext
+
+from estrategias import similares
+from estrategias.sintetico import empresa_sintetica, sembrar_lote
+
+from . import base_de_datos_temporal, resumir_tiempos
+
+FILAS_DEFECTO = (100_000, 1_000_000)
+TAMANO_LOTE = 10_000
+CAMBIOS = 1000
+SEMILLA = 0
+SEMILLA_CONSULTAS = 1
+K = 5
+
+
+def medir(prefijo, funcion, consultas):
+    tiempos = []
+    for consulta in consultas:
+        inicio = time.perf_counter()
+        funcion(consulta)
+        tiempos.append(time.perf_counter() - inicio)
+    return resumir_tiempos(prefijo, tiempos)
+
+
+def tamano_mb(directorio):
+    return sum(
+        os.path.getsize(os.path.join(raiz, nombre)) for raiz, _, nombres in os.walk(directorio) for nombre in nombres
+    ) / 1e6
+
+
+def ejecutar(iteraciones=200, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    consultas = []
+    for indice in range(iteraciones):
+        datos = empresa_sintetica(SEMILLA_CONSULTAS, indice)
+        consultas.append({'descripcion': datos['descripcion_negocio'], 'sector': datos['sector'], 'k': K})
+    textos = [similares.texto_empresa(consulta['sector'], consulta['descripcion']) for consulta in consultas]
+    resultados = {}
+    with base_de_datos_temporal(), tempfile.TemporaryDirectory() as directorio:
+        existentes = 0
+        for cantidad in sorted(filas):
+            escribir(f'  poblando hasta {cantidad:,} empresas...')
+            for inicio in range(existentes, cantidad, TAMANO_LOTE):
+                sembrar_lote(SEMILLA, inicio, min(inicio + TAMANO_LOTE, cantidad))
+            existentes = max(existentes, cantidad)
+
+            inicio = time.perf_counter()
+            metadatos = similares.construir(directorio)
+            resultados[f'construccion_{cantidad}_por_segundo'] = metadatos['filas'] / (time.perf_counter() - inicio)
+            resultados[f'indice_{cantidad}_mb'] = tamano_mb(directorio)
+
+            indice = similares.Indice(directorio, refresco=3600)
+            indice.refrescar(forzar=True)
+            similares._indice = indice
+            try:
+                resultados.update(medir(f'busqueda_{cantidad}', lambda texto: indice.buscar(texto, K), textos))
+                reset_queries() # Con DEBUG, el registro de consultas de la siembra está lleno
+                with CaptureQueriesContext(connection) as capturadas:
+                    similares.similares(consultas[0])
+                resultados[f'similares_{cantidad}_consultas'] = len(capturadas)
+                resultados.update(medir(f'similares_{cantidad}', similares.similares, consultas))
+
+                # Empresas creadas después de construir la base: se leen en el siguiente refresco
+                sembrar_lote(SEMILLA, existentes, existentes + CAMBIOS)
+                existentes += CAMBIOS
+                inicio = time.perf_counter()
+                indice.refrescar(forzar=True)
+                resultados[f'refresco_{CAMBIOS}_cambios_{cantidad}_ms'] = (time.perf_counter() - inicio) * 1000
+                resultados.update(medir(
+                    f'busqueda_con_cambios_{cantidad}', lambda texto: indice.buscar(texto, K), textos
+                ))
+            finally:
+                similares.reiniciar()
+    return resultados
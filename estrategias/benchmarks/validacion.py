@@ -0,0 +1,66 @@
+# estrategias/benchmarks/validacion.py
+# Coste por petición de leer y validar los datos de GenerarEstrategiaView.post, sin el PLN
+# ni la base de datos (peticiones de RequestFactory, distintas en cada iteración):
+#   - camino anterior: json.loads del cuerpo (y request.POST si falla) y EmpresaForm,
+#   - camino JSON por Content-Type (validacion.py) con datos válidos e inválidos,
+#   - formulario HTML por Content-Type (request.POST directamente y EmpresaForm).
+import time
+
+from django.test import RequestFactory
+
+from estrategias.forms import EmpresaForm
+from estrategias.views import _leer_datos, _validar_empresa
+
+from . import DESCRIPCIONES_MUESTRA, RECURSOS_MUESTRA, resumir_tiempos
+
+URL = '/estrategias/generar/'
+
+
+def datos_muestra(indice, **cambios):
+    return {
+        'nombre': f'Empresa validación {indice}', 'sector': 'Restaurante', 'tamano': 'micro',
+        'descripcion_negocio': DESCRIPCIONES_MUESTRA[indice % len(DESCRIPCIONES_MUESTRA)],
+        'recursos_disponibles': RECURSOS_MUESTRA[indice % len(RECURSOS_MUESTRA)],
+        **cambios,
+    }
+
+
+def camino_anterior(request):
+    form = EmpresaForm(_leer_datos(request))
+    form.is_valid()
+    return form
+
+
+def medir(prefijo, funcion, peticiones):
+    tiempos = []
+    for peticion in peticiones:
+        inicio = time.perf_counter()
+        funcion(peticion)
+        tiempos.append(time.perf_counter() - inicio)
+    return {**resumir_tiempos(prefijo, tiempos), f'{prefijo}_por_segundo': len(tiempos) / sum(tiempos)}
+
+
+def ejecutar(iteraciones=200, escribir=print, **opciones):
+    fabrica = RequestFactory()
+    iteraciones = max(iteraciones, 1000) # Cada medida son microsegundos
+
+    def json_validos():
+        return [fabrica.post(URL, datos_muestra(i), content_type='application/json') for i in range(iteraciones)]
+
+    def json_invalidos():
+        return [
+            fabrica.post(URL, datos_muestra(i, sector='otro'), content_type='application/json')
+            for i in range(iteraciones)
+        ]
+
+    def formularios():
+        return [fabrica.post(URL, datos_muestra(i)) for i in range(iteraciones)]
+
+    resultados = {}
+    resultados.update(medir('anterior_json', camino_anterior, json_validos()))
+    resultados.update(medir('json', _validar_empresa, json_validos()))
+    resultados.update(medir('anterior_json_invalido', camino_anterior, json_invalidos()))
+    resultados.update(medir('json_invalido', _validar_empresa, json_invalidos()))
+    resultados.update(medir('anterior_formulario', camino_anterior, formularios()))
+    resultados.update(medir('formulario', _validar_empresa, formularios()))
+    return resultados
@@ -0,0 +1,126 @@
+# estrategias/benchmarks/vistas.py
+# Latencia de extremo a extremo de las vistas, a través del cliente de pruebas de Django,
+# sobre una base de datos temporal:
+#   - GenerarEstrategiaView.post con textos distintos en cada petición (sin aciertos de caché),
+#     síncrona y encolada (202, "Prefer: respond-async"), y el ritmo de un trabajador de la
+#     cola (cola.py) generando esos trabajos por lotes,
+#   - ListarEstrategiasView (primera página, una página profunda y la primera página
+#     revalidada con If-None-Match, que responde 304), DetalleEstrategiaView y
+#     EstadisticasAPIView (los últimos 30 días, por sector y tipo), con su número de
+#     consultas, para cada tamaño de tabla de --filas.
+import random
+import time
+
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from estrategias import cola
+from estrategias.models import Empresa, Estrategia
+from estrategias.pagination import codificar_cursor
+
+from . import DESCRIPCIONES_MUESTRA, RECURSOS_MUESTRA, base_de_datos_temporal, resumir_tiempos
+
+FILAS_DEFECTO = (1_000, 100_000, 1_000_000)
+TAMANO_LOTE = 10_000
+ESTRATEGIAS_POR_EMPRESA = 10
+
+
+def poblar_hasta(filas):
+    """Añade estrategias (y sus empresas) hasta que la tabla tenga `filas` filas."""
+    existentes = Estrategia.objects.count()
+    while existentes < filas:
+        cantidad = min(TAMANO_LOTE, filas - existentes)
+        empresas = Empresa.objects.bulk_create([
+            Empresa(nombre=f'Empresa benchmark {existentes + i}', sector='restaurante', tamano='micro',
+                    descripcion_negocio=DESCRIPCIONES_MUESTRA[i % len(DESCRIPCIONES_MUESTRA)],
+                    recursos_disponibles=RECURSOS_MUESTRA[i % len(RECURSOS_MUESTRA)])
+            for i in range(0, cantidad, ESTRATEGIAS_POR_EMPRESA)
+        ])
+        Estrategia.objects.bulk_create([
+            Estrategia(empresa=empresas[i // ESTRATEGIAS_POR_EMPRESA], tipo_estrategia='marketing',
+                       descripcion_estrategia='Estrategia de benchmark.', impacto_estimado='Impacto de benchmark.')
+            for i in range(cantidad)
+        ])
+        existentes += cantidad
+
+
+def medir_get(cliente, prefijo, urls, estado=200, **cabeceras):
+    # Devuelve las métricas de tiempo y el máximo de consultas entre todas las peticiones
+    tiempos, consultas = [], 0
+    for url in urls:
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = cliente.get(url, **cabeceras)
+            tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code == estado, (url, respuesta.status_code)
+        consultas = max(consultas, len(capturadas))
+    return {**resumir_tiempos(prefijo, tiempos), f'{prefijo}_consultas': consultas}
+
+
+def medir_generar(cliente, iteraciones, prefijo='generar', estado=200, **cabeceras):
+    url = reverse('estrategias:generar_estrategia')
+    tiempos, consultas = [], 0
+    for i in range(iteraciones):
+        datos = {
+            'nombre': f'Empresa {prefijo} {i}', 'sector': 'restaurante', 'tamano': 'micro',
+            'descripcion_negocio': f'{DESCRIPCIONES_MUESTRA[i % len(DESCRIPCIONES_MUESTRA)]} Sucursal {i}.',
+            'recursos_disponibles': RECURSOS_MUESTRA[i % len(RECURSOS_MUESTRA)],
+        }
+        with CaptureQueriesContext(connection) as capturadas:
+            inicio = time.perf_counter()
+            respuesta = cliente.post(url, datos, content_type='application/json', **cabeceras)
+            tiempos.append(time.perf_counter() - inicio)
+        assert respuesta.status_code == estado, respuesta.content
+        consultas = max(consultas, len(capturadas))
+    return {**resumir_tiempos(prefijo, tiempos), f'{prefijo}_consultas': consultas}
+
+
+def medir_cola(cliente, iteraciones):
+    # La misma generación encolada (202) y, después, el ritmo de un trabajador vaciando la cola
+    resultados = medir_generar(cliente, iteraciones, 'generar_cola', estado=202, HTTP_PREFER='respond-async')
+    inicio = time.perf_counter()
+    completados = cola.trabajar(hasta_vaciar=True)
+    resultados['cola_trabajos_por_segundo'] = completados / (time.perf_counter() - inicio)
+    return resultados
+
+
+def ejecutar(iteraciones=200, escribir=print, filas=FILAS_DEFECTO, **opciones):
+    resultados = {}
+    azar = random.Random(0)
+    with base_de_datos_temporal():
+        cliente = Client()
+        resultados.update(medir_generar(cliente, iteraciones))
+        resultados.update(medir_cola(cliente, iteraciones))
+
+        url_lista = reverse('estrategias:listar_estrategias')
+        for cantidad in sorted(filas):
+            escribir(f'  poblando hasta {cantidad:,} estrategias...')
+            poblar_hasta(cantidad)
+
+            # Cursor que apunta a la última página: con OFFSET sería la más cara
+            antepenultima = Estrategia.objects.order_by('fecha_generacion', 'id').values_list(
+                'fecha_generacion', 'id')[20]
+            cursor_profundo = codificar_cursor(*antepenultima)
+            # En la base temporal los ids son consecutivos, así que basta con el rango
+            rango = Estrategia.objects.aggregate(minimo=Min('id'), maximo=Max('id'))
+            ids_detalle = [azar.randint(rango['minimo'], rango['maximo']) for _ in range(iteraciones)]
+
+            resultados.update(medir_get(cliente, f'lista_{cantidad}', [url_lista] * iteraciones))
+            resultados.update(medir_get(
+                cliente, f'lista_304_{cantidad}', [url_lista] * iteraciones,
+                estado=304, HTTP_IF_NONE_MATCH=cliente.get(url_lista)['ETag'],
+            ))
+            resultados.update(medir_get(
+                cliente, f'lista_profunda_{cantidad}', [f'{url_lista}?cursor={cursor_profundo}'] * iteraciones
+            ))
+            resultados.update(medir_get(cliente, f'detalle_{cantidad}', [
+                reverse('estrategias:detalle_estrategia', args=[estrategia_id]) for estrategia_id in ids_detalle
+            ]))
+            resultados.update(medir_get(
+                cliente, f'estadisticas_{cantidad}',
+                [reverse('estrategias:api_estadisticas') + '?agrupar=dia,sector,tipo'] * iteraciones,
+            ))
+    return resultados
@@ -0,0 +1,165 @@
+# estrategias/busqueda.py
+# Búsqueda de texto completo sobre las estrategias generadas.
+#
+# Usa el índice invertido que crea la migración 0004 (FTS5 en SQLite, tsvector + GIN en
+# PostgreSQL) y que mantienen al día los triggers de la base de datos. Nunca recorre las
+# columnas de texto con LIKE: solo se leen las filas que contienen los términos buscados.
+#
+# Los resultados se ordenan por relevancia (bm25 en SQLite, ts_rank_cd en PostgreSQL) y se
+# paginan por cursor sobre (puntuación, id), igual que el listado lo hace sobre (fecha, id).
+# En los dos motores la puntuación es "menor es mejor".
+#
+# El filtro ?q= del listado y la búsqueda del admin (filtro_ids) conservan el orden por fecha
+# y se limitan a los mismos BUSQUEDA_CANDIDATOS candidatos. Cuando un término tiene más
+# coincidencias (supera_candidatos), las tres lo indican: la API con resultados_limitados y
+# el listado y el admin con un aviso.
+import re
+
+from django.conf import settings
+from django.db import NotSupportedError, connection
+from django.db.models.expressions import RawSQL
+
+from .models import Estrategia
+from .pagination import (
+    PAGINA_TAMANO_DEFECTO, codificar_cursor_puntuacion, decodificar_cursor_puntuacion,
+)
+
+TABLA = 'estrategias_busqueda'
+
+# Calcular la relevancia de todas las coincidencias de un término muy común (p. ej. un
+# sector, presente en una de cada ocho estrategias) crece con la tabla: ordenar por bm25 las
+# 270.000 coincidencias de un término en 300.000 filas tarda ~0,45 s en SQLite. Se puntúan
+# solo las BUSQUEDA_CANDIDATOS coincidencias más recientes, lo que el índice resuelve sin
+# ordenar, y así el coste queda acotado; los términos poco frecuentes se puntúan todos.
+BUSQUEDA_CANDIDATOS = getattr(settings, 'ESTRATEGIAS_BUSQUEDA_CANDIDATOS', 2000)
+
+# Pesos de las columnas de la tabla FTS5 para bm25, en el orden de la migración:
+# nombre_empresa, sector, tipo_estrategia, descripcion_estrategia, impacto_estimado, descripcion_negocio
+PESOS_SQLITE = (5.0, 2.0, 2.0, 1.0, 0.5, 0.5)
+
+# Términos de la consulta: letras y dígitos (incluidas las acentuadas); el resto se ignora
+_TERMINO = re.compile(r'\w+', re.UNICODE)
+
+# Consulta en dos pasos: primero solo el índice (candidatos, puntuación y página), y al final
+# el JOIN con estrategia y empresa para las filas de la página, no para todas las coincidencias
+_SQL = """
+    SELECT e.id, e.tipo_estrategia, e.fecha_generacion, emp.nombre AS nombre_empresa, pagina.puntuacion
+    FROM (
+        SELECT id, puntuacion FROM ({candidatos}) candidatos
+        {{despues_de}}
+        ORDER BY puntuacion, id DESC
+        LIMIT %s
+    ) pagina
+    JOIN estrategias_estrategia e ON e.id = pagina.id
+    JOIN estrategias_empresa emp ON emp.id = e.empresa_id
+    ORDER BY pagina.puntuacion, pagina.id DESC
+"""
+
+_SQL_SQLITE = _SQL.format(candidatos=f"""
+    SELECT rowid AS id, bm25({TABLA}, {', '.join(map(str, PESOS_SQLITE))}) AS puntuacion
+    FROM {TABLA} WHERE {TABLA} MATCH %s
+    ORDER BY rowid DESC LIMIT %s
+""")
+
+_SQL_POSTGRESQL = _SQL.format(candidatos=f"""
+    SELECT b.estrategia_id AS id, -ts_rank_cd(b.documento, consulta)::float8 AS puntuacion
+    FROM {TABLA} b, websearch_to_tsquery('spanish', %s) consulta
+    WHERE b.documento @@ consulta
+    ORDER BY b.estrategia_id DESC LIMIT %s
+""")
+
+_DESPUES_DE = 'WHERE puntuacion > %s OR (puntuacion = %s AND id < %s)'
+
+
+def preparar_consulta(texto):
+    """
+    Convierte el texto del usuario en una consulta segura para el motor, o None si no
+    contiene ningún término. En SQLite cada término va entre comillas (así los operadores
+    de FTS5 no se interpretan) y el último admite prefijos, para buscar mientras se escribe.
+    """
+    terminos = _TERMINO.findall(texto or '')
+    if not terminos:
+        return None
+    if connection.vendor == 'sqlite':
+        return ' '.join(f'"{termino}"' for termino in terminos) + '*'
+    if connection.vendor == 'postgresql':
+        return ' '.join(terminos)
+    raise NotSupportedError(f'La búsqueda de texto completo no está disponible en {connection.vendor}.')
+
+
+def _sql_busqueda():
+    if connection.vendor == 'sqlite':
+        return _SQL_SQLITE
+    if connection.vendor == 'postgresql':
+        return _SQL_POSTGRESQL
+    raise NotSupportedError(f'La búsqueda de texto completo no está disponible en {connection.vendor}.')
+
+
+def buscar(texto, cursor=None, limite=PAGINA_TAMANO_DEFECTO):
+    """
+    Devuelve (estrategias, siguiente_cursor) con las estrategias que contienen todos los
+    términos de `texto`, de más a menos relevante. Cada Estrategia trae solo id,
+    tipo_estrategia y fecha_generacion, más los atributos nombre_empresa y puntuacion.
+    Lanza CursorInvalido si el cursor no es válido.
+    """
+    consulta = preparar_consulta(texto)
+    if consulta is None:
+        return [], None
+
+    sql, parametros = _sql_busqueda(), [consulta, BUSQUEDA_CANDIDATOS]
+    if cursor:
+        puntuacion, pk = decodificar_cursor_puntuacion(cursor)
+        sql = sql.format(despues_de=_DESPUES_DE)
+        parametros += [puntuacion, puntuacion, pk]
+    else:
+        sql = sql.format(despues_de='')
+    # Una fila de más para saber si hay página siguiente, como en paginar_por_cursor
+    parametros.append(limite + 1)
+
+    # raw() convierte las columnas del modelo (p. ej. la fecha, que SQLite devuelve como
+    # texto); nombre_empresa y puntuacion quedan como atributos extra de cada Estrategia
+    estrategias = list(Estrategia.objects.raw(sql, parametros))
+
+    siguiente_cursor = None
+    if len(estrategias) > limite:
+        estrategias = estrategias[:limite]
+        siguiente_cursor = codificar_cursor_puntuacion(estrategias[-1].puntuacion, estrategias[-1].id)
+    return estrategias, siguiente_cursor
+
+
+def supera_candidatos(texto):
+    """
+    True si `texto` tiene más de BUSQUEDA_CANDIDATOS coincidencias, es decir, si la búsqueda
+    solo tiene en cuenta las más recientes. Lee BUSQUEDA_CANDIDATOS + 1 ids del índice.
+    """
+    consulta = preparar_consulta(texto)
+    if consulta is None:
+        return False
+    if connection.vendor == 'sqlite':
+        sql = f'SELECT 1 FROM {TABLA} WHERE {TABLA} MATCH %s ORDER BY rowid DESC LIMIT 1 OFFSET %s'
+    else:
+        sql = (f"SELECT 1 FROM {TABLA} WHERE documento @@ websearch_to_tsquery('spanish', %s) "
+               'ORDER BY estrategia_id DESC LIMIT 1 OFFSET %s')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [consulta, BUSQUEDA_CANDIDATOS])
+        return cursor.fetchone() is not None
+
+
+def filtro_ids(texto, limite=None):
+    """
+    Expresión para Estrategia.objects.filter(id__in=...) con los ids que coinciden con
+    `texto`, o None si no hay términos. Permite combinar la búsqueda con el listado por fecha.
+    Con `limite`, solo las `limite` coincidencias de id más alto (las más recientes).
+    """
+    consulta = preparar_consulta(texto)
+    if consulta is None:
+        return None
+    orden, parametros = '', [consulta]
+    if limite is not None:
+        orden = ' ORDER BY rowid DESC LIMIT %s' if connection.vendor == 'sqlite' else ' ORDER BY estrategia_id DESC LIMIT %s'
+        parametros.append(limite)
+    if connection.vendor == 'sqlite':
+        return RawSQL(f'SELECT rowid FROM {TABLA} WHERE {TABLA} MATCH %s{orden}', parametros)
+    return RawSQL(
+        f"SELECT estrategia_id FROM {TABLA} WHERE documento @@ websearch_to_tsquery('spanish', %s){orden}", parametros
+    )
@@ -0,0 +1,215 @@
+# estrategias/cache_detalle.py
+# Caché de la página de detalle de una estrategia (HTML renderizado) y de su variante JSON.
+#
+# Una estrategia no cambia después de generarse, y su página se pide muchas veces cuando
+# se comparte. En cada acierto no se toca la base de datos ni se renderiza la plantilla.
+#
+# Claves: "estrategias:detalle:<VERSION>:<variante>:<id>". La entrada guarda el contenido, los
+# validadores HTTP (ETag, Last-Modified) y la versión de la empresa con la que se construyó:
+#   - guardar o borrar una estrategia borra sus entradas (señales post_save y post_delete),
+#   - cambiar o borrar una empresa cambia su versión (señales, y los upserts de servicios.py,
+#     que no pasan por save()), y las entradas de todas sus estrategias dejan de valer sin
+#     tener que buscarlas.
+#   - invalidar_todo() (tras borrados masivos que no envían señales) cambia la generación
+#     global, que también guarda cada entrada: dejan de valer todas sin vaciar el alias,
+#     que puede compartirse con otras cachés.
+# Las estrategias que no existen también se guardan (un 404 en caché, con TTL más corto),
+# pero solo si su id es menor que el mayor id existente: los ids no se reutilizan
+# (AUTOINCREMENT en SQLite, secuencias en PostgreSQL), así que ese id ya no aparecerá y
+# crear estrategias, también con bulk_create, no tiene que invalidar nada.
+#
+# La misma invalidación cambia también la versión del listado (version_listado()), que usan
+# sus validadores HTTP (condicional.validadores_listado): cualquier estrategia guardada,
+# creada con bulk_create o borrada, y cualquier empresa cambiada, le da un ETag nuevo.
+#
+# Contra la estampida: cuando falta una entrada solo un proceso la construye (candado con
+# cache.add); los demás esperan unos milisegundos a que aparezca en lugar de consultar y
+# renderizar lo mismo a la vez.
+#
+# Con varios procesos, ESTRATEGIAS_DETALLE_CACHE_ALIAS debe ser una caché compartida (Redis,
+# Memcached...) para que la invalidación llegue a todos; con LocMemCache cada proceso solo
+# ve sus propias invalidaciones y el resto se entera al caducar el TTL.
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from .condicional import calcular_etag
+from .models import Estrategia
+
+CACHE_ALIAS = getattr(settings, 'ESTRATEGIAS_DETALLE_CACHE_ALIAS', 'default')
+CACHE_TTL = getattr(settings, 'ESTRATEGIAS_DETALLE_CACHE_TTL', 10 * 60) # Segundos
+CACHE_TTL_NO_EXISTE = getattr(settings, 'ESTRATEGIAS_DETALLE_CACHE_TTL_404', 60)
+CACHE_PREFIJO = 'estrategias:detalle'
+# Subir al cambiar las plantillas, el formato de la variante JSON o el de las entradas
+VERSION = 3
+VARIANTES = ('html', 'json')
+
+# Espera de quien no ganó el candado: hasta ESPERA_MAXIMA segundos, mirando cada ESPERA_INTERVALO
+ESPERA_MAXIMA = 2.0
+ESPERA_INTERVALO = 0.02
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _clave(variante, estrategia_id):
+    return f'{CACHE_PREFIJO}:{VERSION}:{variante}:{estrategia_id}'
+
+
+def _clave_version_empresa(empresa_id):
+    return f'{CACHE_PREFIJO}:empresa:{empresa_id}'
+
+
+_CLAVE_VERSION_LISTADO = f'{CACHE_PREFIJO}:listado'
+_CLAVE_GENERACION = f'{CACHE_PREFIJO}:generacion'
+
+
+def _generacion():
+    # Si la clave no está (desalojada) se crea otra: las entradas guardadas dejan de valer
+    cache = _cache()
+    generacion = cache.get(_CLAVE_GENERACION)
+    if generacion is None:
+        cache.add(_CLAVE_GENERACION, uuid.uuid4().hex, None)
+        generacion = cache.get(_CLAVE_GENERACION)
+    return generacion
+
+
+def _vigente(entrada):
+    if entrada is None:
+        return False
+    # Una sola ida a la caché: la generación global y, si existe, la versión de la empresa
+    claves = [_CLAVE_GENERACION]
+    if entrada['existe']:
+        claves.append(_clave_version_empresa(entrada['empresa_id']))
+    actuales = _cache().get_many(claves)
+    if actuales.get(_CLAVE_GENERACION) != entrada['generacion']:
+        return False
+    return not entrada['existe'] or actuales.get(claves[1]) == entrada['version_empresa']
+
+
+def _construir(estrategia_id, construir):
+    # Las versiones (generación y empresa) se leen antes que los datos: si cambian mientras
+    # tanto, la entrada se guarda con la versión vieja y el siguiente acierto ya no la acepta.
+    # Cuesta una consulta más (por clave primaria), pero solo en los fallos.
+    generacion = _generacion()
+    empresa_id = Estrategia.objects.filter(id=estrategia_id).values_list('empresa_id', flat=True).first()
+    version_empresa = _cache().get(_clave_version_empresa(empresa_id)) if empresa_id else None
+    estrategia = Estrategia.objects.select_related('empresa').filter(id=estrategia_id).first() if empresa_id else None
+    if estrategia is None:
+        ultimo_id = Estrategia.objects.order_by('-id').values_list('id', flat=True).first() or 0
+        return {'existe': False, 'contenido': construir(None), 'guardar': estrategia_id < ultimo_id,
+                'generacion': generacion}
+    return {
+        'existe': True,
+        'contenido': construir(estrategia),
+        'etag': calcular_etag(estrategia.id, estrategia.fecha_generacion.isoformat(), estrategia.empresa.hash_contenido),
+        'ultima_modificacion': estrategia.fecha_generacion,
+        'empresa_id': empresa_id,
+        'version_empresa': version_empresa,
+        'generacion': generacion,
+    }
+
+
+def obtener(estrategia_id, variante, construir):
+    """
+    Devuelve la entrada de caché de una estrategia, construyéndola si falta. `construir`
+    recibe la Estrategia (con la empresa ya cargada) o None si no existe, y devuelve el
+    contenido (texto o bytes). La entrada es un diccionario con 'existe' y 'contenido'
+    y, si existe, 'etag' y 'ultima_modificacion'.
+    """
+    cache = _cache()
+    clave = _clave(variante, estrategia_id)
+    entrada = cache.get(clave)
+    if _vigente(entrada):
+        return entrada
+
+    candado = f'{clave}:construyendo'
+    propio = cache.add(candado, 1, ESPERA_MAXIMA)
+    if not propio:
+        # Otro proceso la está construyendo
+        limite = time.monotonic() + ESPERA_MAXIMA
+        while time.monotonic() < limite:
+            time.sleep(ESPERA_INTERVALO)
+            entrada = cache.get(clave)
+            if _vigente(entrada):
+                return entrada
+        # Tardó demasiado (o falló): se construye aquí sin esperar más
+
+    try:
+        entrada = _construir(estrategia_id, construir)
+        if entrada['existe']:
+            cache.set(clave, entrada, CACHE_TTL)
+        elif entrada.pop('guardar'):
+            cache.set(clave, entrada, CACHE_TTL_NO_EXISTE)
+    finally:
+        if propio:
+            cache.delete(candado)
+    return entrada
+
+
+def _ahora_y_al_confirmar(funcion):
+    # Ahora, y otra vez al confirmar la transacción: si un lector vuelve a llenar la caché
+    # con los datos anteriores entre medias, la segunda invalidación la limpia
+    funcion()
+    transaction.on_commit(funcion)
+
+
+def _nueva_version_listado():
+    return {'version': uuid.uuid4().hex, 'fecha': timezone.now()}
+
+
+def version_listado():
+    """
+    (versión, fecha del cambio) del listado de estrategias. Si la clave no está (caché
+    vaciada o desalojada) se crea una nueva: el ETag cambia una vez, nunca se repite uno viejo.
+    """
+    cache = _cache()
+    valor = cache.get(_CLAVE_VERSION_LISTADO)
+    if valor is None:
+        cache.add(_CLAVE_VERSION_LISTADO, _nueva_version_listado(), None)
+        valor = cache.get(_CLAVE_VERSION_LISTADO) or _nueva_version_listado()
+    return valor['version'], valor['fecha']
+
+
+def invalidar_listado():
+    _ahora_y_al_confirmar(lambda: _cache().set(_CLAVE_VERSION_LISTADO, _nueva_version_listado(), None))
+
+
+def invalidar_estrategias(ids):
+    claves = [_clave(variante, estrategia_id) for estrategia_id in ids for variante in VARIANTES]
+    if claves:
+        _ahora_y_al_confirmar(lambda: _cache().delete_many(claves))
+        invalidar_listado()
+
+
+def invalidar_empresas(ids):
+    # Una versión nueva y aleatoria (no un contador): no depende de que la clave anterior
+    # siga en la caché
+    def cambiar_versiones():
+        _cache().set_many({_clave_version_empresa(empresa_id): uuid.uuid4().hex for empresa_id in ids}, CACHE_TTL)
+    if ids:
+        _ahora_y_al_confirmar(cambiar_versiones)
+        invalidar_listado()
+
+
+def invalidar_todo():
+    """
+    Invalida todas las entradas de detalle y la versión del listado (tras borrados masivos
+    que no envían señales) sin tocar el resto de claves del alias.
+    """
+    _ahora_y_al_confirmar(lambda: _cache().set(_CLAVE_GENERACION, uuid.uuid4().hex, None))
+    invalidar_listado()
+
+
+# Receptores de post_save y post_delete, conectados en EstrategiasConfig.ready()
+def estrategia_cambiada(sender, instance, **kwargs):
+    invalidar_estrategias([instance.pk])
+
+
+def empresa_cambiada(sender, instance, **kwargs):
+    invalidar_empresas([instance.pk])
@@ -0,0 +1,196 @@
+# estrategias/cache_generacion.py
+# Caché de resultados de generar_estrategia_ia.
+#
+# Muchos usuarios reenvían la misma empresa con el mismo texto; no tiene sentido volver
+# a pasar por spaCy y por las reglas. La clave es un hash de la entrada normalizada
+# (sector, tamaño, descripción, recursos) junto con la versión de las reglas (y del
+# clasificador, si lo hay) y el modo de PLN, así que un cambio en reglas.json o un modelo
+# reentrenado nunca devuelven resultados viejos.
+#
+# Dos niveles:
+#   1. Una LRU en memoria del proceso, acotada y con caducidad (TTL).
+#   2. Opcionalmente, el framework de caché de Django (ESTRATEGIAS_CACHE_ALIAS), para
+#      compartir resultados entre procesos.
+#
+# La rama genérica elige el tipo con random.choice; aquí se usa un random.Random
+# sembrado con la clave, de modo que un acierto y un fallo devuelven lo mismo.
+import hashlib
+import json
+import random
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from . import nlp as proveedor_nlp
+from .clasificador import reiniciar as recargar_clasificador
+from .generacion import generar_estrategia_ia, generar_estrategias_ia_lote, version_generador
+from .reglas import recargar_reglas
+
+CACHE_TAMANO = getattr(settings, 'ESTRATEGIAS_CACHE_TAMANO', 1024)
+CACHE_TTL = getattr(settings, 'ESTRATEGIAS_CACHE_TTL', 60 * 60) # Segundos
+CACHE_PREFIJO = 'estrategias:generacion'
+
+
+def _normalizar_texto(texto):
+    # Minúsculas y espacios colapsados: "Bajo   Presupuesto " == "bajo presupuesto"
+    return ' '.join((texto or '').lower().split())
+
+
+def normalizar_entrada(empresa_data):
+    """Devuelve una copia de empresa_data con los campos que usa el generador normalizados."""
+    return {
+        **empresa_data,
+        'sector': _normalizar_texto(empresa_data['sector']),
+        'tamano': empresa_data['tamano'],
+        'descripcion_negocio': _normalizar_texto(empresa_data['descripcion_negocio']),
+        'recursos_disponibles': _normalizar_texto(empresa_data['recursos_disponibles']),
+    }
+
+
+def calcular_clave(datos_normalizados, version):
+    partes = [
+        version,
+        proveedor_nlp.modo_configurado(),
+        datos_normalizados['sector'],
+        datos_normalizados['tamano'],
+        datos_normalizados['descripcion_negocio'],
+        datos_normalizados['recursos_disponibles'],
+    ]
+    crudo = json.dumps(partes, ensure_ascii=False, separators=(',', ':')).encode()
+    return hashlib.sha256(crudo).hexdigest()
+
+
+class CacheLRU:
+    """LRU acotada con caducidad por entrada y contadores de aciertos, fallos y desalojos."""
+
+    def __init__(self, tamano_maximo=CACHE_TAMANO, ttl=CACHE_TTL, reloj=time.monotonic):
+        self.tamano_maximo = tamano_maximo
+        self.ttl = ttl
+        self._reloj = reloj
+        self._datos = OrderedDict() # clave -> (caduca_en, valor)
+        self._lock = threading.Lock()
+        self.aciertos = self.fallos = self.desalojos = self.caducados = 0
+
+    def obtener(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                caduca_en, valor = entrada
+                if caduca_en > self._reloj():
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+                self.caducados += 1
+            self.fallos += 1
+            return None
+
+    def guardar(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (self._reloj() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+            while len(self._datos) > self.tamano_maximo:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def estadisticas(self):
+        with self._lock:
+            return {
+                'aciertos': self.aciertos,
+                'fallos': self.fallos,
+                'desalojos': self.desalojos,
+                'caducados': self.caducados,
+                'entradas': len(self._datos),
+            }
+
+
+_lru = CacheLRU()
+_aciertos_nivel2 = 0
+
+
+def _cache_nivel2():
+    alias = getattr(settings, 'ESTRATEGIAS_CACHE_ALIAS', None)
+    return caches[alias] if alias else None
+
+
+def preparar(empresa_data):
+    """Devuelve (datos normalizados, clave de caché) para una empresa."""
+    datos = normalizar_entrada(empresa_data)
+    return datos, calcular_clave(datos, version_generador())
+
+
+def azar_para(clave):
+    # Generador aleatorio reproducible para la rama genérica de las reglas
+    return random.Random(clave)
+
+
+def buscar(clave):
+    global _aciertos_nivel2
+    resultado = _lru.obtener(clave)
+    if resultado is None:
+        nivel2 = _cache_nivel2()
+        if nivel2 is not None:
+            resultado = nivel2.get(f'{CACHE_PREFIJO}:{clave}')
+            if resultado is not None:
+                _aciertos_nivel2 += 1
+                _lru.guardar(clave, resultado)
+    # Copia para que quien llama pueda modificar el diccionario sin tocar la caché
+    return dict(resultado) if resultado is not None else None
+
+
+def guardar(clave, resultado):
+    _lru.guardar(clave, dict(resultado))
+    nivel2 = _cache_nivel2()
+    if nivel2 is not None:
+        nivel2.set(f'{CACHE_PREFIJO}:{clave}', resultado, CACHE_TTL)
+
+
+def generar_estrategia_cacheada(empresa_data, nlp_model, stopwords_set):
+    """Como generar_estrategia_ia, pero consultando primero la caché."""
+    datos, clave = preparar(empresa_data)
+    resultado = buscar(clave)
+    if resultado is None:
+        resultado = generar_estrategia_ia(datos, nlp_model, stopwords_set, azar=azar_para(clave))
+        guardar(clave, resultado)
+    return resultado
+
+
+def generar_estrategias_cacheadas_lote(lista_empresa_data, nlp_model, stopwords_set, batch_size=None):
+    """Como generar_estrategias_ia_lote; solo los fallos de caché pasan por nlp.pipe()."""
+    version = version_generador()
+    datos = [normalizar_entrada(empresa_data) for empresa_data in lista_empresa_data]
+    claves = [calcular_clave(normalizados, version) for normalizados in datos]
+    resultados = [buscar(clave) for clave in claves]
+
+    pendientes = [posicion for posicion, resultado in enumerate(resultados) if resultado is None]
+    if pendientes:
+        generados = generar_estrategias_ia_lote(
+            [datos[posicion] for posicion in pendientes], nlp_model, stopwords_set,
+            batch_size=batch_size, azares=[azar_para(claves[posicion]) for posicion in pendientes],
+        )
+        for posicion, resultado in zip(pendientes, generados):
+            guardar(claves[posicion], resultado)
+            resultados[posicion] = resultado
+    return resultados
+
+
+def estadisticas():
+    return {**_lru.estadisticas(), 'aciertos_nivel2': _aciertos_nivel2}
+
+
+def invalidar():
+    """
+    Llamar después de modificar la tabla de reglas o de reentrenar el clasificador: los
+    vuelve a leer y vacía la LRU. Las entradas del nivel 2 llevan ambas versiones en la
+    clave, así que dejan de usarse solas y caducan con su TTL.
+    """
+    recargar_reglas()
+    recargar_clasificador()
+    _lru.limpiar()
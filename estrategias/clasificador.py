@@ -0,0 +1,221 @@
+# estrategias/clasificador.py
+# Clasificador entrenado para tipo_estrategia (modo opcional del generador).
+#
+# Para los sectores sin reglas propias en reglas.json (cinco de los ocho que acepta
+# EmpresaForm) el motor de reglas elige el tipo con random.choice. Si
+# ESTRATEGIAS_CLASIFICADOR_ARCHIVO apunta a un modelo entrenado con el comando
+# entrenar_clasificador, ese tipo lo predice un modelo lineal aprendido del historial de
+# Empresa/Estrategia. Las reglas siguen decidiendo todo lo demás (sectores con reglas,
+# textos, complementos) y son el respaldo si no hay modelo o no se puede cargar.
+#
+#   - Características: HashingVectorizer sobre sector, tamaño, descripción y recursos. No
+#     tiene vocabulario que ajustar ni guardar, así que se entrena por tandas con memoria
+#     constante y el archivo solo contiene los coeficientes.
+#   - Modelo: SGDClassifier con pérdida logística, entrenado con partial_fit.
+#   - Archivo: joblib sin comprimir con los coeficientes como arrays de NumPy. Se carga con
+#     mmap_mode='r': todos los workers leen las mismas páginas del archivo (caché de páginas
+#     del sistema operativo) en lugar de tener cada uno su propia copia.
+#   - Predicción por lotes: la matriz dispersa de características del lote multiplicada una
+#     sola vez por los coeficientes (n_features x clases), y el argmax de cada fila.
+#
+# El modelo aprende lo que contiene el historial: las estrategias de sectores genéricos
+# generadas antes por las reglas llevan un tipo al azar, así que conviene entrenarlo cuando
+# el historial tenga tipos elegidos o revisados por personas.
+import datetime
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Sube si cambia el contenido del archivo del modelo
+FORMATO = 1
+N_FEATURES_DEFECTO = 2 ** 18
+ENTRENAMIENTO_CHUNK = 5000
+
+_NO_CARGADO = object()
+_lock = threading.Lock()
+_clasificador = _NO_CARGADO
+
+
+def archivo_configurado():
+    return getattr(settings, 'ESTRATEGIAS_CLASIFICADOR_ARCHIVO', None)
+
+
+def parametros_vectorizador(n_features=N_FEATURES_DEFECTO):
+    import numpy as np
+    # Sin alternate_sign: todas las características suman, y los textos cortos no se anulan
+    return {
+        'n_features': n_features, 'ngram_range': (1, 2), 'alternate_sign': False,
+        'strip_accents': 'unicode', 'dtype': np.float32,
+    }
+
+
+def texto_empresa(datos):
+    # Sector y tamaño como tokens propios, para que no se mezclen con las palabras del texto
+    sector = '_'.join(datos['sector'].lower().split())
+    return (
+        f"sector_{sector} tamano_{datos['tamano']} "
+        f"{datos['descripcion_negocio']} {datos.get('recursos_disponibles') or ''}"
+    )
+
+
+class Clasificador:
+    """Modelo cargado: predice tipo_estrategia para listas de diccionarios de empresa."""
+
+    def __init__(self, datos):
+        import numpy as np
+        from sklearn.feature_extraction.text import HashingVectorizer
+        self.version = datos['version']
+        self.clases = list(datos['clases'])
+        self.filas_entrenamiento = datos['filas']
+        self.exactitud = datos['exactitud']
+        self._coeficientes = datos['coeficientes'] # (n_features, clases), normalmente un memmap
+        self._intercepto = np.asarray(datos['intercepto'])
+        self._vectorizador = HashingVectorizer(**datos['vectorizador'])
+
+    def puntuaciones(self, lista_empresa_data):
+        caracteristicas = self._vectorizador.transform([texto_empresa(datos) for datos in lista_empresa_data])
+        return caracteristicas @ self._coeficientes + self._intercepto
+
+    def predecir(self, lista_empresa_data):
+        """Un tipo_estrategia por empresa, en el mismo orden."""
+        if not lista_empresa_data:
+            return []
+        return [self.clases[indice] for indice in self.puntuaciones(lista_empresa_data).argmax(axis=1)]
+
+
+def filas_historial(max_filas=None):
+    """(texto, tipo_estrategia, id) de las estrategias guardadas, de la más reciente a la más antigua."""
+    from .models import Estrategia
+    filas = Estrategia.objects.order_by('-id').values_list(
+        'empresa__sector', 'empresa__tamano', 'empresa__descripcion_negocio',
+        'empresa__recursos_disponibles', 'tipo_estrategia', 'id',
+    )
+    if max_filas:
+        filas = filas[:max_filas]
+    for sector, tamano, descripcion, recursos, tipo, pk in filas.iterator(chunk_size=ENTRENAMIENTO_CHUNK):
+        yield texto_empresa({
+            'sector': sector, 'tamano': tamano,
+            'descripcion_negocio': descripcion, 'recursos_disponibles': recursos,
+        }), tipo, pk
+
+
+def _tandas(filas, tamano):
+    tanda = []
+    for fila in filas:
+        tanda.append(fila)
+        if len(tanda) >= tamano:
+            yield tanda
+            tanda = []
+    if tanda:
+        yield tanda
+
+
+def entrenar(leer_filas, clases, epocas=5, chunk_size=ENTRENAMIENTO_CHUNK, validacion=10,
+             n_features=N_FEATURES_DEFECTO):
+    """
+    Entrena el modelo recorriendo `leer_filas()` (un iterable nuevo de (texto, tipo, id) en
+    cada llamada) `epocas` veces, por tandas de `chunk_size` filas. Las filas con id
+    múltiplo de `validacion` no se usan para entrenar y sirven para medir la exactitud.
+    Devuelve el diccionario que guarda guardar().
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import SGDClassifier
+
+    parametros = parametros_vectorizador(n_features)
+    vectorizador = HashingVectorizer(**parametros)
+    modelo = SGDClassifier(loss='log_loss', alpha=1e-6, random_state=0)
+    filas_entrenadas = 0
+    for epoca in range(epocas):
+        for tanda in _tandas(leer_filas(), chunk_size):
+            entrenamiento = [(texto, tipo) for texto, tipo, pk in tanda if pk % validacion]
+            if not entrenamiento:
+                continue
+            textos, tipos = zip(*entrenamiento)
+            modelo.partial_fit(vectorizador.transform(textos), tipos, classes=clases)
+            if epoca == 0:
+                filas_entrenadas += len(entrenamiento)
+    if not filas_entrenadas:
+        raise ValueError('No hay estrategias con las que entrenar.')
+
+    aciertos = total = 0
+    for tanda in _tandas(leer_filas(), chunk_size):
+        evaluacion = [(texto, tipo) for texto, tipo, pk in tanda if not pk % validacion]
+        if evaluacion:
+            textos, tipos = zip(*evaluacion)
+            aciertos += int((modelo.predict(vectorizador.transform(textos)) == np.array(tipos)).sum())
+            total += len(evaluacion)
+
+    coeficientes = np.ascontiguousarray(modelo.coef_.T, dtype=np.float32)
+    return {
+        'formato': FORMATO,
+        'version': hashlib.sha1(coeficientes.tobytes()).hexdigest()[:12],
+        'clases': [str(clase) for clase in modelo.classes_],
+        'coeficientes': coeficientes,
+        'intercepto': modelo.intercept_.astype(np.float32),
+        'vectorizador': parametros,
+        'filas': filas_entrenadas,
+        'exactitud': aciertos / total if total else None,
+        'entrenado': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+
+
+def guardar(datos, ruta):
+    """
+    Escribe el modelo sin comprimir (para poder mapearlo en memoria). Se escribe en un
+    archivo temporal y se renombra: los procesos que tienen el anterior mapeado siguen
+    leyéndolo sin problemas hasta que lo recargan.
+    """
+    import joblib
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    os.close(descriptor)
+    try:
+        joblib.dump(datos, temporal)
+        os.replace(temporal, ruta)
+    except BaseException:
+        os.unlink(temporal)
+        raise
+
+
+def cargar(ruta):
+    import joblib
+    datos = joblib.load(ruta, mmap_mode='r')
+    if datos.get('formato') != FORMATO:
+        raise ValueError(f"formato {datos.get('formato')!r}, se esperaba {FORMATO}")
+    return Clasificador(datos)
+
+
+def obtener_clasificador():
+    """El clasificador de ESTRATEGIAS_CLASIFICADOR_ARCHIVO, o None si no hay (se usan las reglas)."""
+    global _clasificador
+    if _clasificador is _NO_CARGADO:
+        with _lock:
+            if _clasificador is _NO_CARGADO:
+                _clasificador = _cargar_configurado()
+    return _clasificador
+
+
+def _cargar_configurado():
+    ruta = archivo_configurado()
+    if not ruta:
+        return None
+    try:
+        return cargar(ruta)
+    except (ImportError, OSError, KeyError, ValueError) as e:
+        logger.warning("No se pudo cargar el clasificador '%s' (%s). Se usarán las reglas.", ruta, e)
+        return None
+
+
+def reiniciar():
+    """Olvida el clasificador cargado; la siguiente llamada vuelve a leer el archivo configurado."""
+    global _clasificador
+    with _lock:
+        _clasificador = _NO_CARGADO
@@ -0,0 +1,248 @@
+# estrategias/cola.py
+# Cola de generación en la base de datos (modo asíncrono de la vista de generación).
+#
+# Con ESTRATEGIAS_COLA_GENERACION = True, o si el cliente envía "Prefer: respond-async", la
+# vista valida los datos, guarda un TrabajoGeneracion (un INSERT) y responde 202 con la URL
+# de estado; el PLN y las escrituras de la empresa y la estrategia ocurren después, en los
+# procesos del comando run_generation_workers, que se escalan aparte del servidor web.
+#
+# Cada trabajador reclama hasta ESTRATEGIAS_COLA_LOTE trabajos pendientes de una vez:
+#   - PostgreSQL (y demás bases con SKIP LOCKED): SELECT ... FOR UPDATE SKIP LOCKED y un
+#     UPDATE por id. Los trabajadores se saltan las filas que otro está reclamando en lugar
+#     de esperarlo.
+#   - SQLite: un único UPDATE ... WHERE id IN (SELECT ... LIMIT n). Cada escritura toma el
+#     bloqueo de toda la base de datos, así que dos reclamaciones no pueden solaparse.
+# Los reclamados se generan con un único nlp.pipe() y se guardan con bulk_create
+# (servicios.guardar_estrategias_lote) en la misma transacción que los marca como
+# completados.
+#
+# Un trabajo reclamado por un proceso que murió vuelve a la cola pasados
+# ESTRATEGIAS_COLA_TIEMPO_MAXIMO segundos, hasta ESTRATEGIAS_COLA_INTENTOS veces; después
+# queda como fallido. La reclamación lleva un identificador (lote): si el trabajo se
+# reclamó otra vez entre medias, el proceso lento no guarda un resultado duplicado.
+import logging
+import multiprocessing
+import signal
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.db.models import F, Subquery
+from django.utils import timezone
+
+from . import nlp as proveedor_nlp
+from .cache_generacion import generar_estrategias_cacheadas_lote
+from .models import TrabajoGeneracion
+from .servicios import guardar_estrategias_lote
+
+logger = logging.getLogger(__name__)
+
+# Encolar todas las generaciones, no solo las que piden "Prefer: respond-async"
+COLA_GENERACION = getattr(settings, 'ESTRATEGIAS_COLA_GENERACION', False)
+# Trabajos reclamados y generados juntos por cada trabajador
+COLA_LOTE = getattr(settings, 'ESTRATEGIAS_COLA_LOTE', 50)
+# Segundos entre dos consultas a la cola cuando está vacía
+COLA_ESPERA = getattr(settings, 'ESTRATEGIAS_COLA_ESPERA', 0.5)
+# Segundos tras los que un trabajo en curso se da por abandonado
+COLA_TIEMPO_MAXIMO = getattr(settings, 'ESTRATEGIAS_COLA_TIEMPO_MAXIMO', 5 * 60)
+COLA_INTENTOS = getattr(settings, 'ESTRATEGIAS_COLA_INTENTOS', 3)
+# Retry-After de las respuestas de un trabajo sin terminar
+COLA_RETRY_AFTER = getattr(settings, 'ESTRATEGIAS_COLA_RETRY_AFTER', 1)
+
+# Cada cuánto busca un trabajador trabajos abandonados (segundos)
+REVISION_VENCIDOS = 60
+
+
+def pide_respuesta_asincrona(request):
+    return COLA_GENERACION or 'respond-async' in request.headers.get('Prefer', '').lower()
+
+
+def encolar(cleaned_data):
+    """Guarda un trabajo pendiente con los datos ya validados por EmpresaForm."""
+    return TrabajoGeneracion.objects.create(datos=cleaned_data)
+
+
+def reclamar(limite=COLA_LOTE):
+    """Marca como en curso hasta `limite` trabajos pendientes, los más antiguos, y los devuelve."""
+    lote = uuid.uuid4()
+    cambios = {
+        'estado': TrabajoGeneracion.EN_CURSO, 'lote': lote,
+        'fecha_inicio': timezone.now(), 'intentos': F('intentos') + 1,
+    }
+    pendientes = TrabajoGeneracion.objects.filter(estado=TrabajoGeneracion.PENDIENTE).order_by('id')
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(pendientes.select_for_update(skip_locked=True).values_list('id', flat=True)[:limite])
+            if not ids:
+                return []
+            TrabajoGeneracion.objects.filter(id__in=ids).update(**cambios)
+    else:
+        # estado también fuera de la subconsulta: con bloqueo por filas, el UPDATE que espera
+        # a otro vuelve a comprobarlo en la versión nueva de la fila y se la salta
+        TrabajoGeneracion.objects.filter(
+            id__in=Subquery(pendientes.values('id')[:limite]), estado=TrabajoGeneracion.PENDIENTE,
+        ).update(**cambios)
+    return list(TrabajoGeneracion.objects.filter(estado=TrabajoGeneracion.EN_CURSO, lote=lote).order_by('id'))
+
+
+def _fallar(trabajo, error):
+    # Vuelve a la cola si le quedan intentos
+    fallido = trabajo.intentos >= COLA_INTENTOS
+    TrabajoGeneracion.objects.filter(id=trabajo.id, lote=trabajo.lote, estado=TrabajoGeneracion.EN_CURSO).update(
+        estado=TrabajoGeneracion.FALLIDO if fallido else TrabajoGeneracion.PENDIENTE,
+        error=str(error), fecha_fin=timezone.now() if fallido else None,
+    )
+
+
+def procesar(trabajos):
+    """
+    Genera y guarda las estrategias de trabajos reclamados con reclamar(). Si falla el
+    lote, se reintenta trabajo a trabajo para aislar el que falla. Devuelve cuántos se
+    completaron.
+    """
+    if not trabajos:
+        return 0
+    try:
+        estrategias_info = generar_estrategias_cacheadas_lote(
+            [trabajo.datos for trabajo in trabajos], proveedor_nlp.obtener_nlp(), proveedor_nlp.obtener_stopwords(),
+        )
+        with transaction.atomic():
+            # Solo los que siguen con la misma reclamación (no vencieron ni los tomó otro)
+            reclamados = dict(
+                TrabajoGeneracion.objects.select_for_update()
+                .filter(id__in=[trabajo.id for trabajo in trabajos], estado=TrabajoGeneracion.EN_CURSO)
+                .values_list('id', 'lote')
+            )
+            vigentes = [
+                (trabajo, info) for trabajo, info in zip(trabajos, estrategias_info)
+                if reclamados.get(trabajo.id) == trabajo.lote
+            ]
+            if not vigentes:
+                return 0
+            estrategias = guardar_estrategias_lote(
+                [trabajo.datos for trabajo, _ in vigentes], [info for _, info in vigentes],
+            )
+            ahora = timezone.now()
+            for (trabajo, _), estrategia in zip(vigentes, estrategias):
+                trabajo.estado, trabajo.estrategia, trabajo.error, trabajo.fecha_fin = (
+                    TrabajoGeneracion.COMPLETADO, estrategia, '', ahora
+                )
+            TrabajoGeneracion.objects.bulk_update(
+                [trabajo for trabajo, _ in vigentes], ['estado', 'estrategia', 'error', 'fecha_fin'],
+            )
+        return len(vigentes)
+    except Exception as e:
+        if len(trabajos) == 1:
+            logger.exception('Falló el trabajo de generación %s.', trabajos[0].id)
+            _fallar(trabajos[0], e)
+            return 0
+        logger.warning('Falló un lote de %s trabajos (%s); se reintentan uno a uno.', len(trabajos), e)
+        return sum(procesar([trabajo]) for trabajo in trabajos)
+
+
+def liberar_vencidos(tiempo_maximo=COLA_TIEMPO_MAXIMO):
+    """
+    Devuelve a la cola los trabajos en curso desde hace más de `tiempo_maximo` segundos (su
+    trabajador murió o se colgó), o los marca como fallidos si agotaron los intentos.
+    Devuelve (reencolados, fallidos).
+    """
+    vencidos = TrabajoGeneracion.objects.filter(
+        estado=TrabajoGeneracion.EN_CURSO, fecha_inicio__lt=timezone.now() - timedelta(seconds=tiempo_maximo),
+    )
+    fallidos = vencidos.filter(intentos__gte=COLA_INTENTOS).update(
+        estado=TrabajoGeneracion.FALLIDO, error='Tiempo máximo agotado.', fecha_fin=timezone.now(),
+    )
+    return vencidos.update(estado=TrabajoGeneracion.PENDIENTE, lote=None), fallidos
+
+
+def trabajar(lote=COLA_LOTE, espera=COLA_ESPERA, hasta_vaciar=False, detener=None):
+    """
+    Bucle de un trabajador: reclama y procesa lotes hasta que `detener` (un Event) se active
+    o, con `hasta_vaciar`, hasta que no queden pendientes. Devuelve los trabajos completados.
+    """
+    proveedor_nlp.precargar()
+    completados, proxima_revision = 0, 0.0
+    while detener is None or not detener.is_set():
+        if time.monotonic() >= proxima_revision:
+            liberar_vencidos()
+            proxima_revision = time.monotonic() + REVISION_VENCIDOS
+        trabajos = reclamar(lote)
+        if trabajos:
+            completados += procesar(trabajos)
+        elif hasta_vaciar:
+            break
+        elif detener is not None:
+            detener.wait(espera)
+        else:
+            time.sleep(espera)
+    return completados
+
+
+def _proceso_trabajador(lote, espera, hasta_vaciar, detener, completados):
+    # Ctrl+C llega a todo el grupo de procesos: el padre activa `detener` y cada hijo
+    # termina su lote en curso
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    try:
+        hechos = trabajar(lote, espera, hasta_vaciar, detener)
+    finally:
+        connections.close_all()
+    with completados.get_lock():
+        completados.value += hechos
+
+
+def ejecutar_trabajadores(concurrencia=1, lote=COLA_LOTE, espera=COLA_ESPERA, hasta_vaciar=False):
+    """
+    Ejecuta `concurrencia` trabajadores (procesos hijos con fork si es más de uno) hasta
+    recibir SIGINT o SIGTERM o, con `hasta_vaciar`, hasta vaciar la cola. Devuelve los
+    trabajos completados.
+    """
+    contexto = multiprocessing.get_context('fork')
+    detener = contexto.Event()
+    anteriores = {
+        senal: signal.signal(senal, lambda *args: detener.set()) for senal in (signal.SIGINT, signal.SIGTERM)
+    }
+    try:
+        if concurrencia == 1:
+            return trabajar(lote, espera, hasta_vaciar, detener)
+        # El modelo se carga una vez en el padre y los hijos lo comparten; no deben heredar
+        # sus conexiones abiertas
+        proveedor_nlp.preparar_para_fork()
+        connections.close_all()
+        completados = contexto.Value('q', 0)
+        procesos = [
+            contexto.Process(target=_proceso_trabajador, args=(lote, espera, hasta_vaciar, detener, completados))
+            for _ in range(concurrencia)
+        ]
+        for proceso in procesos:
+            proceso.start()
+        for proceso in procesos:
+            proceso.join()
+        return completados.value
+    finally:
+        for senal, anterior in anteriores.items():
+            signal.signal(senal, anterior)
+
+
+def estado(trabajo_id):
+    """
+    Diccionario con el estado de un trabajo para el endpoint de estado y, si terminó, su
+    estrategia (los mismos campos que la respuesta síncrona) o su error; None si no existe.
+    """
+    trabajo = TrabajoGeneracion.objects.select_related('estrategia').filter(id=trabajo_id).first()
+    if trabajo is None:
+        return None
+    respuesta = {'success': trabajo.estado != TrabajoGeneracion.FALLIDO, 'trabajo_id': trabajo.id, 'estado': trabajo.estado}
+    if trabajo.estado == TrabajoGeneracion.FALLIDO:
+        respuesta['error'] = trabajo.error
+    elif trabajo.estado == TrabajoGeneracion.COMPLETADO and trabajo.estrategia is not None:
+        estrategia = trabajo.estrategia
+        respuesta.update({
+            'estrategia_id': estrategia.id,
+            'nombre_empresa': trabajo.datos['nombre'],
+            'tipo_estrategia': estrategia.tipo_estrategia,
+            'descripcion_estrategia': estrategia.descripcion_estrategia,
+            'impacto_estimado': estrategia.impacto_estimado,
+        })
+    return respuesta
@@ -0,0 +1,99 @@
+# estrategias/condicional.py
+# GET condicional (ETag / Last-Modified -> 304) y cabeceras de caché para las páginas
+# de solo lectura: listado, detalle y sitemaps.
+#
+# Los validadores del listado salen de la estrategia más reciente (una consulta por índice)
+# y de la versión del listado de cache_detalle, que cambia con cada escritura; los del
+# detalle, de su entrada en cache_detalle; los de los sitemaps, de la estrategia más
+# reciente y de PaginaSitemap (ver sitemaps.py). Si el cliente
+# o el proxy ya tienen la versión actual se responde 304 sin ejecutar la vista ni
+# renderizar la plantilla.
+#
+# Política de caché: el navegador revalida siempre (max-age=0, un 304 es barato) y un
+# proxy inverso delante puede servir la copia durante s-maxage segundos sin preguntar.
+# Con ESTRATEGIAS_CACHE_CONTROL se cambia, p. ej. {'private': True, 'no_cache': True}
+# si no hay proxy compartido.
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .models import Estrategia
+
+CACHE_CONTROL = getattr(settings, 'ESTRATEGIAS_CACHE_CONTROL', {
+    'public': True, 'max_age': 0, 's_maxage': 60, 'stale_while_revalidate': 30,
+})
+
+# Las respuestas no dependen de cookies ni de la cabecera Accept; solo pueden variar en la
+# compresión que aplique el proxy o un middleware de gzip
+VARY = ['Accept-Encoding']
+
+
+def calcular_etag(*partes):
+    return hashlib.sha1('|'.join(map(str, partes)).encode()).hexdigest()[:20]
+
+
+def validadores_listado(request, *args, **kwargs):
+    """
+    (etag, última modificación) de cualquier página del listado: la estrategia más reciente,
+    leída con el índice (fecha_generacion, id), y la versión del listado de cache_detalle,
+    que cambia con cualquier estrategia creada (también con fecha pasada) o borrada y con
+    cualquier cambio de una empresa. La última modificación es la más tardía de las dos.
+    Con una caché por proceso (LocMemCache), cada proceso solo ve sus propios cambios de
+    versión, como la caché de detalle.
+    """
+    # Importación diferida: cache_detalle importa este módulo
+    from .cache_detalle import version_listado
+    version, fecha_version = version_listado()
+    ultima = Estrategia.objects.order_by('-fecha_generacion', '-id').values_list('fecha_generacion', 'id').first()
+    if ultima is None:
+        return calcular_etag('vacio', version), fecha_version
+    fecha, pk = ultima
+    return calcular_etag(pk, fecha.isoformat(), version), max(fecha, fecha_version)
+
+
+def respuesta_condicional(request, etag, ultima_modificacion, generar):
+    """
+    Responde 304 (o 412) si el cliente ya tiene la versión indicada por `etag` y
+    `ultima_modificacion`; si no, devuelve generar(). Añade ETag, Last-Modified,
+    Cache-Control y Vary a las respuestas 200 y 304. Last-Modified tiene resolución de
+    segundos; el ETag distingue dos cambios dentro del mismo segundo.
+    """
+    etag = quote_etag(etag) if etag else None
+    timestamp = int(ultima_modificacion.timestamp()) if ultima_modificacion else None
+
+    respuesta = get_conditional_response(request, etag=etag, last_modified=timestamp)
+    if respuesta is None:
+        respuesta = generar()
+    # Sin validadores no hay nada que cachear
+    if respuesta.status_code not in (200, 304) or (etag is None and timestamp is None):
+        return respuesta
+
+    if etag:
+        respuesta.headers.setdefault('ETag', etag)
+    if timestamp is not None:
+        respuesta.headers.setdefault('Last-Modified', http_date(timestamp))
+    patch_cache_control(respuesta, **CACHE_CONTROL)
+    patch_vary_headers(respuesta, VARY)
+    return respuesta
+
+
+def condicional(validadores):
+    """
+    Decorador para vistas de solo lectura (funciones o, con method_decorator, el get de
+    una vista basada en clase). `validadores(request, *args, **kwargs)` devuelve (etag,
+    última modificación); con una sola llamada se sirven If-None-Match e If-Modified-Since.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltorio(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+            etag, ultima_modificacion = validadores(request, *args, **kwargs)
+            return respuesta_condicional(
+                request, etag, ultima_modificacion, lambda: vista(request, *args, **kwargs)
+            )
+        return envoltorio
+    return decorador
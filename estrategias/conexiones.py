@@ -0,0 +1,21 @@
+# estrategias/conexiones.py
+# Ajustes por conexión de la base de datos, aplicados desde la señal connection_created.
+#
+# SQLite guarda la mayoría de sus opciones por conexión (PRAGMA), así que hay que repetirlas
+# cada vez que Django abre una. El perfil 'sqlite' de settings.py activa:
+#   journal_mode=WAL      los lectores no se bloquean mientras alguien escribe
+#   synchronous=NORMAL    con WAL sigue siendo seguro ante caídas del proceso y evita un fsync por commit
+#   busy_timeout          espera al lock de escritura en vez de fallar con "database is locked"
+#   mmap_size             lecturas a través de memoria mapeada, sin copiar páginas al caché de SQLite
+from django.conf import settings
+
+SQLITE_PRAGMAS = getattr(settings, 'ESTRATEGIAS_SQLITE_PRAGMAS', {})
+
+
+def configurar_sqlite(sender, connection, **kwargs):
+    # Receptor de connection_created. Se usa la conexión sqlite3 directamente para que los
+    # PRAGMA no pasen por los execute_wrappers ni cuenten como consultas de la petición.
+    if connection.vendor != 'sqlite' or not SQLITE_PRAGMAS:
+        return
+    for nombre, valor in SQLITE_PRAGMAS.items():
+        connection.connection.execute(f'PRAGMA {nombre} = {valor}')
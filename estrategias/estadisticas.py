@@ -0,0 +1,268 @@
+# estrategias/estadisticas.py
+# Estadísticas de estrategias generadas por día, sector, tamaño de la empresa y tipo de
+# estrategia, mantenidas de forma incremental en EstadisticaDiaria.
+#
+# Un GROUP BY sobre Estrategia JOIN Empresa tarda más cuanto más crece la tabla. En su lugar,
+# cada inserción suma a su contador (Estrategia.save() y EstrategiaQuerySet.bulk_create) y
+# cada borrado resta (señales de borrado), en la misma transacción que la fila, con un
+# INSERT ... ON CONFLICT DO UPDATE por combinación distinta. El endpoint de estadísticas
+# solo lee EstadisticaDiaria: su coste depende del rango de días pedido, no del número de
+# estrategias.
+#
+# Las estrategias cuentan con el sector y el tamaño actuales de su empresa: cuando cambian
+# (Empresa.save(), bulk_update, los upserts de bulk_create y servicios.upsert_empresa) sus
+# estrategias pasan de la combinación anterior a la nueva en la misma transacción
+# (mover_empresas). Tras cambios que no pasan por ahí (QuerySet.update, DELETE masivos de
+# seed_db, correcciones a mano) el comando reconstruir_estadisticas las recalcula desde las
+# estrategias.
+import datetime
+import weakref
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection, connections, router, transaction
+from django.db.models import Count, F, QuerySet, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .exportacion import FiltroInvalido, consulta, leer_filtros
+from .models import Empresa, EstadisticaDiaria, Estrategia
+
+# Rango máximo de días de una consulta al endpoint (el coste crece con el rango)
+ESTADISTICAS_DIAS_MAXIMO = getattr(settings, 'ESTRATEGIAS_ESTADISTICAS_DIAS_MAXIMO', 366)
+DIAS_DEFECTO = 30
+
+CAMPOS = ('dia', 'sector', 'tamano', 'tipo_estrategia')
+# Valores de ?agrupar= y su campo en EstadisticaDiaria
+AGRUPACIONES = {'dia': 'dia', 'sector': 'sector', 'tamano': 'tamano', 'tipo': 'tipo_estrategia'}
+TAMANOS = {valor for valor, _ in Empresa._meta.get_field('tamano').choices}
+TAMANO_RECONSTRUCCION = 2000
+
+
+def _dia(fecha):
+    return timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+
+
+def _sectores_y_tamanos(estrategias, using=None):
+    # Las empresas suelen venir ya cargadas en las estrategias; las que no (o las cargadas
+    # con only(), como las existentes en servicios._upsert_empresas) se leen en una consulta
+    conocidos, faltan = {}, set()
+    for estrategia in estrategias:
+        empresa = estrategia.empresa if Estrategia.empresa.is_cached(estrategia) else None
+        if empresa is None or {'sector', 'tamano'} & empresa.get_deferred_fields():
+            faltan.add(estrategia.empresa_id)
+        else:
+            conocidos[estrategia.empresa_id] = (empresa.sector, empresa.tamano)
+    if faltan:
+        conocidos.update(
+            (pk, (sector, tamano))
+            for pk, sector, tamano in Empresa.objects.using(using).filter(id__in=faltan).values_list('id', 'sector', 'tamano')
+        )
+    return conocidos
+
+
+def _sql_sumar(conexion):
+    tabla = conexion.ops.quote_name(EstadisticaDiaria._meta.db_table)
+    columnas = ', '.join(CAMPOS)
+    return (
+        f'INSERT INTO {tabla} ({columnas}, estrategias) VALUES (%s, %s, %s, %s, %s) '
+        f'ON CONFLICT ({columnas}) DO UPDATE SET estrategias = {tabla}.estrategias + EXCLUDED.estrategias'
+    )
+
+
+def aplicar(conteos, using=None):
+    """Suma a EstadisticaDiaria un Counter {(día, sector, tamaño, tipo): estrategias}."""
+    # Siempre en el mismo orden: dos transacciones que tocan las mismas filas no se bloquean
+    # mutuamente (interbloqueo), una espera a la otra
+    filas = [(*clave, cantidad) for clave, cantidad in sorted(conteos.items()) if cantidad]
+    if not filas:
+        return
+    using = using or router.db_for_write(EstadisticaDiaria)
+    conexion = connections[using]
+    if conexion.features.supports_update_conflicts_with_target:
+        with conexion.cursor() as cursor:
+            cursor.executemany(_sql_sumar(conexion), filas)
+        return
+    # Bases de datos sin ON CONFLICT
+    estadisticas = EstadisticaDiaria.objects.using(using)
+    with transaction.atomic(using=using):
+        for *clave, cantidad in filas:
+            fila, _ = estadisticas.select_for_update().get_or_create(**dict(zip(CAMPOS, clave)))
+            estadisticas.filter(pk=fila.pk).update(estrategias=F('estrategias') + cantidad)
+
+
+def sumar(estrategias, signo=1, using=None):
+    """Suma (o resta, con signo=-1) las estrategias indicadas a sus contadores diarios."""
+    estrategias = list(estrategias)
+    if not estrategias:
+        return
+    empresas = _sectores_y_tamanos(estrategias, using)
+    conteos = Counter()
+    for estrategia in estrategias:
+        sector, tamano = empresas[estrategia.empresa_id]
+        conteos[(_dia(estrategia.fecha_generacion), sector, tamano, estrategia.tipo_estrategia)] += signo
+    aplicar(conteos, using)
+
+
+def _por_dia_y_tipo(empresa_ids, using):
+    # (empresa, día, tipo, estrategias) de las empresas indicadas, con el índice (empresa, fecha)
+    return (
+        Estrategia.objects.using(using).filter(empresa_id__in=empresa_ids).order_by()
+        .values_list('empresa_id', TruncDate('fecha_generacion'), 'tipo_estrategia')
+        .annotate(cantidad=Count('id'))
+    )
+
+
+def mover_empresas(anteriores, actuales, using=None):
+    """
+    Pasa las estrategias de las empresas cuyo sector o tamaño cambió de su combinación
+    anterior a la actual. `anteriores` y `actuales` son {id de empresa: (sector, tamaño)}
+    antes y después del cambio; los anteriores, leídos con las empresas bloqueadas
+    (EmpresaQuerySet.bloquear) en la misma transacción.
+    """
+    cambios = {
+        pk: (anteriores[pk], clave) for pk, clave in actuales.items()
+        if pk in anteriores and anteriores[pk] != clave
+    }
+    if not cambios:
+        return
+    conteos = Counter()
+    for pk, dia, tipo, cantidad in _por_dia_y_tipo(cambios, using):
+        anterior, actual = cambios[pk]
+        conteos[(dia, *anterior, tipo)] -= cantidad
+        conteos[(dia, *actual, tipo)] += cantidad
+    aplicar(conteos, using)
+
+
+# Borrados. El Collector de Django envía pre_delete de todas las filas antes de borrar
+# ninguna, y post_delete después, en la misma transacción. Restar cada estrategia por
+# separado costaría una consulta y un UPSERT por estrategia, así que:
+#   - al borrar una empresa, sus estrategias (en cascada) se restan en pre_delete de la
+#     empresa, agrupadas por día y tipo con una consulta,
+#   - las de un QuerySet.delete() de estrategias se acumulan en su pre_delete y se restan
+#     juntas en el primer post_delete,
+#   - una estrategia borrada sola (instance.delete()) resta en su post_delete.
+# Los receptores se conectan en EstrategiasConfig.ready().
+_borrados_pendientes = weakref.WeakKeyDictionary() # QuerySet borrado -> {id: Estrategia}
+
+
+def _borrado_de_empresas(origin):
+    return isinstance(origin, Empresa) or (isinstance(origin, QuerySet) and origin.model is Empresa)
+
+
+def empresa_por_borrar(sender, instance, using, **kwargs):
+    conteos = Counter()
+    for _, dia, tipo, cantidad in _por_dia_y_tipo([instance.pk], using):
+        conteos[(dia, instance.sector, instance.tamano, tipo)] -= cantidad
+    aplicar(conteos, using)
+
+
+def estrategia_por_borrar(sender, instance, origin=None, **kwargs):
+    if isinstance(origin, QuerySet) and origin.model is Estrategia:
+        _borrados_pendientes.setdefault(origin, {})[instance.pk] = instance
+
+
+def estrategia_borrada(sender, instance, using, origin=None, **kwargs):
+    if _borrado_de_empresas(origin):
+        return # Ya restada en empresa_por_borrar
+    if isinstance(origin, QuerySet):
+        # Las demás del mismo borrado ya no están pendientes: el primer post_delete las resta todas
+        sumar(_borrados_pendientes.pop(origin, {}).values(), signo=-1, using=using)
+    else:
+        sumar([instance], signo=-1, using=using)
+
+
+def contar_estrategias(filtros=None):
+    """
+    Recuento agrupado directamente sobre las estrategias: lo que deberían contener las
+    estadísticas. Recorre toda la tabla (o el rango de `filtros`, como en exportacion).
+    """
+    return (
+        consulta(filtros or {}).order_by()
+        .values_list(TruncDate('fecha_generacion'), 'empresa__sector', 'empresa__tamano', 'tipo_estrategia')
+        .annotate(cantidad=Count('id'))
+    )
+
+
+def reconstruir(desde=None, hasta=None):
+    """
+    Recalcula EstadisticaDiaria desde las estrategias, entera o solo los días [desde, hasta].
+    Devuelve el número de filas escritas.
+    """
+    filtros = {clave: valor for clave, valor in (('desde', desde), ('hasta', hasta)) if valor}
+    estadisticas = EstadisticaDiaria.objects.all()
+    if desde:
+        estadisticas = estadisticas.filter(dia__gte=desde)
+    if hasta:
+        estadisticas = estadisticas.filter(dia__lte=hasta)
+
+    with transaction.atomic():
+        if connection.vendor == 'postgresql':
+            # Las transacciones que insertan estrategias esperan a que termine la reconstrucción
+            # para sumar: ni se pierden ni se cuentan dos veces. En SQLite el DELETE ya toma el
+            # bloqueo de escritura de toda la base de datos
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f'LOCK TABLE {connection.ops.quote_name(EstadisticaDiaria._meta.db_table)} IN EXCLUSIVE MODE'
+                )
+        estadisticas.delete()
+        escritas, tanda = 0, []
+        for *clave, cantidad in contar_estrategias(filtros).iterator(chunk_size=TAMANO_RECONSTRUCCION):
+            tanda.append(EstadisticaDiaria(**dict(zip(CAMPOS, clave)), estrategias=cantidad))
+            if len(tanda) >= TAMANO_RECONSTRUCCION:
+                escritas += len(EstadisticaDiaria.objects.bulk_create(tanda))
+                tanda = []
+        escritas += len(EstadisticaDiaria.objects.bulk_create(tanda))
+    return escritas
+
+
+def leer_parametros(parametros):
+    """
+    Valida los parámetros del endpoint: desde y hasta (AAAA-MM-DD, por defecto los últimos
+    DIAS_DEFECTO días), sector, tamano, tipo y agrupar (lista separada por comas de dia,
+    sector, tamano y tipo; por defecto dia). Lanza FiltroInvalido.
+    """
+    filtros = leer_filtros(parametros)
+    filtros.setdefault('hasta', timezone.localdate())
+    filtros.setdefault('desde', filtros['hasta'] - datetime.timedelta(days=DIAS_DEFECTO - 1))
+    if filtros['desde'] > filtros['hasta']:
+        raise FiltroInvalido("'desde' no puede ser posterior a 'hasta'.")
+    if (filtros['hasta'] - filtros['desde']).days >= ESTADISTICAS_DIAS_MAXIMO:
+        raise FiltroInvalido(f'El rango de fechas no puede superar {ESTADISTICAS_DIAS_MAXIMO} días.')
+
+    if parametros.get('tamano'):
+        if parametros['tamano'] not in TAMANOS:
+            raise FiltroInvalido(f"'tamano' debe ser uno de: {', '.join(sorted(TAMANOS))}.")
+        filtros['tamano'] = parametros['tamano']
+
+    agrupar = [nombre.strip() for nombre in parametros.get('agrupar', 'dia').split(',') if nombre.strip()]
+    desconocidas = [nombre for nombre in agrupar if nombre not in AGRUPACIONES]
+    if desconocidas:
+        raise FiltroInvalido(f"'agrupar' admite: {', '.join(AGRUPACIONES)}.")
+    filtros['agrupar'] = list(dict.fromkeys(AGRUPACIONES[nombre] for nombre in agrupar))
+    return filtros
+
+
+def consultar(filtros):
+    """
+    Devuelve (total, filas) para los filtros de leer_parametros, leyendo solo
+    EstadisticaDiaria: una fila {campo: valor, ..., 'estrategias': n} por cada combinación
+    de los campos de 'agrupar', ordenadas por esos campos.
+    """
+    estadisticas = EstadisticaDiaria.objects.filter(dia__range=(filtros['desde'], filtros['hasta']))
+    for nombre, campo in (('sector', 'sector'), ('tamano', 'tamano'), ('tipo', 'tipo_estrategia')):
+        if nombre in filtros:
+            estadisticas = estadisticas.filter(**{campo: filtros[nombre]})
+
+    campos = filtros['agrupar']
+    if not campos:
+        return estadisticas.aggregate(total=Sum('estrategias'))['total'] or 0, []
+    filas = list(
+        estadisticas.values(*campos).annotate(cantidad=Sum('estrategias'))
+        .filter(cantidad__gt=0).order_by(*campos)
+    )
+    for fila in filas:
+        fila['estrategias'] = fila.pop('cantidad')
+        if 'dia' in fila:
+            fila['dia'] = fila['dia'].isoformat()
+    return sum(fila['estrategias'] for fila in filas), filas
@@ -0,0 +1,146 @@
+# estrategias/exportacion.py
+# Exportación de estrategias a CSV o JSONL como flujo de bloques de bytes, para
+# StreamingHttpResponse y para el comando export_estrategias.
+#
+# Las filas salen de values_list(...).iterator(chunk_size=...): la base de datos las entrega
+# por tandas (en PostgreSQL con un cursor del lado del servidor) y nunca se construyen
+# instancias del modelo, así que la memoria no depende del tamaño de la tabla. Cada tanda se
+# serializa y se entrega en cuanto está lista, de modo que el primer byte sale enseguida.
+import csv
+import datetime
+import io
+import json
+import zlib
+
+from django.conf import settings
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Estrategia
+
+EXPORTACION_CHUNK = getattr(settings, 'ESTRATEGIAS_EXPORTACION_CHUNK', 2000)
+
+FORMATOS = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+
+# (nombre de la columna exportada, campo para values_list)
+COLUMNAS = [
+    ('estrategia_id', 'id'),
+    ('nombre_empresa', 'empresa__nombre'),
+    ('sector', 'empresa__sector'),
+    ('tamano', 'empresa__tamano'),
+    ('tipo_estrategia', 'tipo_estrategia'),
+    ('descripcion_estrategia', 'descripcion_estrategia'),
+    ('impacto_estimado', 'impacto_estimado'),
+    ('fecha_generacion', 'fecha_generacion'),
+]
+TIPOS_ESTRATEGIA = {valor for valor, _ in Estrategia._meta.get_field('tipo_estrategia').choices}
+
+
+class FiltroInvalido(ValueError):
+    """Un filtro de la exportación no tiene un valor válido."""
+
+
+def leer_filtros(parametros):
+    """
+    Valida los filtros de exportación (desde, hasta, sector, tipo) de un diccionario de
+    textos, p. ej. request.GET o las opciones del comando. Fechas en formato AAAA-MM-DD;
+    `hasta` incluye el día indicado. Lanza FiltroInvalido.
+    """
+    filtros = {}
+    for nombre in ('desde', 'hasta'):
+        if parametros.get(nombre):
+            try:
+                fecha = parse_date(parametros[nombre])
+            except (TypeError, ValueError): # Formato correcto pero fecha imposible (2024-13-01)
+                fecha = None
+            if fecha is None:
+                raise FiltroInvalido(f"'{nombre}' debe ser una fecha AAAA-MM-DD.")
+            filtros[nombre] = fecha
+    if parametros.get('sector'):
+        filtros['sector'] = parametros['sector'].strip().lower()
+    if parametros.get('tipo'):
+        if parametros['tipo'] not in TIPOS_ESTRATEGIA:
+            raise FiltroInvalido(f"'tipo' debe ser uno de: {', '.join(sorted(TIPOS_ESTRATEGIA))}.")
+        filtros['tipo'] = parametros['tipo']
+    return filtros
+
+
+def _inicio_del_dia(fecha):
+    return timezone.make_aware(datetime.datetime.combine(fecha, datetime.time.min))
+
+
+def consulta(filtros):
+    # Rangos sobre la columna (no __date) para que se use el índice de fecha_generacion
+    estrategias = Estrategia.objects.all()
+    if 'desde' in filtros:
+        estrategias = estrategias.filter(fecha_generacion__gte=_inicio_del_dia(filtros['desde']))
+    if 'hasta' in filtros:
+        estrategias = estrategias.filter(
+            fecha_generacion__lt=_inicio_del_dia(filtros['hasta'] + datetime.timedelta(days=1))
+        )
+    if 'sector' in filtros:
+        estrategias = estrategias.filter(empresa__sector=filtros['sector'])
+    if 'tipo' in filtros:
+        estrategias = estrategias.filter(tipo_estrategia=filtros['tipo'])
+    # values_list con campos de la empresa ya hace el JOIN (lo que haría select_related)
+    return estrategias.order_by('id').values_list(*(campo for _, campo in COLUMNAS))
+
+
+def _tandas(filas, tamano):
+    tanda = []
+    for fila in filas:
+        tanda.append(fila)
+        if len(tanda) >= tamano:
+            yield tanda
+            tanda = []
+    if tanda:
+        yield tanda
+
+
+def _fila_exportable(fila):
+    # fecha_generacion (la última columna) en ISO 8601, igual en CSV y en JSONL
+    return fila[:-1] + (fila[-1].isoformat(),)
+
+
+def _bloques_csv(tandas):
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer)
+    escritor.writerow([nombre for nombre, _ in COLUMNAS])
+    yield buffer.getvalue().encode() # La cabecera sale antes de la primera consulta
+    for tanda in tandas:
+        buffer.seek(0)
+        buffer.truncate()
+        escritor.writerows(map(_fila_exportable, tanda))
+        yield buffer.getvalue().encode()
+
+
+def _bloques_jsonl(tandas):
+    nombres = [nombre for nombre, _ in COLUMNAS]
+    for tanda in tandas:
+        yield ''.join(
+            json.dumps(dict(zip(nombres, _fila_exportable(fila))), ensure_ascii=False) + '\n'
+            for fila in tanda
+        ).encode()
+
+
+def comprimir_gzip(bloques):
+    """Comprime un flujo de bloques en formato gzip sin esperar a tenerlos todos."""
+    compresor = zlib.compressobj(wbits=31) # 31 = cabecera y cola gzip
+    for bloque in bloques:
+        # Z_SYNC_FLUSH entrega ya lo comprimido de cada bloque (primer byte temprano)
+        yield compresor.compress(bloque) + compresor.flush(zlib.Z_SYNC_FLUSH)
+    yield compresor.flush()
+
+
+def exportar(formato, filtros=None, gzip=False, chunk_size=EXPORTACION_CHUNK):
+    """Generador de bloques de bytes con las estrategias en `formato` ('csv' o 'jsonl')."""
+    tandas = _tandas(consulta(filtros or {}).iterator(chunk_size=chunk_size), chunk_size)
+    bloques = _bloques_csv(tandas) if formato == 'csv' else _bloques_jsonl(tandas)
+    return comprimir_gzip(bloques) if gzip else bloques
+
+
+def nombre_archivo(formato, gzip=False):
+    return f"estrategias-{timezone.now():%Y%m%d}.{formato}{'.gz' if gzip else ''}"
@@ -1,6 +1,12 @@
 from django import forms
 from .models import Empresa
 
+# Sectores que acepta clean_sector, en el orden en que se sugieren en el mensaje de error
+# Una lista más robusta de sectores válidos, o una tabla en la DB
+SECTORES_VALIDOS = ('restaurante', 'tienda de ropa', 'consultoria', 'tecnologia', 'educacion', 'salud', 'servicios', 'manufactura')
+CONJUNTO_SECTORES = frozenset(SECTORES_VALIDOS)
+LONGITUD_MINIMA_NOMBRE = 3
+
 class EmpresaForm(forms.ModelForm):
     class Meta:
         model = Empresa
@@ -20,14 +26,12 @@ class EmpresaForm(forms.ModelForm):
     # Puedes añadir validaciones personalizadas aquí
     def clean_nombre(self):
         nombre = self.cleaned_data.get('nombre')
-        if len(nombre) < 3:
+        if len(nombre) < LONGITUD_MINIMA_NOMBRE:
             raise forms.ValidationError("El nombre de la empresa debe tener al menos 3 caracteres.")
         return nombre
 
     def clean_sector(self):
         sector = self.cleaned_data.get('sector').lower()
-        # Una lista más robusta de sectores válidos, o una tabla en la DB
-        sectores_validos = ['restaurante', 'tienda de ropa', 'consultoria', 'tecnologia', 'educacion', 'salud', 'servicios', 'manufactura']
-        if sector not in sectores_validos:
-            raise forms.ValidationError(f"El sector '{sector}' no es válido o no está soportado. Prueba con: {', '.join(sectores_validos)}")
+        if sector not in CONJUNTO_SECTORES:
+            raise forms.ValidationError(f"El sector '{sector}' no es válido o no está soportado. Prueba con: {', '.join(SECTORES_VALIDOS)}")
         return sector
\ No newline at end of file
@@ -0,0 +1,85 @@
+# estrategias/generacion.py
+# Lógica de generación de estrategias: análisis de texto con PLN + motor de reglas (y, si
+# está configurado, el clasificador de clasificador.py para los sectores sin reglas propias).
+# Se usa desde las vistas, el endpoint por lotes y los comandos de gestión.
+from django.conf import settings
+
+from .clasificador import obtener_clasificador
+from .metricas import fase
+from .reglas import obtener_motor, version_reglas
+
+# Cuántos textos procesa spaCy de una vez en nlp.pipe()
+NLP_BATCH_SIZE = getattr(settings, 'ESTRATEGIAS_NLP_BATCH_SIZE', 64)
+
+
+def _textos_a_analizar(empresa_data):
+    # Los dos textos que pasan por spaCy, ya normalizados a minúsculas
+    return (
+        empresa_data['descripcion_negocio'].lower(),
+        (empresa_data['recursos_disponibles'] or "").lower(),
+    )
+
+
+def version_generador():
+    """Versión de lo que decide el resultado: la tabla de reglas y, si lo hay, el clasificador."""
+    clasificador = obtener_clasificador()
+    if clasificador is None:
+        return version_reglas()
+    return f'{version_reglas()}+{clasificador.version}'
+
+
+def _tipos_clasificados(lista_empresa_data, motor):
+    # Un tipo predicho (o None) por empresa: solo para los sectores sin reglas propias, que
+    # las reglas resolverían al azar. Todo el lote en una sola multiplicación de matrices
+    tipos = [None] * len(lista_empresa_data)
+    clasificador = obtener_clasificador()
+    if clasificador is None:
+        return tipos
+    posiciones = [
+        posicion for posicion, datos in enumerate(lista_empresa_data)
+        if not motor.tiene_reglas_propias(datos['sector'])
+    ]
+    if posiciones:
+        with fase('clasificador'):
+            predichos = clasificador.predecir([lista_empresa_data[posicion] for posicion in posiciones])
+        for posicion, tipo in zip(posiciones, predichos):
+            tipos[posicion] = tipo
+    return tipos
+
+
+def generar_estrategia_ia(empresa_data, nlp_model, stopwords_set, azar=None):
+    # Las reglas (estrategias/reglas.json) se evalúan con un PhraseMatcher sobre los tokens;
+    # stopwords_set se mantiene en la firma para los llamadores existentes
+    docs = None
+    if nlp_model: # Solo si el modelo de PLN se cargó correctamente
+        with fase('nlp'):
+            docs = tuple(nlp_model(texto) for texto in _textos_a_analizar(empresa_data))
+    motor = obtener_motor(nlp_model)
+    tipo, = _tipos_clasificados([empresa_data], motor)
+    with fase('reglas'):
+        return motor.aplicar(empresa_data, docs, azar, tipo)
+
+
+def generar_estrategias_ia_lote(lista_empresa_data, nlp_model, stopwords_set, batch_size=None, azares=None):
+    """
+    Igual que generar_estrategia_ia pero para N empresas: todas las descripciones y
+    recursos pasan por un único flujo nlp.pipe(), mucho más rápido que N*2 llamadas.
+    Devuelve los resultados en el mismo orden que la entrada.
+
+    `azares` es opcional: un random.Random por empresa, en el mismo orden.
+    """
+    docs_por_empresa = [None] * len(lista_empresa_data)
+    if nlp_model and lista_empresa_data:
+        textos = [texto for datos in lista_empresa_data for texto in _textos_a_analizar(datos)]
+        with fase('nlp'):
+            docs = iter(nlp_model.pipe(textos, batch_size=batch_size or NLP_BATCH_SIZE))
+            # zip(docs, docs) agrupa los documentos de dos en dos: (descripción, recursos)
+            docs_por_empresa = list(zip(docs, docs))
+    azares = azares or [None] * len(lista_empresa_data)
+    motor = obtener_motor(nlp_model)
+    tipos = _tipos_clasificados(lista_empresa_data, motor)
+    with fase('reglas'):
+        return [
+            motor.aplicar(datos, docs, azar, tipo)
+            for datos, docs, azar, tipo in zip(lista_empresa_data, docs_por_empresa, azares, tipos)
+        ]
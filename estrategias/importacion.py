@@ -0,0 +1,189 @@
+# estrategias/importacion.py
+# Importación masiva de empresas desde archivos JSONL o CSV (comando import_empresas).
+#
+# El archivo se lee como flujo, registro a registro, y se procesa por tandas. Cada tanda
+# tiene dos fases:
+#   preparar_tanda   validación con EmpresaForm y generación con un único nlp.pipe(); no
+#                    toca la base de datos, así que puede ejecutarse en otros procesos
+#   guardar          empresas y estrategias con bulk_create en una transacción
+#                    (servicios.guardar_estrategias_lote), siempre en el proceso principal
+# En memoria solo viven las tandas en curso, así que el tamaño del archivo no importa.
+#
+# El progreso (modelo Importacion) se guarda en la misma transacción que cada tanda: si el
+# proceso muere, import_empresas --resume continúa justo después de la última tanda
+# confirmada, sin duplicar estrategias. Los registros inválidos van a un archivo JSONL de
+# rechazados con su número de registro y los errores del formulario.
+import csv
+import json
+import multiprocessing
+import os
+from collections import deque
+
+from django.conf import settings
+from django.db import connections, transaction
+
+from . import nlp as proveedor_nlp
+from .cache_generacion import generar_estrategias_cacheadas_lote
+from .forms import EmpresaForm
+from .models import Importacion
+from .servicios import guardar_estrategias_lote
+
+IMPORTACION_LOTE = getattr(settings, 'ESTRATEGIAS_IMPORTACION_LOTE', 2000)
+
+FORMATOS = ('jsonl', 'csv')
+
+
+def ruta_rechazados(ruta):
+    return f'{ruta}.rechazados.jsonl'
+
+
+def detectar_formato(ruta):
+    return 'csv' if ruta.lower().endswith('.csv') else 'jsonl'
+
+
+def leer_registros(archivo, formato, saltar=0):
+    """
+    Genera (número de registro, datos, errores) para cada registro de un archivo de texto
+    abierto. En JSONL el número es el de la línea (las líneas vacías no generan nada) y en
+    CSV el de la fila de datos, sin contar la cabecera. `errores` es None salvo si el
+    registro no se pudo leer. Los primeros `saltar` registros se omiten sin analizarlos.
+    """
+    if formato == 'csv':
+        for numero, fila in enumerate(csv.DictReader(archivo), 1):
+            if numero > saltar:
+                yield numero, fila, None
+        return
+
+    for numero, linea in enumerate(archivo, 1):
+        if numero <= saltar or not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea), None
+        except ValueError as e:
+            yield numero, linea.rstrip('\n'), {'__all__': [f'JSON inválido: {e}']}
+
+
+class ValidadorEmpresa:
+    """
+    Valida diccionarios con EmpresaForm (campos, clean_nombre, clean_sector y las
+    validaciones del modelo) reutilizando una sola instancia del formulario: crear un
+    formulario por registro copia todos sus campos y costaba más que validar.
+    """
+
+    def __init__(self):
+        self.form = EmpresaForm()
+
+    def validar(self, datos):
+        """Devuelve (cleaned_data, None) o (None, {campo: [mensajes]})."""
+        if not isinstance(datos, dict):
+            return None, {'__all__': ['Cada registro debe ser un objeto con los campos de la empresa.']}
+        form = self.form
+        # full_clean() vuelve a empezar cleaned_data y errores; construct_instance sobrescribe
+        # todos los campos del formulario en form.instance, que también se reutiliza
+        form.data, form.is_bound = datos, True
+        form.full_clean()
+        if form.errors:
+            return None, {campo: list(mensajes) for campo, mensajes in form.errors.items()}
+        return form.cleaned_data, None
+
+
+def _tandas(registros, tamano):
+    tanda = []
+    for registro in registros:
+        tanda.append(registro)
+        if len(tanda) >= tamano:
+            yield tanda
+            tanda = []
+    if tanda:
+        yield tanda
+
+
+def preparar_tanda(tanda):
+    """
+    Valida y genera las estrategias de una tanda de registros de leer_registros.
+    Devuelve (último número de registro, cleaned_data válidos, estrategias generadas,
+    líneas JSONL de rechazados).
+    """
+    validador = ValidadorEmpresa()
+    validos, rechazados = [], []
+    for numero, datos, errores in tanda:
+        if errores is None:
+            cleaned_data, errores = validador.validar(datos)
+        if errores is None:
+            validos.append(cleaned_data)
+        else:
+            rechazados.append(json.dumps(
+                {'registro': numero, 'datos': datos, 'errores': errores}, ensure_ascii=False
+            ) + '\n')
+    estrategias_info = generar_estrategias_cacheadas_lote(
+        validos, proveedor_nlp.obtener_nlp(), proveedor_nlp.obtener_stopwords()
+    ) if validos else []
+    return tanda[-1][0], validos, estrategias_info, rechazados
+
+
+def _preparar_en_paralelo(tandas, trabajadores):
+    # Pool.imap leería todo el archivo de golpe para repartirlo; así solo hay dos tandas
+    # por proceso en vuelo. Los resultados salen en el orden del archivo.
+    proveedor_nlp.preparar_para_fork()
+    # Los procesos hijos no deben heredar conexiones abiertas del padre
+    connections.close_all()
+    with multiprocessing.get_context('fork').Pool(trabajadores) as pool:
+        en_vuelo = deque()
+        for tanda in tandas:
+            en_vuelo.append(pool.apply_async(preparar_tanda, (tanda,)))
+            if len(en_vuelo) >= 2 * trabajadores:
+                yield en_vuelo.popleft().get()
+        while en_vuelo:
+            yield en_vuelo.popleft().get()
+
+
+def importar(ruta, formato=None, rechazados=None, reanudar=False, saltar=0,
+             lote=IMPORTACION_LOTE, trabajadores=1):
+    """
+    Importa las empresas de `ruta` (una estrategia nueva por registro válido). Generador:
+    tras confirmar cada tanda entrega el registro Importacion con el progreso acumulado, y
+    en su atributo procesados_al_inicio los registros (importados o rechazados) que ya
+    contaba al empezar esta ejecución.
+
+    `rechazados` es la ruta del archivo JSONL de registros inválidos (por defecto
+    ruta_rechazados(ruta)). Con `reanudar` se continúa desde el progreso guardado de
+    una ejecución anterior; si no, se empieza desde el registro `saltar` + 1. Con más de
+    un trabajador, validación y generación se reparten entre procesos hijos.
+    """
+    formato = formato or detectar_formato(ruta)
+    ruta_absoluta = os.path.abspath(ruta)
+    rechazados = rechazados or ruta_rechazados(ruta)
+
+    if reanudar:
+        progreso, _ = Importacion.objects.get_or_create(archivo=ruta_absoluta)
+    else:
+        progreso, _ = Importacion.objects.update_or_create(
+            archivo=ruta_absoluta,
+            defaults={'registros_procesados': saltar, 'importadas': 0, 'rechazadas': 0},
+        )
+    # Al reanudar, el progreso incluye la ejecución anterior; el ritmo solo debe contar esta
+    progreso.procesados_al_inicio = progreso.importadas + progreso.rechazadas
+
+    # newline='' es lo que pide el módulo csv (saltos de línea dentro de campos entrecomillados)
+    with open(ruta, encoding='utf-8-sig', newline='') as archivo, \
+         open(rechazados, 'a' if reanudar else 'w', encoding='utf-8') as archivo_rechazados:
+        tandas = _tandas(leer_registros(archivo, formato, saltar=progreso.registros_procesados), lote)
+        if trabajadores > 1:
+            preparadas = _preparar_en_paralelo(tandas, trabajadores)
+        else:
+            preparadas = map(preparar_tanda, tandas)
+
+        for ultimo, validos, estrategias_info, lineas_rechazadas in preparadas:
+            # Los rechazados se escriben antes de confirmar: si el proceso muere entre medias,
+            # al reanudar pueden repetirse en el archivo, pero nunca se pierden
+            archivo_rechazados.writelines(lineas_rechazadas)
+            archivo_rechazados.flush()
+
+            with transaction.atomic():
+                if validos:
+                    guardar_estrategias_lote(validos, estrategias_info)
+                progreso.registros_procesados = ultimo
+                progreso.importadas += len(validos)
+                progreso.rechazadas += len(lineas_rechazadas)
+                progreso.save()
+            yield progreso
@@ -0,0 +1,31 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estrategias import similares
+
+
+class Command(BaseCommand):
+    help = ('Rebuilds the memory-mapped similar-companies index from all businesses. Running '
+            'processes switch to it on their next refresh.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--directorio', default=similares.DIRECTORIO,
+                            help='Index directory (default: ESTRATEGIAS_SIMILARES_DIR).')
+        parser.add_argument('--chunk-size', type=int, default=similares.CONSTRUCCION_CHUNK,
+                            help=f'Businesses read and vectorized per step (default: {similares.CONSTRUCCION_CHUNK}).')
+
+    def handle(self, *args, **options):
+        try:
+            import sklearn # noqa: F401
+        except ImportError:
+            raise CommandError('scikit-learn is required to build the similar-companies index.')
+
+        inicio = time.perf_counter()
+        metadatos = similares.construir(options['directorio'], chunk_size=options['chunk_size'])
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {metadatos['filas']:,} businesses in {transcurrido:.1f}s "
+            f"({metadatos['filas'] / transcurrido:,.0f} rows/s); index {metadatos['version']} "
+            f"written to {options['directorio']}."
+        ))
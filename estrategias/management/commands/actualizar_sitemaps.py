@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estrategias import sitemaps
+
+
+class Command(BaseCommand):
+    help = ('Regenerates the precomputed strategy sitemap pages served under sitemap.xml. '
+            'Incremental by default: only the last page and the new strategies are read.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url-base', default=sitemaps.SITEMAP_URL_BASE,
+                            help='Scheme and host of the URLs, e.g. https://example.com '
+                                 '(default: ESTRATEGIAS_SITEMAP_URL_BASE).')
+        parser.add_argument('--completo', action='store_true',
+                            help='Rebuild every page (after deleting strategies or changing the URL base).')
+        parser.add_argument('--tamano', type=int, default=sitemaps.SITEMAP_TAMANO,
+                            help=f'URLs per sitemap page (default and protocol maximum: {sitemaps.SITEMAP_TAMANO}).')
+
+    def handle(self, *args, **options):
+        if not options['url_base'].startswith(('http://', 'https://')):
+            raise CommandError('Set ESTRATEGIAS_SITEMAP_URL_BASE or pass --url-base https://your-domain.')
+        if not 0 < options['tamano'] <= 50_000:
+            raise CommandError('--tamano must be between 1 and 50000.')
+
+        inicio = time.perf_counter()
+        paginas = sitemaps.actualizar_paginas(
+            options['url_base'], completo=options['completo'], tamano=options['tamano']
+        )
+        if not paginas:
+            self.stdout.write('Sitemap already up to date.')
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(paginas)} sitemap page(s) ({', '.join(str(p.numero) for p in paginas)}) "
+            f"with {sum(p.urls for p in paginas):,} URLs in {time.perf_counter() - inicio:.1f}s."
+        ))
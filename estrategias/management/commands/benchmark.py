@@ -0,0 +1,53 @@
+import json
+import platform
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from estrategias.benchmarks import SUITES, cargar_suite, comparar
+
+
+class Command(BaseCommand):
+    help = 'Runs the offline performance benchmark suites in estrategias/benchmarks.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('suites', nargs='*', choices=sorted(SUITES), help='Suites to run (default: all).')
+        parser.add_argument('--iteraciones', type=int, default=200, help='Iterations per measurement.')
+        parser.add_argument('--filas', type=int, nargs='+', default=None,
+                            help='Table sizes for the view and index benchmarks (default: 1000 100000 1000000).')
+        parser.add_argument('--salida', help='Write the results as JSON to this file.')
+        parser.add_argument('--base', help='Compare against a baseline JSON file and fail on regressions.')
+        parser.add_argument('--tolerancia', type=float, default=0.2,
+                            help='Allowed relative slowdown before a timing counts as a regression (default: 0.2).')
+
+    def handle(self, *args, **options):
+        opciones_suite = {'filas': options['filas']} if options['filas'] else {}
+        resultados = {}
+        for nombre in options['suites'] or sorted(SUITES):
+            self.stdout.write(self.style.MIGRATE_HEADING(f"Benchmark '{nombre}'"))
+            resultados[nombre] = cargar_suite(nombre).ejecutar(
+                iteraciones=options['iteraciones'], escribir=self.stdout.write, **opciones_suite
+            )
+            ancho = max(map(len, resultados[nombre]), default=0)
+            for metrica, valor in resultados[nombre].items():
+                self.stdout.write(f"  {metrica:<{ancho}}  {valor:,.3f}")
+
+        if options['salida']:
+            with open(options['salida'], 'w', encoding='utf-8') as archivo:
+                json.dump({
+                    'fecha': timezone.now().isoformat(),
+                    'python': sys.version.split()[0],
+                    'plataforma': platform.platform(),
+                    'iteraciones': options['iteraciones'],
+                    'resultados': resultados,
+                }, archivo, indent=2)
+            self.stdout.write(self.style.SUCCESS(f"Results written to {options['salida']}"))
+
+        if options['base']:
+            with open(options['base'], encoding='utf-8') as archivo:
+                base = json.load(archivo)
+            regresiones = comparar(resultados, base.get('resultados', base), options['tolerancia'])
+            if regresiones:
+                raise CommandError('Performance regressions:\n  ' + '\n  '.join(regresiones))
+            self.stdout.write(self.style.SUCCESS(f"No regressions against {options['base']}"))
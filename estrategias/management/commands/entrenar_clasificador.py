@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estrategias import clasificador
+from estrategias.models import Estrategia
+
+
+class Command(BaseCommand):
+    help = ('Trains the tipo_estrategia classifier on the stored strategies and saves it '
+            'for memory-mapped loading (set ESTRATEGIAS_CLASIFICADOR_ARCHIVO to use it).')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--salida', default=clasificador.archivo_configurado(),
+                            help='Model file to write (default: ESTRATEGIAS_CLASIFICADOR_ARCHIVO).')
+        parser.add_argument('--max-filas', type=int,
+                            help='Train only on the most recent N strategies (default: all).')
+        parser.add_argument('--epocas', type=int, default=5, help='Passes over the data (default: 5).')
+        parser.add_argument('--chunk-size', type=int, default=clasificador.ENTRENAMIENTO_CHUNK,
+                            help=f'Rows vectorized per training step (default: {clasificador.ENTRENAMIENTO_CHUNK}).')
+        parser.add_argument('--n-features', type=int, default=clasificador.N_FEATURES_DEFECTO,
+                            help=f'Hashing space size (default: {clasificador.N_FEATURES_DEFECTO}).')
+
+    def handle(self, *args, **options):
+        if not options['salida']:
+            raise CommandError('Set ESTRATEGIAS_CLASIFICADOR_ARCHIVO or pass --salida.')
+        try:
+            import sklearn # noqa: F401
+        except ImportError:
+            raise CommandError('scikit-learn is required to train the classifier.')
+
+        clases = [valor for valor, _ in Estrategia._meta.get_field('tipo_estrategia').choices]
+        inicio = time.perf_counter()
+        try:
+            datos = clasificador.entrenar(
+                lambda: clasificador.filas_historial(options['max_filas']), clases,
+                epocas=options['epocas'], chunk_size=options['chunk_size'], n_features=options['n_features'],
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        transcurrido = time.perf_counter() - inicio
+        clasificador.guardar(datos, options['salida'])
+
+        exactitud = 'n/a' if datos['exactitud'] is None else f"{datos['exactitud']:.1%}"
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained on {datos['filas']:,} strategies in {transcurrido:.1f}s "
+            f"({datos['filas'] * options['epocas'] / transcurrido:,.0f} rows/s); "
+            f"held-out accuracy {exactitud}. Model {datos['version']} written to {options['salida']} "
+            f"({os.path.getsize(options['salida']) / 1e6:.1f} MB)."
+        ))
+        self.stdout.write('Running processes keep the previous model until they restart.')
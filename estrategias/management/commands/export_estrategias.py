@@ -0,0 +1,49 @@
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estrategias import exportacion
+
+
+class Command(BaseCommand):
+    help = 'Streams all generated strategies as CSV or JSONL with constant memory.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--formato', choices=sorted(exportacion.FORMATOS), default='csv',
+                            help='Output format (default: csv).')
+        parser.add_argument('--salida', help='Output file (default: standard output).')
+        parser.add_argument('--gzip', action='store_true', help='Compress the output with gzip.')
+        parser.add_argument('--desde', help='Only strategies generated on or after this date (YYYY-MM-DD).')
+        parser.add_argument('--hasta', help='Only strategies generated on or before this date (YYYY-MM-DD).')
+        parser.add_argument('--sector', help='Only strategies of companies in this sector.')
+        parser.add_argument('--tipo', help='Only strategies of this type (marketing, ventas, ...).')
+        parser.add_argument('--chunk-size', type=int, default=exportacion.EXPORTACION_CHUNK,
+                            help=f'Rows fetched per database round trip (default: {exportacion.EXPORTACION_CHUNK}).')
+
+    def handle(self, *args, **options):
+        try:
+            filtros = exportacion.leer_filtros(options)
+        except exportacion.FiltroInvalido as e:
+            raise CommandError(str(e))
+
+        bloques = exportacion.exportar(
+            options['formato'], filtros, gzip=options['gzip'], chunk_size=options['chunk_size']
+        )
+        destino = open(options['salida'], 'wb') if options['salida'] else sys.stdout.buffer
+        inicio, total = time.perf_counter(), 0
+        try:
+            for bloque in bloques:
+                destino.write(bloque)
+                total += len(bloque)
+        finally:
+            if options['salida']:
+                destino.close()
+            else:
+                destino.flush()
+
+        # El resumen va a stderr para no mezclarse con los datos cuando se exporta a stdout
+        transcurrido = time.perf_counter() - inicio
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {total:,} bytes in {transcurrido:.1f}s ({total / transcurrido / 1e6 if transcurrido else 0:.1f} MB/s)."
+        ))
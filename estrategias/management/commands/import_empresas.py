@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from estrategias import importacion
+from estrategias import nlp as proveedor_nlp
+
+
+class Command(BaseCommand):
+    help = ('Imports businesses from a JSONL or CSV file (fields of EmpresaForm) and generates one strategy '
+            'per valid row. Invalid rows go to a dead-letter JSONL file; --resume continues after a crash.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='JSONL (one object per line) or CSV (with a header row) file.')
+        parser.add_argument('--format', dest='formato', choices=importacion.FORMATOS,
+                            help='Input format (default: from the file extension, .csv or JSONL).')
+        parser.add_argument('--batch-size', type=int, default=importacion.IMPORTACION_LOTE,
+                            help=f'Rows validated, generated and committed per transaction '
+                                 f'(default: {importacion.IMPORTACION_LOTE}).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Processes validating rows and generating strategies in parallel; '
+                                 'writes stay in the main process, in file order (default: 1).')
+        parser.add_argument('--rejects', dest='rechazados',
+                            help='Dead-letter file for invalid rows (default: <archivo>.rechazados.jsonl).')
+        parser.add_argument('--resume', dest='reanudar', action='store_true',
+                            help='Continue after the last batch committed by a previous run on the same file.')
+        parser.add_argument('--skip', type=int, default=0,
+                            help='Start after this many records (ignored with --resume).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1 or options['workers'] < 1 or options['skip'] < 0:
+            raise CommandError('--batch-size and --workers must be >= 1, --skip must be >= 0.')
+
+        # El modelo se carga antes de medir, para que el ritmo no incluya la carga
+        proveedor_nlp.precargar()
+        nlp_model = proveedor_nlp.obtener_nlp()
+        componentes = ', '.join(nlp_model.pipe_names) if nlp_model is not None else 'disabled'
+        self.stdout.write(f"NLP mode: {proveedor_nlp.modo_configurado()} ({componentes or 'tokenizer only'})")
+
+        inicio_reloj = time.perf_counter()
+        progreso, procesados = None, 0
+        try:
+            for progreso in importacion.importar(
+                options['archivo'], formato=options['formato'], rechazados=options['rechazados'],
+                reanudar=options['reanudar'], saltar=options['skip'], lote=options['batch_size'],
+                trabajadores=options['workers'],
+            ):
+                # Solo las filas de esta ejecución: con --resume el progreso incluye las anteriores
+                procesados = progreso.importadas + progreso.rechazadas - progreso.procesados_al_inicio
+                transcurrido = time.perf_counter() - inicio_reloj
+                self.stdout.write(
+                    f"record {progreso.registros_procesados}: {progreso.importadas} imported, "
+                    f"{progreso.rechazadas} rejected, {procesados / transcurrido if transcurrido else 0:.0f} rows/s"
+                )
+        except FileNotFoundError as e:
+            raise CommandError(str(e))
+
+        if progreso is None:
+            self.stdout.write(self.style.WARNING('Nothing to import.'))
+            return
+        transcurrido = time.perf_counter() - inicio_reloj
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {progreso.importadas} businesses and rejected {progreso.rechazadas} "
+            f"({procesados} rows in this run in {transcurrido:.1f}s, {procesados / transcurrido if transcurrido else 0:.0f} rows/s)."
+        ))
+        if progreso.rechazadas:
+            self.stdout.write(f"Rejected rows: {options['rechazados'] or importacion.ruta_rechazados(options['archivo'])}")
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from estrategias import cola
+from estrategias import nlp as proveedor_nlp
+
+
+class Command(BaseCommand):
+    help = ('Processes queued strategy generation jobs (POST with "Prefer: respond-async" or '
+            'ESTRATEGIAS_COLA_GENERACION): claims pending jobs in batches, generates them with one '
+            'NLP pass per batch and stores the results. Runs until SIGINT/SIGTERM.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', dest='concurrencia', type=int, default=1,
+                            help='Worker processes (forked from this one, sharing the NLP model; default: 1).')
+        parser.add_argument('--batch-size', dest='lote', type=int, default=cola.COLA_LOTE,
+                            help=f'Jobs claimed and generated together by each worker (default: {cola.COLA_LOTE}).')
+        parser.add_argument('--poll-interval', dest='espera', type=float, default=cola.COLA_ESPERA,
+                            help=f'Seconds between polls while the queue is empty (default: {cola.COLA_ESPERA}).')
+        parser.add_argument('--once', dest='hasta_vaciar', action='store_true',
+                            help='Exit when there are no pending jobs left instead of waiting for more.')
+
+    def handle(self, *args, **options):
+        if options['concurrencia'] < 1 or options['lote'] < 1 or options['espera'] <= 0:
+            raise CommandError('--concurrency and --batch-size must be >= 1, --poll-interval must be > 0.')
+        if options['concurrencia'] > 1 and connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            # Cada proceso hijo tendría su propia copia de la base de datos
+            raise CommandError('--concurrency > 1 needs a database shared between processes (not in-memory SQLite).')
+
+        proveedor_nlp.precargar()
+        self.stdout.write(
+            f"Starting {options['concurrencia']} worker(s), batches of {options['lote']} "
+            f"(NLP mode: {proveedor_nlp.modo_configurado()})."
+        )
+        inicio = time.perf_counter()
+        completados = cola.ejecutar_trabajadores(
+            options['concurrencia'], lote=options['lote'], espera=options['espera'],
+            hasta_vaciar=options['hasta_vaciar'],
+        )
+        transcurrido = time.perf_counter() - inicio
+        self.stdout.write(self.style.SUCCESS(
+            f"Completed {completados:,} jobs in {transcurrido:.1f}s "
+            f"({completados / transcurrido if transcurrido else 0:,.0f} jobs/s)."
+        ))
@@ -1,32 +1,16 @@
-from django.core.management.base import BaseCommand
-from estrategias.models import Empresa, Estrategia
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+from estrategias.models import CambioIndiceSimilares, Empresa, EstadisticaDiaria, Estrategia, TrabajoGeneracion
+from estrategias.servicios import registrar_estrategia
+import multiprocessing
 import random
+import time
 from datetime import timedelta
 from django.utils import timezone
 
-# Import PLN related parts to simulate better strategy generation
-import spacy
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
-# --- Load PLN models (once for the command execution) ---
-# Wrap in try-except for robustness if models aren't downloaded
-try:
-    nlp = spacy.load("es_core_news_sm")
-    try:
-        spanish_stopwords = set(stopwords.words('spanish'))
-    except LookupError:
-        nltk.download('stopwords')
-        spanish_stopwords = set(stopwords.words('spanish'))
-    try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-except Exception as e:
-    print(f"Warning: Could not load PLN models for seeding ({e}). Falling back to simpler strategy generation.")
-    nlp = None
-    spanish_stopwords = set()
+# PLN models are loaded lazily by the shared provider (see estrategias/nlp.py)
+from estrategias import nlp as proveedor_nlp
+from estrategias import cache_detalle, sintetico
 
 
 # Reuse the strategy generation logic from views.py
@@ -89,14 +73,47 @@ def _generate_strategy_ia(empresa_data, nlp_model, stopwords_set):
     }
 
 
+def _sembrar_rango(argumentos):
+    # Runs in a worker process when --workers > 1
+    semilla, inicio, fin, usar_nlp, ahora = argumentos
+    return fin - inicio, sintetico.sembrar_lote(semilla, inicio, fin, usar_nlp=usar_nlp, ahora=ahora)
+
+
 class Command(BaseCommand):
     help = 'Populates the database with sample data for Empresa and Estrategia models.'
 
+    def add_arguments(self, parser):
+        parser.add_argument('--count', type=int, default=None,
+                            help='Create N reproducible synthetic businesses (one strategy each) instead of the 8 samples.')
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='Businesses inserted per bulk_create/transaction (default: 1000).')
+        parser.add_argument('--workers', type=int, default=1,
+                            help='Worker processes inserting batches in parallel (default: 1).')
+        parser.add_argument('--seed', type=int, default=0,
+                            help='Seed for the synthetic data; same seed and count give the same rows (default: 0).')
+        parser.add_argument('--nlp', action='store_true',
+                            help='Run descriptions through nlp.pipe() (slower, exercises the full pipeline).')
+        parser.add_argument('--keep', action='store_true',
+                            help='Do not delete existing data before seeding.')
+
     def handle(self, *args, **options):
-        self.stdout.write("Deleting existing Empresa and Estrategia data...")
-        Estrategia.objects.all().delete()
-        Empresa.objects.all().delete()
-        self.stdout.write(self.style.SUCCESS("Existing data cleared."))
+        if not options['keep']:
+            self.stdout.write("Deleting existing Empresa and Estrategia data...")
+            # Plain DELETEs: with post_delete receivers (cache_detalle, estadisticas) the ORM
+            # would load and signal every row. The daily statistics and the pending
+            # similar-companies changes go with them and the detail cache is invalidated
+            # afterwards instead (rebuild the similar-companies index with actualizar_similares).
+            # Raw SQL skips on_delete, so the queue jobs' SET_NULL is applied by hand first.
+            with transaction.atomic(), connection.cursor() as cursor:
+                TrabajoGeneracion.objects.filter(estrategia__isnull=False).update(estrategia=None)
+                for modelo in (Estrategia, Empresa, EstadisticaDiaria, CambioIndiceSimilares):
+                    cursor.execute(f'DELETE FROM {connection.ops.quote_name(modelo._meta.db_table)}')
+            cache_detalle.invalidar_todo()
+            self.stdout.write(self.style.SUCCESS("Existing data cleared."))
+
+        if options['count'] is not None:
+            self._sembrar_sinteticos(options)
+            return
 
         sectors = ['restaurante', 'tienda de ropa', 'consultoria', 'tecnologia', 'educacion', 'salud', 'servicios']
         sizes = ['micro', 'pequena', 'mediana']
@@ -160,38 +177,12 @@ class Command(BaseCommand):
             }
         ]
 
-        created_count = 0
         for business_data in sample_businesses:
-            empresa, created = Empresa.objects.get_or_create(
-                nombre=business_data['nombre'],
-                defaults={
-                    'sector': business_data['sector'],
-                    'tamano': business_data['tamano'],
-                    'descripcion_negocio': business_data['descripcion_negocio'],
-                    'recursos_disponibles': business_data['recursos_disponibles']
-                }
-            )
-            if created:
-                created_count += 1
-            else:
-                # Update if exists to ensure consistent data for seeding purposes
-                empresa.sector = business_data['sector']
-                empresa.tamano = business_data['tamano']
-                empresa.descripcion_negocio = business_data['descripcion_negocio']
-                empresa.recursos_disponibles = business_data['recursos_disponibles']
-                empresa.save()
-
             # Generate strategy using the simulated AI logic
             strategy_info = _generate_strategy_ia(
-                {
-                    'nombre': empresa.nombre,
-                    'sector': empresa.sector,
-                    'tamano': empresa.tamano,
-                    'descripcion_negocio': empresa.descripcion_negocio,
-                    'recursos_disponibles': empresa.recursos_disponibles
-                },
-                nlp,
-                spanish_stopwords
+                business_data,
+                proveedor_nlp.obtener_nlp(),
+                proveedor_nlp.obtener_stopwords()
             )
 
             # Create strategy with a slightly varied date
@@ -200,13 +191,58 @@ class Command(BaseCommand):
             random_minutes = random.randint(0, 59)
             past_date = timezone.now() - timedelta(days=random_days, hours=random_hours, minutes=random_minutes)
 
-            Estrategia.objects.create(
-                empresa=empresa,
-                tipo_estrategia=strategy_info['tipo_estrategia'],
-                descripcion_estrategia=strategy_info['descripcion_estrategia'],
-                impacto_estimado=strategy_info['impacto_estimado'],
-                fecha_generacion=past_date # Assign a varied past date
-            )
+            # Upsert the business and insert its strategy, with the varied past date, in one transaction
+            empresa, _ = registrar_estrategia(business_data, strategy_info, fecha_generacion=past_date)
             self.stdout.write(self.style.SUCCESS(f"Successfully seeded strategy for {empresa.nombre}"))
 
-        self.stdout.write(self.style.SUCCESS(f"Successfully seeded {len(sample_businesses)} businesses and their strategies."))
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS(f"Successfully seeded {len(sample_businesses)} businesses and their strategies."))
+
+    def _sembrar_sinteticos(self, options):
+        cantidad, tamano_lote, trabajadores = options['count'], options['batch_size'], options['workers']
+        if cantidad < 0 or tamano_lote < 1 or trabajadores < 1:
+            raise CommandError('--count must be >= 0, --batch-size and --workers must be >= 1.')
+
+        # Los lotes se generan de forma perezosa: en memoria solo vive el lote en curso
+        # (y uno por proceso), así que el consumo no depende de N
+        ahora = timezone.now()
+        rangos = (
+            (options['seed'], inicio, min(inicio + tamano_lote, cantidad), options['nlp'], ahora)
+            for inicio in range(0, cantidad, tamano_lote)
+        )
+
+        inicio_reloj = time.perf_counter()
+        empresas = filas = 0
+        if trabajadores == 1:
+            resultados = map(_sembrar_rango, rangos)
+            pool = None
+        else:
+            if options['nlp']:
+                # Se carga antes del fork para que los procesos compartan el modelo
+                proveedor_nlp.preparar_para_fork()
+            # Los procesos hijos no deben heredar conexiones abiertas del padre
+            connections.close_all()
+            pool = multiprocessing.get_context('fork').Pool(trabajadores)
+            resultados = pool.imap_unordered(_sembrar_rango, rangos)
+
+        try:
+            for creadas, insertadas in resultados:
+                empresas += creadas
+                filas += insertadas
+                transcurrido = time.perf_counter() - inicio_reloj
+                self.stdout.write(
+                    f"{empresas}/{cantidad} businesses, {filas} rows, "
+                    f"{filas / transcurrido if transcurrido else 0:.0f} rows/s"
+                )
+        except BaseException:
+            if pool is not None:
+                pool.terminate()
+            raise
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+        transcurrido = time.perf_counter() - inicio_reloj
+        self.stdout.write(self.style.SUCCESS(
+            f"Successfully seeded {empresas} synthetic businesses and {filas - empresas} strategies "
+            f"in {transcurrido:.1f}s ({filas / transcurrido if transcurrido else 0:.0f} rows/s)."
+        ))
@@ -0,0 +1,198 @@
+# estrategias/metricas.py
+# Instrumentación por petición: tiempo de cada fase (nlp, reglas, db, render), número de
+# consultas SQL, cabecera Server-Timing e histogramas en memoria que se exponen en formato
+# de texto de Prometheus en /metrics.
+#
+# La medición activa vive en una ContextVar, así que funciona igual en vistas síncronas y
+# asíncronas (asgiref copia el contexto a los hilos de sync_to_async). Si la petición no
+# entra en el muestreo (ESTRATEGIAS_METRICAS_MUESTREO) no hay medición activa y los
+# ganchos se reducen a una lectura de la ContextVar.
+import bisect
+import contextlib
+import random
+import threading
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+MUESTREO = getattr(settings, 'ESTRATEGIAS_METRICAS_MUESTREO', 1.0)
+
+LIMITES_SEGUNDOS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+LIMITES_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+_medicion_actual = ContextVar('estrategias_medicion', default=None)
+
+
+class MedicionPeticion:
+    """Tiempos acumulados por fase (en segundos) y consultas de una petición."""
+
+    def __init__(self):
+        self.fases = {}
+        self.consultas = 0
+
+    def sumar(self, fase, segundos):
+        self.fases[fase] = self.fases.get(fase, 0.0) + segundos
+
+
+@contextlib.contextmanager
+def activar(medicion):
+    token = _medicion_actual.set(medicion)
+    try:
+        yield medicion
+    finally:
+        _medicion_actual.reset(token)
+
+
+@contextlib.contextmanager
+def fase(nombre):
+    """Cronometra el bloque como parte de la fase `nombre` de la petición en curso."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.sumar(nombre, time.perf_counter() - inicio)
+
+
+def sumar_fases(fases):
+    # Para fases medidas en otro proceso (p. ej. el pool de trabajadores)
+    medicion = _medicion_actual.get()
+    if medicion is not None:
+        for nombre, segundos in fases.items():
+            medicion.sumar(nombre, segundos)
+
+
+def envoltorio_db(execute, sql, params, many, context):
+    """execute_wrapper que cuenta y cronometra las consultas de la petición en curso."""
+    medicion = _medicion_actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.sumar('db', time.perf_counter() - inicio)
+        medicion.consultas += 1
+
+
+def instalar_en_conexion(sender, connection, **kwargs):
+    # Receptor de connection_created: engancha envoltorio_db una sola vez por conexión
+    if envoltorio_db not in connection.execute_wrappers:
+        connection.execute_wrappers.append(envoltorio_db)
+
+
+class Histograma:
+    def __init__(self, limites):
+        self.limites = limites
+        self.cubetas = [0] * (len(limites) + 1) # La última es +Inf
+        self.suma = 0.0
+        self.cuenta = 0
+
+    def observar(self, valor):
+        self.cubetas[bisect.bisect_left(self.limites, valor)] += 1
+        self.suma += valor
+        self.cuenta += 1
+
+
+class Registro:
+    """Histogramas por (nombre de métrica, etiquetas), protegidos por un lock."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histogramas = {} # (metrica, etiquetas) -> Histograma
+
+    def observar(self, metrica, etiquetas, valor, limites=LIMITES_SEGUNDOS):
+        clave = (metrica, tuple(sorted(etiquetas.items())))
+        with self._lock:
+            histograma = self._histogramas.get(clave)
+            if histograma is None:
+                histograma = self._histogramas[clave] = Histograma(limites)
+            histograma.observar(valor)
+
+    def limpiar(self):
+        with self._lock:
+            self._histogramas.clear()
+
+    def exportar(self):
+        """Devuelve los histogramas en formato de texto de Prometheus."""
+        lineas = []
+        with self._lock:
+            elementos = sorted(self._histogramas.items())
+        anterior = None
+        for (metrica, etiquetas), histograma in elementos:
+            if metrica != anterior:
+                lineas.append(f'# TYPE {metrica} histogram')
+                anterior = metrica
+            acumulado = 0
+            for limite, cantidad in zip(histograma.limites + ('+Inf',), histograma.cubetas):
+                acumulado += cantidad
+                lineas.append(f'{metrica}_bucket{_etiquetas(etiquetas + (("le", limite),))} {acumulado}')
+            lineas.append(f'{metrica}_sum{_etiquetas(etiquetas)} {histograma.suma}')
+            lineas.append(f'{metrica}_count{_etiquetas(etiquetas)} {histograma.cuenta}')
+        return '\n'.join(lineas) + '\n' if lineas else ''
+
+
+def _etiquetas(pares):
+    def escapar(valor):
+        return str(valor).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{nombre}="{escapar(valor)}"' for nombre, valor in pares) + '}' if pares else ''
+
+
+registro = Registro()
+
+
+def server_timing(medicion, total):
+    partes = [
+        f'{nombre};dur={segundos * 1000:.2f}' for nombre, segundos in medicion.fases.items()
+        if nombre != 'db'
+    ]
+    if 'db' in medicion.fases:
+        partes.append(f'db;dur={medicion.fases["db"] * 1000:.2f};desc="{medicion.consultas} consultas"')
+    partes.append(f'total;dur={total * 1000:.2f}')
+    return ', '.join(partes)
+
+
+class MetricasMiddleware:
+    """Mide una fracción de las peticiones y añade la cabecera Server-Timing."""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self._es_async = iscoroutinefunction(get_response)
+        if self._es_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self._es_async:
+            return self.__acall__(request)
+        if random.random() >= MUESTREO:
+            return self.get_response(request)
+        medicion, inicio = MedicionPeticion(), time.perf_counter()
+        with activar(medicion):
+            response = self.get_response(request)
+        return self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    async def __acall__(self, request):
+        if random.random() >= MUESTREO:
+            return await self.get_response(request)
+        medicion, inicio = MedicionPeticion(), time.perf_counter()
+        with activar(medicion):
+            response = await self.get_response(request)
+        return self._registrar(request, response, medicion, time.perf_counter() - inicio)
+
+    def _registrar(self, request, response, medicion, total):
+        match = getattr(request, 'resolver_match', None)
+        vista = match.view_name if match else 'sin_resolver'
+        for nombre, segundos in medicion.fases.items():
+            registro.observar('estrategias_fase_segundos', {'vista': vista, 'fase': nombre}, segundos)
+        registro.observar('estrategias_peticion_segundos', {'vista': vista}, total)
+        registro.observar('estrategias_peticion_consultas', {'vista': vista}, medicion.consultas, LIMITES_CONSULTAS)
+        response['Server-Timing'] = server_timing(medicion, total)
+        return response
@@ -0,0 +1,73 @@
+# Generated by Django 5.2 on 2026-10-18 12:02
+#
+# Añade Empresa.nombre_normalizado con un índice único y los índices que usa el listado.
+# Antes de crear el índice único se fusionan las empresas duplicadas que pudo dejar
+# get_or_create sin restricción: se conserva la más antigua (la que devolvía get_or_create),
+# con los datos de la más reciente, y sus estrategias pasan a apuntar a ella.
+from django.db import migrations, models
+
+TAMANO_LOTE = 1000
+CAMPOS_DATOS = ['sector', 'tamano', 'descripcion_negocio', 'recursos_disponibles']
+
+
+def normalizar_nombre(nombre):
+    # Copia de estrategias.models.normalizar_nombre: las migraciones no deben depender
+    # del código actual de la app
+    return ' '.join((nombre or '').split()).lower()
+
+
+def fusionar_duplicados_y_normalizar(apps, schema_editor):
+    Empresa = apps.get_model('estrategias', 'Empresa')
+    Estrategia = apps.get_model('estrategias', 'Estrategia')
+
+    conservadas = {} # nombre normalizado -> id de la empresa que se queda
+    duplicadas = {} # id conservado -> [ids duplicados, del más antiguo al más reciente]
+    pendientes = []
+    filas = Empresa.objects.order_by('id').values_list('id', 'nombre').iterator(chunk_size=TAMANO_LOTE)
+    for empresa_id, nombre in filas:
+        normalizado = normalizar_nombre(nombre)
+        conservada = conservadas.setdefault(normalizado, empresa_id)
+        if conservada != empresa_id:
+            duplicadas.setdefault(conservada, []).append(empresa_id)
+            continue
+        pendientes.append(Empresa(id=empresa_id, nombre_normalizado=normalizado))
+        if len(pendientes) >= TAMANO_LOTE:
+            Empresa.objects.bulk_update(pendientes, ['nombre_normalizado'])
+            pendientes = []
+    Empresa.objects.bulk_update(pendientes, ['nombre_normalizado'])
+
+    for conservada, ids_duplicados in duplicadas.items():
+        reciente = Empresa.objects.values(*CAMPOS_DATOS).get(id=ids_duplicados[-1])
+        Empresa.objects.filter(id=conservada).update(**reciente)
+        Estrategia.objects.filter(empresa_id__in=ids_duplicados).update(empresa_id=conservada)
+        Empresa.objects.filter(id__in=ids_duplicados).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='nombre_normalizado',
+            field=models.CharField(default='', editable=False, max_length=200),
+            preserve_default=False,
+        ),
+        migrations.RunPython(fusionar_duplicados_y_normalizar, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='empresa',
+            name='nombre_normalizado',
+            field=models.CharField(editable=False, max_length=200, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='estrategia',
+            index=models.Index(fields=['fecha_generacion', 'id'], name='estrategia_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estrategia',
+            index=models.Index(fields=['empresa', 'fecha_generacion'], name='estrategia_empresa_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2 on 2026-10-18 12:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0002_empresa_nombre_normalizado_indices'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='empresa',
+            name='hash_contenido',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+    ]
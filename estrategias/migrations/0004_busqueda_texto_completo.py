@@ -0,0 +1,155 @@
+# Índice invertido para la búsqueda de estrategias (ver estrategias/busqueda.py).
+#
+# SQLite: tabla virtual FTS5 con una fila por estrategia (rowid = id de la estrategia).
+# PostgreSQL: tabla con un tsvector por estrategia y un índice GIN.
+# En los dos casos el índice se mantiene con triggers, así que cualquier escritura
+# (save, bulk_create, update, el upsert de servicios.py o SQL directo) lo actualiza en la
+# misma transacción. Los datos de la empresa (nombre, sector, descripción) se copian en
+# cada estrategia, y un trigger sobre la empresa los reescribe cuando cambian.
+from django.db import migrations
+
+SQLITE_CREAR = [
+    """
+    CREATE VIRTUAL TABLE estrategias_busqueda USING fts5(
+        nombre_empresa, sector, tipo_estrategia, descripcion_estrategia, impacto_estimado,
+        descripcion_negocio, tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER estrategias_busqueda_estrategia_ai AFTER INSERT ON estrategias_estrategia BEGIN
+        INSERT INTO estrategias_busqueda (rowid, nombre_empresa, sector, tipo_estrategia,
+                                          descripcion_estrategia, impacto_estimado, descripcion_negocio)
+        SELECT new.id, emp.nombre, emp.sector, new.tipo_estrategia, new.descripcion_estrategia,
+               coalesce(new.impacto_estimado, ''), emp.descripcion_negocio
+        FROM estrategias_empresa emp WHERE emp.id = new.empresa_id;
+    END
+    """,
+    """
+    CREATE TRIGGER estrategias_busqueda_estrategia_ad AFTER DELETE ON estrategias_estrategia BEGIN
+        DELETE FROM estrategias_busqueda WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER estrategias_busqueda_estrategia_au AFTER UPDATE OF
+        empresa_id, tipo_estrategia, descripcion_estrategia, impacto_estimado ON estrategias_estrategia BEGIN
+        DELETE FROM estrategias_busqueda WHERE rowid = old.id;
+        INSERT INTO estrategias_busqueda (rowid, nombre_empresa, sector, tipo_estrategia,
+                                          descripcion_estrategia, impacto_estimado, descripcion_negocio)
+        SELECT new.id, emp.nombre, emp.sector, new.tipo_estrategia, new.descripcion_estrategia,
+               coalesce(new.impacto_estimado, ''), emp.descripcion_negocio
+        FROM estrategias_empresa emp WHERE emp.id = new.empresa_id;
+    END
+    """,
+    """
+    CREATE TRIGGER estrategias_busqueda_empresa_au AFTER UPDATE OF
+        nombre, sector, descripcion_negocio ON estrategias_empresa BEGIN
+        DELETE FROM estrategias_busqueda
+        WHERE rowid IN (SELECT id FROM estrategias_estrategia WHERE empresa_id = new.id);
+        INSERT INTO estrategias_busqueda (rowid, nombre_empresa, sector, tipo_estrategia,
+                                          descripcion_estrategia, impacto_estimado, descripcion_negocio)
+        SELECT e.id, new.nombre, new.sector, e.tipo_estrategia, e.descripcion_estrategia,
+               coalesce(e.impacto_estimado, ''), new.descripcion_negocio
+        FROM estrategias_estrategia e WHERE e.empresa_id = new.id;
+    END
+    """,
+    # Estrategias que ya existían
+    """
+    INSERT INTO estrategias_busqueda (rowid, nombre_empresa, sector, tipo_estrategia,
+                                      descripcion_estrategia, impacto_estimado, descripcion_negocio)
+    SELECT e.id, emp.nombre, emp.sector, e.tipo_estrategia, e.descripcion_estrategia,
+           coalesce(e.impacto_estimado, ''), emp.descripcion_negocio
+    FROM estrategias_estrategia e JOIN estrategias_empresa emp ON emp.id = e.empresa_id
+    """,
+]
+
+SQLITE_BORRAR = [
+    'DROP TRIGGER IF EXISTS estrategias_busqueda_empresa_au',
+    'DROP TRIGGER IF EXISTS estrategias_busqueda_estrategia_au',
+    'DROP TRIGGER IF EXISTS estrategias_busqueda_estrategia_ad',
+    'DROP TRIGGER IF EXISTS estrategias_busqueda_estrategia_ai',
+    'DROP TABLE IF EXISTS estrategias_busqueda',
+]
+
+# Pesos: A = nombre de la empresa, B = tipo y sector, C = texto de la estrategia, D = el resto
+POSTGRESQL_DOCUMENTO = """
+    setweight(to_tsvector('spanish', coalesce({emp}.nombre, '')), 'A') ||
+    setweight(to_tsvector('spanish', coalesce({e}.tipo_estrategia, '') || ' ' || coalesce({emp}.sector, '')), 'B') ||
+    setweight(to_tsvector('spanish', coalesce({e}.descripcion_estrategia, '')), 'C') ||
+    setweight(to_tsvector('spanish', coalesce({e}.impacto_estimado, '') || ' ' ||
+                                     coalesce({emp}.descripcion_negocio, '')), 'D')
+"""
+
+POSTGRESQL_CREAR = [
+    """
+    CREATE TABLE estrategias_busqueda (
+        estrategia_id bigint PRIMARY KEY REFERENCES estrategias_estrategia (id) ON DELETE CASCADE,
+        documento tsvector NOT NULL
+    )
+    """,
+    'CREATE INDEX estrategias_busqueda_documento_gin ON estrategias_busqueda USING gin (documento)',
+    f"""
+    CREATE FUNCTION estrategias_busqueda_estrategia() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO estrategias_busqueda (estrategia_id, documento)
+        SELECT NEW.id, {POSTGRESQL_DOCUMENTO.format(e='NEW', emp='emp')}
+        FROM estrategias_empresa emp WHERE emp.id = NEW.empresa_id
+        ON CONFLICT (estrategia_id) DO UPDATE SET documento = excluded.documento;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER estrategias_busqueda_estrategia
+    AFTER INSERT OR UPDATE OF empresa_id, tipo_estrategia, descripcion_estrategia, impacto_estimado
+    ON estrategias_estrategia FOR EACH ROW EXECUTE FUNCTION estrategias_busqueda_estrategia()
+    """,
+    f"""
+    CREATE FUNCTION estrategias_busqueda_empresa() RETURNS trigger AS $$
+    BEGIN
+        UPDATE estrategias_busqueda b SET documento = {POSTGRESQL_DOCUMENTO.format(e='e', emp='NEW')}
+        FROM estrategias_estrategia e
+        WHERE e.id = b.estrategia_id AND e.empresa_id = NEW.id;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    """
+    CREATE TRIGGER estrategias_busqueda_empresa
+    AFTER UPDATE OF nombre, sector, descripcion_negocio
+    ON estrategias_empresa FOR EACH ROW EXECUTE FUNCTION estrategias_busqueda_empresa()
+    """,
+    f"""
+    INSERT INTO estrategias_busqueda (estrategia_id, documento)
+    SELECT e.id, {POSTGRESQL_DOCUMENTO.format(e='e', emp='emp')}
+    FROM estrategias_estrategia e JOIN estrategias_empresa emp ON emp.id = e.empresa_id
+    """,
+]
+
+POSTGRESQL_BORRAR = [
+    'DROP TRIGGER IF EXISTS estrategias_busqueda_empresa ON estrategias_empresa',
+    'DROP TRIGGER IF EXISTS estrategias_busqueda_estrategia ON estrategias_estrategia',
+    'DROP FUNCTION IF EXISTS estrategias_busqueda_empresa()',
+    'DROP FUNCTION IF EXISTS estrategias_busqueda_estrategia()',
+    'DROP TABLE IF EXISTS estrategias_busqueda',
+]
+
+
+def _ejecutar(sentencias_por_motor):
+    def ejecutar(apps, schema_editor):
+        for sentencia in sentencias_por_motor.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sentencia)
+    return ejecutar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0003_empresa_hash_contenido'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _ejecutar({'sqlite': SQLITE_CREAR, 'postgresql': POSTGRESQL_CREAR}),
+            _ejecutar({'sqlite': SQLITE_BORRAR, 'postgresql': POSTGRESQL_BORRAR}),
+        ),
+    ]
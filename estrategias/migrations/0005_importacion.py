@@ -0,0 +1,24 @@
+# Generated by Django 5.2 on 2026-10-18 12:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0004_busqueda_texto_completo'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Importacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.CharField(max_length=500, unique=True)),
+                ('registros_procesados', models.PositiveBigIntegerField(default=0)),
+                ('importadas', models.PositiveBigIntegerField(default=0)),
+                ('rechazadas', models.PositiveBigIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2 on 2026-10-18 15:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0005_importacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaginaSitemap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField(unique=True)),
+                ('desde_id', models.BigIntegerField()),
+                ('hasta_id', models.BigIntegerField()),
+                ('urls', models.PositiveIntegerField()),
+                ('ultima_modificacion', models.DateTimeField()),
+                ('contenido', models.BinaryField()),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
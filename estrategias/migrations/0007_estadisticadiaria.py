@@ -0,0 +1,48 @@
+# Generated by Django 5.2 on 2026-10-18 16:10
+
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def llenar_estadisticas(apps, schema_editor):
+    # Las estrategias ya existentes; desde aquí las mantienen las inserciones y los borrados
+    Estrategia = apps.get_model('estrategias', 'Estrategia')
+    EstadisticaDiaria = apps.get_model('estrategias', 'EstadisticaDiaria')
+    recuentos = (
+        Estrategia.objects.using(schema_editor.connection.alias).order_by()
+        .values_list(TruncDate('fecha_generacion'), 'empresa__sector', 'empresa__tamano', 'tipo_estrategia')
+        .annotate(cantidad=Count('id'))
+    )
+    EstadisticaDiaria.objects.using(schema_editor.connection.alias).bulk_create(
+        [
+            EstadisticaDiaria(dia=dia, sector=sector, tamano=tamano, tipo_estrategia=tipo, estrategias=cantidad)
+            for dia, sector, tamano, tipo, cantidad in recuentos.iterator(chunk_size=2000)
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0006_paginasitemap'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia', models.DateField()),
+                ('sector', models.CharField(max_length=100)),
+                ('tamano', models.CharField(max_length=50)),
+                ('tipo_estrategia', models.CharField(max_length=100)),
+                ('estrategias', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('dia', 'sector', 'tamano', 'tipo_estrategia'), name='estadistica_diaria_unica')],
+            },
+        ),
+        migrations.RunPython(llenar_estadisticas, migrations.RunPython.noop),
+    ]
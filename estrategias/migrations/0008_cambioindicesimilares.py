@@ -0,0 +1,20 @@
+# Generated by Django 5.2 on 2026-10-18 12:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0007_estadisticadiaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CambioIndiceSimilares',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('empresa_id', models.BigIntegerField()),
+            ],
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2 on 2026-10-18 13:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('estrategias', '0009_trabajogeneracion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['sector', 'id'], name='empresa_sector_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='empresa',
+            index=models.Index(fields=['tamano', 'id'], name='empresa_tamano_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='estrategia',
+            index=models.Index(fields=['tipo_estrategia', 'fecha_generacion', 'id'], name='estrategia_tipo_fecha_id_idx'),
+        ),
+    ]
@@ -1,8 +1,130 @@
-from django.db import models
+import hashlib
+import json
+
+from django.db import connections, models, transaction
+
+# Campos que describen a la empresa; si ninguno cambia no hace falta reescribir la fila
+CAMPOS_CONTENIDO = ['nombre', 'sector', 'tamano', 'descripcion_negocio', 'recursos_disponibles']
+CAMPOS_DERIVADOS = ['nombre_normalizado', 'hash_contenido']
+
+
+def normalizar_nombre(nombre):
+    # "  Cafetería   del SOL " y "cafetería del sol" son la misma empresa
+    return ' '.join((nombre or '').split()).lower()
+
+
+def calcular_hash_contenido(datos):
+    """sha256 de los CAMPOS_CONTENIDO de un diccionario (p. ej. cleaned_data de EmpresaForm)."""
+    crudo = json.dumps([datos.get(campo) for campo in CAMPOS_CONTENIDO], ensure_ascii=False)
+    return hashlib.sha256(crudo.encode()).hexdigest()
+
+
+# Las estadísticas diarias cuentan cada estrategia con el sector y el tamaño de su empresa
+CAMPOS_ESTADISTICAS = {'sector', 'tamano'}
+
+
+class EmpresaQuerySet(models.QuerySet):
+    # bulk_create y bulk_update no llaman a save(), así que rellenamos aquí los campos derivados
+    # y avisamos a la caché de detalle y al índice de similares (save() lo hace con la señal post_save).
+    # Si cambian el sector o el tamaño de empresas existentes, sus estrategias pasan a la nueva
+    # combinación de las estadísticas diarias en la misma transacción
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for empresa in objs:
+            empresa.actualizar_campos_derivados()
+        if not objs or not kwargs.get('update_conflicts'):
+            return super().bulk_create(objs, *args, **kwargs)
+        unicos = kwargs.get('unique_fields') or []
+        with transaction.atomic(using=self.db, savepoint=False):
+            anteriores = {}
+            if len(unicos) == 1 and CAMPOS_ESTADISTICAS & set(kwargs.get('update_fields') or []):
+                anteriores = {
+                    empresa.pk: (empresa.sector, empresa.tamano)
+                    for empresa in self.bloquear(unicos[0], [getattr(obj, unicos[0]) for obj in objs]).values()
+                }
+            # Las filas nuevas reciben ids mayores que el mayor existente antes del INSERT; las que
+            # no, ya existían y se actualizaron (solo esas las vuelve a leer el índice de similares)
+            ultimo_id = self.model._default_manager.using(self.db).order_by('-id').values_list('id', flat=True).first() or 0
+            creadas = super().bulk_create(objs, *args, **kwargs)
+            _mover_estadisticas(anteriores, creadas, self.db)
+        ids = [empresa.pk for empresa in creadas if empresa.pk]
+        _invalidar_cache_detalle(ids)
+        _registrar_cambios_similares([pk for pk in ids if pk <= ultimo_id])
+        return creadas
+
+    def bulk_update(self, objs, fields, *args, **kwargs):
+        objs, fields = list(objs), list(fields)
+        if set(fields) & set(CAMPOS_CONTENIDO):
+            for empresa in objs:
+                empresa.actualizar_campos_derivados()
+            fields += [campo for campo in CAMPOS_DERIVADOS if campo not in fields]
+        with transaction.atomic(using=self.db, savepoint=False):
+            anteriores = {}
+            if CAMPOS_ESTADISTICAS & set(fields):
+                anteriores = {
+                    pk: (empresa.sector, empresa.tamano)
+                    for pk, empresa in self.bloquear('id', [empresa.pk for empresa in objs]).items()
+                }
+            filas = super().bulk_update(objs, fields, *args, **kwargs)
+            _mover_estadisticas(anteriores, objs, self.db)
+        _invalidar_cache_detalle([empresa.pk for empresa in objs])
+        _registrar_cambios_similares([empresa.pk for empresa in objs])
+        return filas
+
+    def bloquear(self, campo, valores):
+        """
+        Bloquea hasta el final de la transacción las empresas con `campo` en `valores`,
+        existan o no, y devuelve {valor: Empresa} de las existentes (con id, sector, tamano y
+        hash_contenido). En PostgreSQL los valores que aún no existen se bloquean con un
+        bloqueo consultivo, así que dos upserts de la misma empresa nueva se esperan; SQLite
+        solo admite una transacción de escritura a la vez. Los upserts lo usan para saber con
+        qué sector y tamaño cuentan ya sus estrategias en las estadísticas diarias.
+        """
+        valores = sorted(set(valores)) # Siempre en el mismo orden: sin interbloqueos
+        if not valores:
+            return {}
+        conexion = connections[self.db]
+        if conexion.vendor == 'postgresql':
+            with conexion.cursor() as cursor:
+                cursor.executemany('SELECT pg_advisory_xact_lock(hashtextextended(%s, 0))', [
+                    (f'{self.model._meta.db_table}:{campo}:{valor}',) for valor in valores
+                ])
+        empresas = self.select_for_update().filter(**{f'{campo}__in': valores})
+        return {
+            getattr(empresa, campo): empresa
+            for empresa in empresas.only(*dict.fromkeys(['id', campo, 'sector', 'tamano', 'hash_contenido']))
+        }
+
+
+def _invalidar_cache_detalle(empresa_ids):
+    # Importación diferida: cache_detalle importa este módulo
+    from .cache_detalle import invalidar_empresas
+    invalidar_empresas(empresa_ids)
+
+
+def _invalidar_listado():
+    # Importación diferida: cache_detalle importa este módulo
+    from .cache_detalle import invalidar_listado
+    invalidar_listado()
+
+
+def _registrar_cambios_similares(empresa_ids):
+    # Importación diferida: similares importa este módulo
+    from .similares import registrar_cambios
+    registrar_cambios(empresa_ids)
+
+
+def _mover_estadisticas(anteriores, empresas, using):
+    # Importación diferida: estadisticas importa este módulo
+    from .estadisticas import mover_empresas
+    mover_empresas(anteriores, {empresa.pk: (empresa.sector, empresa.tamano) for empresa in empresas}, using)
+
 
 # Este es el modelo para guardar la información de una Empresa
 class Empresa(models.Model):
     nombre = models.CharField(max_length=200) # Nombre de la empresa (texto corto)
+    # Clave única para buscar empresas sin recorrer la tabla y sin duplicados por mayúsculas/espacios
+    nombre_normalizado = models.CharField(max_length=200, unique=True, editable=False)
     sector = models.CharField(max_length=100) # Tipo de negocio (e.g., "restaurante", "tienda de ropa")
     tamano = models.CharField(max_length=50, choices=[ # Tamaño de la empresa (opciones predefinidas)
         ('micro', 'Microempresa'),
@@ -12,10 +134,71 @@ class Empresa(models.Model):
     descripcion_negocio = models.TextField() # Una descripción más larga de lo que hace el negocio
     recursos_disponibles = models.TextField(blank=True, null=True) # Qué recursos tiene la empresa (opcional)
     fecha_creacion = models.DateTimeField(auto_now_add=True) # Cuando se registró esta empresa
+    # Hash de CAMPOS_CONTENIDO: permite saltarse la escritura si se reenvían los mismos datos
+    hash_contenido = models.CharField(max_length=64, blank=True, editable=False)
+
+    objects = EmpresaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Filtros del listado del admin, que ordena por id descendente
+            models.Index(fields=['sector', 'id'], name='empresa_sector_id_idx'),
+            models.Index(fields=['tamano', 'id'], name='empresa_tamano_id_idx'),
+        ]
 
     def __str__(self):
         return self.nombre # Para que se muestre bonito en el panel de administración
 
+    def actualizar_campos_derivados(self):
+        self.nombre_normalizado = normalizar_nombre(self.nombre)
+        self.hash_contenido = calcular_hash_contenido(
+            {campo: getattr(self, campo) for campo in CAMPOS_CONTENIDO}
+        )
+
+    def save(self, *args, **kwargs):
+        self.actualizar_campos_derivados()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(update_fields) & set(CAMPOS_CONTENIDO):
+            kwargs['update_fields'] = {*update_fields, *CAMPOS_DERIVADOS}
+        using = kwargs.get('using') or self._state.db
+        with transaction.atomic(using=using, savepoint=False):
+            anteriores = {}
+            if not self._state.adding and (update_fields is None or CAMPOS_ESTADISTICAS & set(update_fields)):
+                # Si cambian el sector o el tamaño, sus estrategias cambian de combinación en las
+                # estadísticas diarias (ver estadisticas.py)
+                anteriores = {
+                    pk: (empresa.sector, empresa.tamano)
+                    for pk, empresa in Empresa.objects.db_manager(using).bloquear('id', [self.pk]).items()
+                }
+            super().save(*args, **kwargs)
+            _mover_estadisticas(anteriores, [self], using)
+
+def _sumar_estadisticas(estrategias, using):
+    # Importación diferida: estadisticas importa este módulo
+    from .estadisticas import sumar
+    sumar(estrategias, using=using)
+
+
+class EstrategiaQuerySet(models.QuerySet):
+    # bulk_create no llama a save(): las estadísticas diarias se actualizan aquí, en la misma
+    # transacción que las filas nuevas, y se cambia la versión del listado (cache_detalle).
+    # auto_now_add sobrescribe fecha_generacion en el INSERT; con conservar_fechas=True las
+    # fechas de los objetos (datos sintéticos, históricos) se vuelven a poner con un UPDATE
+    # en la misma transacción, antes de sumarlas a las estadísticas
+    def bulk_create(self, objs, *args, conservar_fechas=False, **kwargs):
+        objs = list(objs)
+        fechas = [estrategia.fecha_generacion for estrategia in objs] if conservar_fechas else None
+        with transaction.atomic(using=self.db, savepoint=False):
+            creadas = super().bulk_create(objs, *args, **kwargs)
+            if fechas is not None:
+                for estrategia, fecha in zip(creadas, fechas):
+                    estrategia.fecha_generacion = fecha or estrategia.fecha_generacion
+                super().bulk_update(creadas, ['fecha_generacion'])
+            _sumar_estadisticas(creadas, self.db)
+            _invalidar_listado()
+        return creadas
+
+
 # Este es el modelo para guardar las Estrategias que nuestro amigo mágico sugiere
 class Estrategia(models.Model):
     empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE) # A qué empresa pertenece esta estrategia
@@ -31,5 +214,119 @@ class Estrategia(models.Model):
     impacto_estimado = models.TextField(blank=True, null=True) # Qué se espera lograr con la estrategia (opcional)
     fecha_generacion = models.DateTimeField(auto_now_add=True) # Cuando se generó esta estrategia
 
+    objects = EstrategiaQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Orden del listado (ORDEN_KEYSET en pagination.py); se recorre también hacia atrás
+            models.Index(fields=['fecha_generacion', 'id'], name='estrategia_fecha_id_idx'),
+            # Estrategias de una empresa, de la más reciente a la más antigua
+            models.Index(fields=['empresa', 'fecha_generacion'], name='estrategia_empresa_fecha_idx'),
+            # Filtro por tipo del admin, en el mismo orden que el listado
+            models.Index(fields=['tipo_estrategia', 'fecha_generacion', 'id'], name='estrategia_tipo_fecha_id_idx'),
+        ]
+
+    def __str__(self):
+        return f"Estrategia para {self.empresa.nombre} ({self.tipo_estrategia})"
+
+    def save(self, *args, **kwargs):
+        # Una estrategia nueva cuenta en las estadísticas diarias en la misma transacción
+        # (los borrados restan con las señales de borrado, ver estadisticas.py)
+        nueva = self._state.adding
+        with transaction.atomic(using=kwargs.get('using'), savepoint=False):
+            super().save(*args, **kwargs)
+            if nueva:
+                _sumar_estadisticas([self], self._state.db)
+
+# Progreso de una importación de import_empresas. Se actualiza en la misma transacción que
+# las filas de cada tanda, así que tras una caída se reanuda justo después de la última tanda guardada
+class Importacion(models.Model):
+    archivo = models.CharField(max_length=500, unique=True) # Ruta absoluta del archivo importado
+    registros_procesados = models.PositiveBigIntegerField(default=0) # Registros leídos (válidos o no) ya confirmados
+    importadas = models.PositiveBigIntegerField(default=0)
+    rechazadas = models.PositiveBigIntegerField(default=0)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Importación de {self.archivo} ({self.registros_procesados} registros)"
+
+# Una página precalculada del sitemap de estrategias (ver estrategias/sitemaps.py): las
+# estrategias con id en (desde_id, hasta_id], hasta el límite de 50.000 URLs del protocolo.
+# El XML se guarda ya comprimido con gzip y se sirve tal cual
+class PaginaSitemap(models.Model):
+    numero = models.PositiveIntegerField(unique=True) # sitemap-estrategias-<numero>.xml
+    desde_id = models.BigIntegerField() # Id de la última estrategia de la página anterior (0 en la primera)
+    hasta_id = models.BigIntegerField() # Id de la última estrategia de esta página
+    urls = models.PositiveIntegerField()
+    ultima_modificacion = models.DateTimeField() # La estrategia más reciente de la página (lastmod del índice)
+    contenido = models.BinaryField()
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Página {self.numero} del sitemap ({self.urls} URLs)"
+
+
+# Estrategias generadas por día, sector y tamaño de la empresa y tipo de estrategia (ver
+# estrategias/estadisticas.py). Se actualiza en la misma transacción que cada inserción o
+# borrado de estrategias, así que el endpoint de estadísticas no agrupa la tabla de estrategias
+class EstadisticaDiaria(models.Model):
+    dia = models.DateField()
+    sector = models.CharField(max_length=100)
+    tamano = models.CharField(max_length=50)
+    tipo_estrategia = models.CharField(max_length=100)
+    estrategias = models.BigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Destino del INSERT ... ON CONFLICT; su índice, que empieza por el día, sirve
+            # también para los filtros por rango de fechas
+            models.UniqueConstraint(fields=['dia', 'sector', 'tamano', 'tipo_estrategia'], name='estadistica_diaria_unica'),
+        ]
+
+    def __str__(self):
+        return f"{self.dia} {self.sector}/{self.tamano}/{self.tipo_estrategia}: {self.estrategias}"
+
+
+# Empresa modificada después de construir el índice de similares (ver estrategias/similares.py).
+# Se escribe en la misma transacción que el cambio; cada proceso vuelve a leer esas empresas
+# y actualizar_similares borra las filas que ya quedaron incluidas en la base. Sin clave
+# foránea: el borrado de la empresa no tiene que tocar esta tabla
+class CambioIndiceSimilares(models.Model):
+    empresa_id = models.BigIntegerField()
+
+    def __str__(self):
+        return f"Cambio {self.id} de la empresa {self.empresa_id}"
+
+
+# Generación pendiente de la cola asíncrona (ver estrategias/cola.py): la vista valida los
+# datos, guarda aquí su cleaned_data y responde 202; los procesos de run_generation_workers
+# reclaman los trabajos por lotes, generan las estrategias y guardan el resultado
+class TrabajoGeneracion(models.Model):
+    PENDIENTE = 'pendiente'
+    EN_CURSO = 'en_curso'
+    COMPLETADO = 'completado'
+    FALLIDO = 'fallido'
+
+    estado = models.CharField(max_length=20, default=PENDIENTE, choices=[
+        (PENDIENTE, 'Pendiente'),
+        (EN_CURSO, 'En curso'),
+        (COMPLETADO, 'Completado'),
+        (FALLIDO, 'Fallido'),
+    ])
+    datos = models.JSONField() # cleaned_data de EmpresaForm
+    estrategia = models.ForeignKey(Estrategia, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    error = models.TextField(blank=True, default='')
+    intentos = models.PositiveSmallIntegerField(default=0)
+    lote = models.UUIDField(null=True, blank=True, editable=False) # Reclamación del trabajador que lo procesa
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True) # Última vez que se reclamó
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Los pendientes en orden de llegada y los en curso (pocos) de una reclamación o vencidos
+            models.Index(fields=['estado', 'id'], name='trabajo_estado_id_idx'),
+        ]
+
     def __str__(self):
-        return f"Estrategia para {self.empresa.nombre} ({self.tipo_estrategia})"
\ No newline at end of file
+        return f"Trabajo {self.id} ({self.estado})"
@@ -0,0 +1,151 @@
+# estrategias/nlp.py
+# Proveedor perezoso de los modelos de PLN (spaCy + stopwords de NLTK).
+#
+# Antes el modelo se cargaba al importar views.py, lo que encarecía cualquier arranque
+# (migrate, tests, shell...). Ahora se carga la primera vez que se necesita, o en
+# EstrategiasConfig.ready() si ESTRATEGIAS_NLP_CARGA_ANTICIPADA = True.
+#
+# generar_estrategia_ia solo usa token.text y token.is_alpha, que salen del tokenizador,
+# así que por defecto no cargamos tagger, parser, NER ni lematizador.
+import gc
+import logging
+import threading
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+MODELO_DEFECTO = 'es_core_news_sm'
+
+# Modos de carga disponibles:
+#   'completo'    -> el pipeline entero del modelo (como antes)
+#   'recortado'   -> el modelo sin componentes estadísticos: solo tokenizador y vocabulario
+#   'tokenizador' -> spacy.blank('es'): no necesita el paquete del modelo instalado
+MODO_COMPLETO = 'completo'
+MODO_RECORTADO = 'recortado'
+MODO_TOKENIZADOR = 'tokenizador'
+MODOS = (MODO_COMPLETO, MODO_RECORTADO, MODO_TOKENIZADOR)
+
+# Componentes del pipeline que no aportan nada a la extracción de palabras clave
+COMPONENTES_INNECESARIOS = [
+    'tok2vec', 'morphologizer', 'tagger', 'parser', 'senter',
+    'attribute_ruler', 'lemmatizer', 'ner',
+]
+
+# Textos con los que se "calienta" el modelo antes de hacer fork, para que las cachés
+# internas de spaCy (lexemas, cadenas) se llenen en el proceso padre y se compartan
+TEXTOS_CALENTAMIENTO = (
+    'restaurante con servicio a domicilio y delivery',
+    'tienda de ropa online con diseno exclusivo',
+    'consultoria de software y tecnologia para pymes',
+    'bajo presupuesto, buen local, equipo pequeno y experiencia tecnica',
+)
+
+_NO_CARGADO = object()
+_lock = threading.Lock()
+_nlp = _NO_CARGADO
+_stopwords = None
+
+
+def modo_configurado():
+    modo = getattr(settings, 'ESTRATEGIAS_NLP_MODO', MODO_RECORTADO)
+    if modo not in MODOS:
+        raise ValueError(f"ESTRATEGIAS_NLP_MODO='{modo}' no es válido. Opciones: {', '.join(MODOS)}")
+    return modo
+
+
+def cargar_nlp(modo=None, modelo=None):
+    """
+    Construye un pipeline nuevo según el modo pedido (sin pasar por la caché del módulo).
+
+    Si el paquete del modelo no está instalado se recurre al tokenizador en blanco,
+    que para español tokeniza igual que el modelo. Devuelve None si spaCy no está disponible.
+    """
+    modo = modo or modo_configurado()
+    modelo = modelo or getattr(settings, 'ESTRATEGIAS_NLP_MODELO', MODELO_DEFECTO)
+    try:
+        import spacy
+    except ImportError as e:
+        logger.warning("spaCy no está instalado (%s). Las funciones de PLN no estarán disponibles.", e)
+        return None
+
+    if modo == MODO_TOKENIZADOR:
+        return spacy.blank('es')
+    try:
+        if modo == MODO_COMPLETO:
+            return spacy.load(modelo)
+        return spacy.load(modelo, exclude=COMPONENTES_INNECESARIOS)
+    except OSError as e:
+        logger.warning("No se pudo cargar el modelo '%s' (%s). Se usará solo el tokenizador.", modelo, e)
+        return spacy.blank('es')
+
+
+def cargar_stopwords():
+    # Nunca descargamos recursos en el camino de una petición: si NLTK no tiene las
+    # stopwords instaladas usamos la lista equivalente que trae spaCy
+    try:
+        from nltk.corpus import stopwords
+        return frozenset(stopwords.words('spanish'))
+    except (ImportError, LookupError):
+        logger.warning("Stopwords de NLTK no disponibles (falta nltk o el corpus 'stopwords'). Se usarán las de spaCy.")
+    try:
+        from spacy.lang.es.stop_words import STOP_WORDS
+        return frozenset(STOP_WORDS)
+    except ImportError:
+        return frozenset()
+
+
+def obtener_nlp():
+    # Doble comprobación para que varios hilos no carguen el modelo a la vez
+    global _nlp
+    if _nlp is _NO_CARGADO:
+        with _lock:
+            if _nlp is _NO_CARGADO:
+                _nlp = cargar_nlp()
+    return _nlp
+
+
+def obtener_stopwords():
+    global _stopwords
+    if _stopwords is None:
+        with _lock:
+            if _stopwords is None:
+                _stopwords = cargar_stopwords()
+    return _stopwords
+
+
+def precargar():
+    """
+    Carga el modelo, las stopwords, el clasificador (si está configurado) y compila las
+    reglas ya mismo (para arranques con carga anticipada).
+    """
+    from .clasificador import obtener_clasificador
+    from .reglas import obtener_motor
+    obtener_motor(obtener_nlp())
+    obtener_stopwords()
+    obtener_clasificador()
+
+
+def preparar_para_fork():
+    """
+    Carga y calienta el modelo en el proceso actual y congela el recolector de basura.
+
+    Pensado para servidores que hacen fork de sus workers después de cargar Django
+    (p. ej. gunicorn --preload): los hijos heredan el modelo por copy-on-write, y
+    gc.freeze() evita que el recolector toque (y por tanto copie) esas páginas.
+    """
+    precargar()
+    nlp_model = obtener_nlp()
+    if nlp_model is not None:
+        for _ in nlp_model.pipe(TEXTOS_CALENTAMIENTO):
+            pass
+    gc.collect()
+    gc.freeze()
+
+
+def reiniciar():
+    """Olvida los modelos cargados; la siguiente llamada los vuelve a cargar (útil en tests)."""
+    global _nlp, _stopwords
+    with _lock:
+        _nlp = _NO_CARGADO
+        _stopwords = None
@@ -0,0 +1,135 @@
+# estrategias/pagination.py
+# Paginación por cursor (keyset) sobre (fecha_generacion, id).
+# A diferencia de OFFSET, cada página usa el índice y cuesta lo mismo que la primera,
+# sin importar cuántas estrategias haya antes.
+import base64
+import json
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Max, Q
+from django.utils.dateparse import parse_datetime
+from django.utils.functional import cached_property
+
+PAGINA_TAMANO_DEFECTO = getattr(settings, 'ESTRATEGIAS_PAGINA_TAMANO', 20)
+PAGINA_TAMANO_MAXIMO = getattr(settings, 'ESTRATEGIAS_PAGINA_TAMANO_MAXIMO', 100)
+
+# Listados del admin (PaginadorEstimado): por encima de estas filas no se cuentan exactamente
+ADMIN_CONTEO_MAXIMO = getattr(settings, 'ESTRATEGIAS_ADMIN_CONTEO_MAXIMO', 10_000)
+
+# Orden estable: a igual fecha desempata el id
+ORDEN_KEYSET = ('-fecha_generacion', '-id')
+
+
+class CursorInvalido(ValueError):
+    """El cursor recibido no se pudo decodificar."""
+
+
+def _codificar(valores):
+    # El cursor es opaco para el cliente: JSON en base64 url-safe sin relleno
+    crudo = json.dumps(valores, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(crudo).decode().rstrip('=')
+
+
+def _decodificar(cursor):
+    relleno = '=' * (-len(cursor) % 4)
+    return json.loads(base64.urlsafe_b64decode(cursor + relleno))
+
+
+def codificar_cursor(fecha, pk):
+    return _codificar([fecha.isoformat(), pk])
+
+
+def decodificar_cursor(cursor):
+    try:
+        fecha_iso, pk = _decodificar(cursor)
+        fecha = parse_datetime(fecha_iso)
+        if fecha is None or not isinstance(pk, int):
+            raise ValueError(cursor)
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise CursorInvalido(f"Cursor no válido: {cursor!r}") from e
+    return fecha, pk
+
+
+def codificar_cursor_puntuacion(puntuacion, pk):
+    # Para resultados ordenados por relevancia (ver busqueda.py) en vez de por fecha
+    return _codificar([puntuacion, pk])
+
+
+def decodificar_cursor_puntuacion(cursor):
+    try:
+        puntuacion, pk = _decodificar(cursor)
+        if not isinstance(puntuacion, (int, float)) or not isinstance(pk, int):
+            raise ValueError(cursor)
+    except (ValueError, TypeError, UnicodeDecodeError) as e:
+        raise CursorInvalido(f"Cursor no válido: {cursor!r}") from e
+    return float(puntuacion), pk
+
+
+def leer_limite(valor):
+    # Limita el tamaño de página pedido por el cliente a un rango razonable
+    try:
+        limite = int(valor)
+    except (TypeError, ValueError):
+        return PAGINA_TAMANO_DEFECTO
+    return max(1, min(limite, PAGINA_TAMANO_MAXIMO))
+
+
+def paginar_por_cursor(queryset, cursor=None, limite=PAGINA_TAMANO_DEFECTO,
+                       clave=lambda obj: (obj.fecha_generacion, obj.pk)):
+    """
+    Devuelve (elementos, siguiente_cursor) para el queryset ordenado por ORDEN_KEYSET.
+
+    `clave` extrae (fecha_generacion, id) de cada elemento, para poder paginar
+    también querysets de .values() o .values_list().
+    """
+    queryset = queryset.order_by(*ORDEN_KEYSET)
+    if cursor:
+        fecha, pk = decodificar_cursor(cursor)
+        queryset = queryset.filter(
+            Q(fecha_generacion__lt=fecha) | Q(fecha_generacion=fecha, id__lt=pk)
+        )
+
+    # Pedimos una fila de más para saber si existe una página siguiente sin hacer COUNT(*)
+    elementos = list(queryset[:limite + 1])
+    siguiente_cursor = None
+    if len(elementos) > limite:
+        elementos = elementos[:limite]
+        siguiente_cursor = codificar_cursor(*clave(elementos[-1]))
+    return elementos, siguiente_cursor
+
+
+def estimar_filas(modelo, using='default'):
+    """
+    Filas aproximadas de la tabla de `modelo` sin recorrerla: las estadísticas del
+    planificador en PostgreSQL (pg_class.reltuples) o, si no hay, el mayor id, que solo
+    sobrestima en las filas borradas.
+    """
+    conexion = connections[using]
+    if conexion.vendor == 'postgresql':
+        with conexion.cursor() as cursor:
+            cursor.execute('SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass', [modelo._meta.db_table])
+            fila = cursor.fetchone()
+        # -1 (o 0 antes de PostgreSQL 14) si la tabla aún no se ha analizado
+        if fila and fila[0] > 0:
+            return fila[0]
+    return modelo._default_manager.using(using).aggregate(maximo=Max('pk'))['maximo'] or 0
+
+
+class PaginadorEstimado(Paginator):
+    """
+    Paginator de los listados del admin sin COUNT(*) exacto sobre tablas grandes. Sin
+    filtros, el total es estimar_filas() si pasa de ADMIN_CONTEO_MAXIMO; con filtros o
+    búsqueda se cuentan como mucho ADMIN_CONTEO_MAXIMO filas (las demás páginas se alcanzan
+    afinando los filtros). Las tablas pequeñas se cuentan siempre exactamente.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimadas = estimar_filas(queryset.model, queryset.db)
+            if estimadas > ADMIN_CONTEO_MAXIMO:
+                return estimadas
+        return queryset.order_by()[:ADMIN_CONTEO_MAXIMO].count()
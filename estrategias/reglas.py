@@ -0,0 +1,174 @@
+# estrategias/reglas.py
+# Motor de reglas declarativo para generar_estrategia_ia.
+#
+# Las reglas viven en una tabla JSON (estrategias/reglas.json por defecto, o la ruta de
+# ESTRATEGIAS_REGLAS_ARCHIVO) y se compilan una sola vez por modelo de PLN:
+#   - los sectores y tamaños quedan en diccionarios (búsqueda O(1)),
+#   - todas las frases disparadoras van a un único PhraseMatcher de spaCy, de modo que
+#     cada documento se recorre una sola vez sin importar cuántas reglas haya,
+#   - las palabras de "desafío" se unen en una expresión regular precompilada.
+# A diferencia del antiguo if/elif, las frases de varias palabras ('bajo presupuesto',
+# 'costos altos'...) ahora sí coinciden, porque se comparan contra la secuencia de tokens.
+import hashlib
+import json
+import random
+import re
+import threading
+from pathlib import Path
+
+from django.conf import settings
+
+ARCHIVO_REGLAS_DEFECTO = Path(__file__).resolve().with_name('reglas.json')
+
+_lock = threading.Lock()
+_tabla = None
+_motores = {} # id(vocab) -> (nlp, MotorReglas); guardamos nlp para que el id no se reutilice
+
+
+def cargar_tabla(ruta=None):
+    ruta = ruta or getattr(settings, 'ESTRATEGIAS_REGLAS_ARCHIVO', ARCHIVO_REGLAS_DEFECTO)
+    with open(ruta, encoding='utf-8') as archivo:
+        return json.load(archivo)
+
+
+def version_tabla(tabla):
+    """Huella corta del contenido de la tabla; cambia en cuanto cambia cualquier regla."""
+    canonica = json.dumps(tabla, sort_keys=True, ensure_ascii=False).encode()
+    return hashlib.sha1(canonica).hexdigest()[:12]
+
+
+class MotorReglas:
+    def __init__(self, tabla, nlp_model=None):
+        self.version = version_tabla(tabla)
+        self._generico = tabla['generico']
+        self._tamanos = tabla.get('tamanos', {})
+        self._recursos = tabla.get('recursos', [])
+        self._patron_desafios = re.compile('|'.join(map(re.escape, tabla.get('desafios', []))) or r'(?!)')
+
+        # Para cada sector: (frase -> índice de la primera regla que la usa, reglas, regla por defecto)
+        self._sectores = {
+            sector: (self._indexar(datos['reglas']), datos['reglas'], datos['defecto'])
+            for sector, datos in tabla['sectores'].items()
+        }
+        self._indice_recursos = self._indexar(self._recursos)
+
+        self._matcher = None
+        self._frases_por_id = {}
+        if nlp_model is not None:
+            from spacy.matcher import PhraseMatcher
+            self._matcher = PhraseMatcher(nlp_model.vocab, attr='LOWER')
+            frases = set(self._indice_recursos)
+            for indice, _, _ in self._sectores.values():
+                frases.update(indice)
+            for frase in frases:
+                self._matcher.add(frase, [nlp_model.make_doc(frase)])
+                self._frases_por_id[nlp_model.vocab.strings[frase]] = frase
+
+    @staticmethod
+    def _indexar(reglas):
+        indice = {}
+        for posicion, regla in enumerate(reglas):
+            for frase in regla['frases']:
+                # Respetamos el orden del antiguo if/elif: gana la primera regla que menciona la frase
+                indice.setdefault(frase.lower(), posicion)
+        return indice
+
+    def _frases_encontradas(self, doc):
+        if self._matcher is None:
+            return set()
+        return {self._frases_por_id[match_id] for match_id, _, _ in self._matcher(doc)}
+
+    @staticmethod
+    def _primera_regla(indice, encontradas):
+        return min((indice[frase] for frase in encontradas if frase in indice), default=None)
+
+    def tiene_reglas_propias(self, sector):
+        return sector.lower() in self._sectores
+
+    def aplicar(self, empresa_data, docs, azar=None, tipo=None):
+        """
+        Genera la estrategia para `empresa_data` a partir de `docs`, la pareja
+        (doc_descripcion, doc_recursos) analizada por spaCy, o None si no hay PLN.
+
+        En la rama genérica el tipo es `tipo` (el que predice el clasificador, si lo hay)
+        o lo decide `azar` (un random.Random); por defecto se usa el generador global del
+        módulo random.
+        """
+        sector_empresa = empresa_data['sector'].lower()
+        tamano_empresa = empresa_data['tamano']
+        formato = {'tamano': tamano_empresa, 'sector': sector_empresa}
+
+        frases_descripcion, frases_recursos = set(), set()
+        tiene_desafio = False
+        if docs is not None:
+            doc_descripcion, doc_recursos = docs
+            frases_descripcion = self._frases_encontradas(doc_descripcion)
+            frases_recursos = self._frases_encontradas(doc_recursos)
+            tiene_desafio = self._patron_desafios.search(empresa_data['descripcion_negocio'].lower()) is not None
+
+        # Regla según el sector, o la estrategia genérica si el sector no tiene reglas propias
+        if sector_empresa in self._sectores:
+            indice, reglas, defecto = self._sectores[sector_empresa]
+            posicion = self._primera_regla(indice, frases_descripcion)
+            regla = defecto if posicion is None else reglas[posicion]
+            tipo_elegido = regla['tipo']
+            estrategia_generada = regla['estrategia'].format(**formato)
+            impacto = regla['impacto']
+        else:
+            generico = self._generico
+            tipo_elegido = tipo or (azar or random).choice(generico['tipos'])
+            estrategia_generada = generico['estrategia'].format(**formato)
+            if tiene_desafio:
+                estrategia_generada += generico['desafio']
+            estrategia_generada += generico['cierre']
+            impacto = generico['impacto']
+
+        # Complementos según el tamaño y los recursos disponibles
+        complementos = [self._tamanos.get(tamano_empresa)]
+        posicion = self._primera_regla(self._indice_recursos, frases_recursos)
+        if posicion is not None:
+            complementos.append(self._recursos[posicion])
+        for complemento in filter(None, complementos):
+            estrategia_generada += complemento['estrategia']
+            impacto += complemento['impacto']
+
+        return {
+            'tipo_estrategia': tipo_elegido,
+            'descripcion_estrategia': estrategia_generada,
+            'impacto_estimado': impacto
+        }
+
+
+def obtener_tabla():
+    global _tabla
+    if _tabla is None:
+        with _lock:
+            if _tabla is None:
+                _tabla = cargar_tabla()
+    return _tabla
+
+
+def version_reglas():
+    """Versión de la tabla de reglas en uso, sin necesidad de compilar un motor con PLN."""
+    return obtener_motor(None).version
+
+
+def obtener_motor(nlp_model):
+    """Devuelve el motor compilado para el vocabulario de `nlp_model` (o sin PLN si es None)."""
+    clave = id(nlp_model.vocab) if nlp_model is not None else None
+    entrada = _motores.get(clave)
+    if entrada is None:
+        tabla = obtener_tabla()
+        with _lock:
+            entrada = _motores.get(clave)
+            if entrada is None:
+                entrada = _motores[clave] = (nlp_model, MotorReglas(tabla, nlp_model))
+    return entrada[1]
+
+
+def recargar_reglas():
+    """Vuelve a leer la tabla de reglas y descarta los motores compilados con la anterior."""
+    global _tabla
+    with _lock:
+        _tabla = None
+        _motores.clear()
@@ -0,0 +1,198 @@
+# estrategias/servicios.py
+# Operaciones de escritura de la app que no dependen de una vista concreta.
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import cache_detalle, estadisticas, similares
+from . import nlp as proveedor_nlp
+from .cache_generacion import generar_estrategias_cacheadas_lote
+from .forms import EmpresaForm
+from .models import CAMPOS_CONTENIDO, Empresa, Estrategia, calcular_hash_contenido, normalizar_nombre
+
+# Número máximo de empresas aceptadas en una sola petición por lotes
+LOTE_MAXIMO = getattr(settings, 'ESTRATEGIAS_LOTE_MAXIMO', 500)
+
+# Columnas que se reescriben cuando una empresa ya existe y su contenido cambió
+CAMPOS_UPSERT = CAMPOS_CONTENIDO + ['hash_contenido']
+
+
+def _sql_upsert_empresa():
+    tabla = connection.ops.quote_name(Empresa._meta.db_table)
+    columnas = CAMPOS_UPSERT + ['nombre_normalizado', 'fecha_creacion']
+    return (
+        f'INSERT INTO {tabla} ({", ".join(map(connection.ops.quote_name, columnas))}) '
+        f'VALUES ({", ".join(["%s"] * len(columnas))}) '
+        f'ON CONFLICT ({connection.ops.quote_name("nombre_normalizado")}) DO UPDATE SET '
+        + ', '.join(f'{columna} = excluded.{columna}' for columna in map(connection.ops.quote_name, CAMPOS_UPSERT))
+        # fecha_creacion no se actualiza
+        + ' RETURNING id'
+    )
+
+
+def upsert_empresa(datos):
+    """
+    Crea la empresa o actualiza la existente con el mismo nombre normalizado. La fila
+    existente se lee bloqueada (EmpresaQuerySet.bloquear): si los datos no cambiaron (mismo
+    hash_contenido) no se escribe nada; si no, un INSERT ... ON CONFLICT DO UPDATE la crea o
+    la actualiza y, si cambiaron su sector o su tamaño, sus estrategias pasan a la nueva
+    combinación de las estadísticas diarias en la misma transacción. Sin condiciones de
+    carrera: dos peticiones simultáneas con el mismo nombre acaban en la misma fila.
+
+    Devuelve una Empresa con id y los CAMPOS_CONTENIDO de `datos` (sin fecha_creacion).
+    """
+    empresa = Empresa(**{campo: datos[campo] for campo in CAMPOS_CONTENIDO})
+    empresa.actualizar_campos_derivados()
+
+    features = connection.features
+    if not (features.supports_update_conflicts_with_target and features.can_return_columns_from_insert):
+        # Bases de datos sin ON CONFLICT ... RETURNING (Empresa.save() ajusta las estadísticas)
+        with transaction.atomic():
+            existente, creada = Empresa.objects.select_for_update().get_or_create(
+                nombre_normalizado=empresa.nombre_normalizado,
+                defaults={campo: datos[campo] for campo in CAMPOS_CONTENIDO},
+            )
+            if not creada and existente.hash_contenido != empresa.hash_contenido:
+                for campo in CAMPOS_CONTENIDO:
+                    setattr(existente, campo, datos[campo])
+                existente.save(update_fields=CAMPOS_CONTENIDO)
+        return existente
+
+    with transaction.atomic(savepoint=False):
+        existente = Empresa.objects.bloquear('nombre_normalizado', [empresa.nombre_normalizado]).get(
+            empresa.nombre_normalizado
+        )
+        if existente is not None and existente.hash_contenido == empresa.hash_contenido:
+            empresa.id = existente.id
+            return empresa
+
+        fecha_creacion = Empresa._meta.get_field('fecha_creacion').get_db_prep_value(timezone.now(), connection)
+        valores = [getattr(empresa, campo) for campo in CAMPOS_UPSERT] + [empresa.nombre_normalizado, fecha_creacion]
+        with connection.cursor() as cursor:
+            cursor.execute(_sql_upsert_empresa(), valores)
+            empresa.id = cursor.fetchone()[0]
+        # Insertada o actualizada (sin save(), así que sin señales): sus páginas de detalle
+        # cambian y, si ya existía, el índice de similares tiene que volver a leerla
+        cache_detalle.invalidar_empresas([empresa.id])
+        if existente is not None:
+            similares.registrar_cambios([empresa.id])
+            estadisticas.mover_empresas(
+                {existente.id: (existente.sector, existente.tamano)}, {empresa.id: (empresa.sector, empresa.tamano)},
+            )
+    return empresa
+
+
+def registrar_estrategia(datos, estrategia_info, fecha_generacion=None):
+    """
+    Guarda la empresa (upsert_empresa) y su nueva estrategia en una sola transacción.
+    `estrategia_info` son los campos de Estrategia (lo que devuelve generar_estrategia_ia).
+    Con `fecha_generacion` (p. ej. datos de ejemplo con fechas pasadas) la estrategia se
+    guarda con esa fecha en lugar de la actual. Devuelve (empresa, estrategia).
+    """
+    with transaction.atomic():
+        empresa = upsert_empresa(datos)
+        if fecha_generacion is None:
+            estrategia = Estrategia.objects.create(empresa=empresa, **estrategia_info)
+        else:
+            # auto_now_add ignora la fecha pasada: bulk_create la vuelve a poner con un UPDATE
+            estrategia, = Estrategia.objects.bulk_create(
+                [Estrategia(empresa=empresa, fecha_generacion=fecha_generacion, **estrategia_info)],
+                conservar_fechas=True,
+            )
+    return empresa, estrategia
+
+
+def _upsert_empresas(lista_datos):
+    """
+    Crea o actualiza las empresas de un lote en dos sentencias como máximo: un
+    SELECT ... IN para conocer los hashes actuales y un INSERT ... ON CONFLICT DO UPDATE
+    (bulk_create con update_conflicts) solo para las nuevas y las que cambiaron.
+    Devuelve {nombre normalizado: Empresa}.
+    """
+    # Si el mismo nombre aparece varias veces en el lote, gana la última aparición
+    datos_por_nombre = {normalizar_nombre(datos['nombre']): datos for datos in lista_datos}
+
+    empresas = {
+        empresa.nombre_normalizado: empresa
+        for empresa in Empresa.objects.filter(nombre_normalizado__in=datos_por_nombre)
+                                      .only('id', 'nombre', 'nombre_normalizado', 'hash_contenido')
+    }
+
+    pendientes = []
+    for nombre, datos in datos_por_nombre.items():
+        existente = empresas.get(nombre)
+        if existente is None or existente.hash_contenido != calcular_hash_contenido(datos):
+            empresas[nombre] = Empresa(**{campo: datos[campo] for campo in CAMPOS_CONTENIDO})
+            pendientes.append(empresas[nombre])
+
+    # Si otra petición inserta la misma empresa entre el SELECT y aquí, ON CONFLICT la actualiza
+    Empresa.objects.bulk_create(
+        pendientes, update_conflicts=True, unique_fields=['nombre_normalizado'], update_fields=CAMPOS_UPSERT,
+    )
+    return empresas
+
+
+def guardar_estrategias_lote(lista_cleaned_data, estrategias_info):
+    """
+    Guarda en una transacción las empresas de un lote (cleaned_data de EmpresaForm) y sus
+    estrategias ya generadas (una por empresa, en el mismo orden). Devuelve las Estrategia.
+    """
+    with transaction.atomic():
+        empresas = _upsert_empresas(lista_cleaned_data)
+        return Estrategia.objects.bulk_create([
+            Estrategia(empresa=empresas[normalizar_nombre(cleaned_data['nombre'])], **info)
+            for cleaned_data, info in zip(lista_cleaned_data, estrategias_info)
+        ])
+
+
+def registrar_estrategias_lote(lista_cleaned_data, batch_size=None):
+    """
+    Genera las estrategias de una lista de empresas ya validadas con un único nlp.pipe()
+    y las guarda (guardar_estrategias_lote). Devuelve las Estrategia, en el orden de entrada.
+    """
+    if not lista_cleaned_data:
+        return []
+    estrategias_info = generar_estrategias_cacheadas_lote(
+        lista_cleaned_data,
+        proveedor_nlp.obtener_nlp(),
+        proveedor_nlp.obtener_stopwords(),
+        batch_size=batch_size,
+    )
+    return guardar_estrategias_lote(lista_cleaned_data, estrategias_info)
+
+
+def generar_estrategias_en_lote(lista_datos, batch_size=None):
+    """
+    Valida y genera estrategias para una lista de empresas (diccionarios con los
+    campos de EmpresaForm).
+
+    Todo el texto pasa por un único nlp.pipe() y todas las escrituras ocurren en una
+    transacción. Devuelve una lista con un resultado por empresa, en el orden de
+    entrada: {'success': True, 'estrategia_id': ..., ...} o {'success': False, 'errors': ...}.
+    """
+    resultados = [None] * len(lista_datos)
+    validos = [] # Parejas (posición en la entrada, cleaned_data)
+    for posicion, datos in enumerate(lista_datos):
+        form = EmpresaForm(datos if isinstance(datos, dict) else {})
+        if form.is_valid():
+            validos.append((posicion, form.cleaned_data))
+        else:
+            resultados[posicion] = {'success': False, 'errors': form.errors}
+
+    if not validos:
+        return resultados
+
+    nuevas_estrategias = registrar_estrategias_lote(
+        [cleaned_data for _, cleaned_data in validos], batch_size=batch_size
+    )
+
+    for (posicion, cleaned_data), estrategia in zip(validos, nuevas_estrategias):
+        resultados[posicion] = {
+            'success': True,
+            'estrategia_id': estrategia.id,
+            'nombre_empresa': cleaned_data['nombre'],
+            'tipo_estrategia': estrategia.tipo_estrategia,
+            'descripcion_estrategia': estrategia.descripcion_estrategia,
+            'impacto_estimado': estrategia.impacto_estimado,
+        }
+    return resultados
@@ -0,0 +1,542 @@
+# estrategias/similares.py
+# Empresas parecidas a una dada (por sector y descripción del negocio) y su última estrategia.
+#
+# Cada empresa es un vector TF-IDF disperso: HashingVectorizer (sin vocabulario que ajustar)
+# ponderado con el idf de la tabla y normalizado (norma L2), así que el producto escalar de
+# dos vectores es su similitud del coseno. El índice tiene dos partes:
+#
+#   - Base: un índice invertido de todas las empresas, construido con el comando
+#     actualizar_similares (p. ej. desde cron) y guardado como arrays de NumPy (.npy) en
+#     ESTRATEGIAS_SIMILARES_DIR. Se carga con mmap_mode='r': todos los procesos comparten las
+#     páginas del archivo y arrancar no cuesta leerlo entero. Las entradas de cada término
+#     están ordenadas por peso descendente y una consulta solo lee las
+#     ESTRATEGIAS_SIMILARES_ENTRADAS primeras de sus términos más pesados: el coste no crece
+#     con la tabla (a cambio, una coincidencia que solo comparte términos muy frecuentes
+#     puede quedarse fuera).
+#   - Cambios: las empresas creadas después de construir la base (id mayor que el último
+#     indexado) y las modificadas (CambioIndiceSimilares, que se escribe en la misma
+#     transacción que el cambio, donde se invalida la caché de detalle). Cada proceso las lee
+#     como mucho cada ESTRATEGIAS_SIMILARES_REFRESCO segundos, las vectoriza en memoria y las
+#     compara una a una; su versión sustituye a la de la base.
+#
+# Los ids se reparten al insertar, no al confirmar: en PostgreSQL una transacción lenta puede
+# confirmar una fila con un id menor que otros ya leídos. Por eso cada lectura vuelve a
+# comprobar los ESTRATEGIAS_SIMILARES_VENTANA ids anteriores al último leído (de empresas y
+# de cambios) y solo vectoriza los que aún no conoce.
+#
+# Los cambios en memoria se acotan a ESTRATEGIAS_SIMILARES_CAMBIOS_MAXIMO empresas. Al
+# llegar al límite el proceso deja de leer cambios hasta que se reconstruya la base (y lo
+# avisa en el log); sin base, con más empresas que el límite, no responde
+# (IndiceNoDisponible) en lugar de vectorizar la tabla entera en cada proceso.
+#
+# Las empresas borradas desaparecen de los resultados al leerlas de la base de datos, y del
+# índice en la siguiente reconstrucción.
+import datetime
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.db.models import OuterRef, Subquery
+from django.urls import reverse
+
+from .exportacion import FiltroInvalido
+from .models import CambioIndiceSimilares, Empresa, Estrategia
+
+logger = logging.getLogger(__name__)
+
+# Carpeta del índice base (se crea con actualizar_similares)
+DIRECTORIO = getattr(settings, 'ESTRATEGIAS_SIMILARES_DIR', None) or os.path.join(settings.BASE_DIR, 'indice_similares')
+# Segundos entre dos lecturas de las empresas nuevas o modificadas en cada proceso
+REFRESCO = getattr(settings, 'ESTRATEGIAS_SIMILARES_REFRESCO', 5)
+# Entradas leídas por término de la consulta, de la de más peso a la de menos
+ENTRADAS_POR_TERMINO = getattr(settings, 'ESTRATEGIAS_SIMILARES_ENTRADAS', 2000)
+# Ids por debajo del último leído que se vuelven a comprobar en cada lectura de cambios
+VENTANA = getattr(settings, 'ESTRATEGIAS_SIMILARES_VENTANA', 1000)
+# Empresas nuevas o modificadas que un proceso guarda en memoria hasta la siguiente reconstrucción
+CAMBIOS_MAXIMO = getattr(settings, 'ESTRATEGIAS_SIMILARES_CAMBIOS_MAXIMO', 50_000)
+
+# Sube si cambia el contenido de los archivos del índice
+FORMATO = 1
+N_FEATURES = 2 ** 20
+TERMINOS_CONSULTA = 16
+K_DEFECTO = 5
+K_MAXIMO = 20
+CONSTRUCCION_CHUNK = 10_000
+LECTURA_CHUNK = 500
+METADATOS = 'actual.json'
+
+_NO_CARGADO = object()
+_lock = threading.Lock()
+_indice = _NO_CARGADO
+
+
+class IndiceNoDisponible(Exception):
+    """No hay base y hay más empresas de las que caben en memoria (CAMBIOS_MAXIMO)."""
+
+
+def texto_empresa(sector, descripcion_negocio):
+    sector = '_'.join((sector or '').lower().split())
+    return f'sector_{sector} {descripcion_negocio or ""}'
+
+
+def _palabras_vacias():
+    from sklearn.feature_extraction.text import strip_accents_unicode
+    from . import nlp as proveedor_nlp
+    # El vectorizador quita los acentos antes de comparar con la lista
+    return sorted({strip_accents_unicode(palabra.lower()) for palabra in proveedor_nlp.obtener_stopwords()})
+
+
+def _vectorizador(palabras_vacias, n_features=N_FEATURES):
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+    # Cuentas sin normalizar: el idf se aplica después
+    return HashingVectorizer(
+        n_features=n_features, ngram_range=(1, 2), alternate_sign=False, norm=None,
+        strip_accents='unicode', stop_words=palabras_vacias or None, dtype=np.float32,
+    )
+
+
+def _ponderar(matriz, idf):
+    # TF-IDF con norma L2 por fila (in situ sobre una matriz CSR de cuentas)
+    from sklearn.preprocessing import normalize
+    matriz.data *= idf[matriz.indices]
+    return normalize(matriz, copy=False)
+
+
+class Base:
+    """Índice invertido de ESTRATEGIAS_SIMILARES_DIR, con los arrays mapeados en memoria."""
+
+    def __init__(self, directorio, metadatos):
+        import numpy as np
+        ruta = os.path.join(directorio, metadatos['segmento'])
+
+        def cargar(nombre):
+            return np.load(os.path.join(ruta, f'{nombre}.npy'), mmap_mode='r')
+        self.version = metadatos['version']
+        self.filas = metadatos['filas']
+        self.ultimo_empresa_id = metadatos['ultimo_empresa_id']
+        self.ultimo_cambio_id = metadatos['ultimo_cambio_id']
+        self.palabras_vacias = metadatos['palabras_vacias']
+        self.n_features = metadatos['n_features']
+        self.idf = np.asarray(cargar('idf'))
+        self._inicio_terminos = cargar('inicio_terminos') # Entradas del término t: [inicio[t], inicio[t + 1])
+        self._entradas_fila = cargar('entradas_fila')
+        self._entradas_peso = cargar('entradas_peso')
+        self._empresas = cargar('empresas') # Id de la empresa de cada fila, en orden
+
+    def ids_desde(self, desde):
+        """Ids de las empresas indexadas mayores que `desde` (el final del array)."""
+        import numpy as np
+        return self._empresas[int(np.searchsorted(self._empresas, desde, side='right')):]
+
+    def puntuar(self, terminos, pesos, entradas_por_termino):
+        """(ids de empresa, similitud) de las filas con algún término de la consulta."""
+        import numpy as np
+        filas, contribuciones = [], []
+        for termino, peso in zip(terminos, pesos):
+            inicio = int(self._inicio_terminos[termino])
+            fin = min(int(self._inicio_terminos[termino + 1]), inicio + entradas_por_termino)
+            if fin > inicio:
+                filas.append(self._entradas_fila[inicio:fin])
+                contribuciones.append(self._entradas_peso[inicio:fin] * peso)
+        if not filas:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        unicas, posiciones = np.unique(np.concatenate(filas), return_inverse=True)
+        return self._empresas[unicas], np.bincount(posiciones, weights=np.concatenate(contribuciones))
+
+
+class Indice:
+    """La base (si hay) y, en memoria, las empresas creadas o cambiadas después de construirla."""
+
+    def __init__(self, directorio=DIRECTORIO, refresco=REFRESCO, entradas_por_termino=ENTRADAS_POR_TERMINO,
+                 ventana=VENTANA, cambios_maximo=CAMBIOS_MAXIMO):
+        self.directorio = directorio
+        self.refresco = refresco
+        self.entradas_por_termino = entradas_por_termino
+        self.ventana = ventana
+        self.cambios_maximo = cambios_maximo
+        self._lock = threading.Lock()
+        self._marca_base = None
+        self._proximo_refresco = 0.0
+        self._preparar(self._leer_base())
+
+    def _leer_base(self):
+        ruta = os.path.join(self.directorio, METADATOS)
+        try:
+            marca = os.stat(ruta).st_mtime_ns
+            if marca == self._marca_base:
+                return self.base
+            with open(ruta, encoding='utf-8') as archivo:
+                metadatos = json.load(archivo)
+            if metadatos.get('formato') != FORMATO:
+                raise ValueError(f"formato {metadatos.get('formato')!r}, se esperaba {FORMATO}")
+            base = Base(self.directorio, metadatos)
+        except FileNotFoundError:
+            return None
+        except (OSError, KeyError, ValueError) as e:
+            logger.warning("No se pudo cargar el índice de similares de '%s' (%s).", self.directorio, e)
+            return None
+        self._marca_base = marca
+        return base
+
+    def _preparar(self, base):
+        import numpy as np
+        self.base = base
+        if base is None:
+            self._vectorizador = _vectorizador(_palabras_vacias())
+            self._idf = np.ones(N_FEATURES, dtype=np.float32)
+        else:
+            self._vectorizador = _vectorizador(base.palabras_vacias, base.n_features)
+            self._idf = base.idf
+        self._ultimo_empresa_id = base.ultimo_empresa_id if base else 0
+        self._ultimo_cambio_id = base.ultimo_cambio_id if base else 0
+        self._cambiadas = {} # empresa_id -> (términos, pesos) de su vector
+        self._cambios_leidos = set() # Ids de CambioIndiceSimilares dentro de la ventana ya aplicados
+        self._lleno = False # Se llegó a cambios_maximo: no se leen más cambios hasta otra base
+        # Las cambiadas en arrays planos: (ids, términos, pesos, posición de la empresa de cada
+        # entrada). Se sustituye la tupla entera para que las búsquedas en curso en otros
+        # hilos sigan viendo la anterior
+        self._cambios = (np.empty(0, dtype=np.int64),)
+
+    def vectorizar(self, textos):
+        return _ponderar(self._vectorizador.transform(textos), self._idf)
+
+    def refrescar(self, forzar=False):
+        """Recarga la base si se reconstruyó y lee las empresas nuevas o cambiadas."""
+        if not forzar and time.monotonic() < self._proximo_refresco:
+            return
+        with self._lock:
+            if not forzar and time.monotonic() < self._proximo_refresco:
+                return
+            base = self._leer_base()
+            if base is not self.base:
+                self._preparar(base)
+            self._leer_cambios()
+            self._proximo_refresco = time.monotonic() + self.refresco
+
+    def _leer_cambios(self):
+        import numpy as np
+        if self._lleno:
+            return
+        desde_cambio = self._ultimo_cambio_id - self.ventana
+        cambios = [
+            (pk, empresa_id) for pk, empresa_id in
+            CambioIndiceSimilares.objects.filter(id__gt=desde_cambio).order_by('id').values_list('id', 'empresa_id')
+            if pk not in self._cambios_leidos
+        ]
+        # Empresas de la ventana y posteriores que no están ni en la base ni en memoria
+        desde_empresa = self._ultimo_empresa_id - self.ventana
+        ids = list(
+            Empresa.objects.filter(id__gt=desde_empresa).order_by('id')
+            .values_list('id', flat=True)[:self.cambios_maximo + self.ventana + 1]
+        )
+        conocidas = set(self.base.ids_desde(desde_empresa).tolist()) if self.base is not None else set()
+        pendientes = {pk for pk in ids if pk not in conocidas and pk not in self._cambiadas}
+        pendientes.update(empresa_id for _, empresa_id in cambios)
+        if len(self._cambiadas.keys() | pendientes) > self.cambios_maximo:
+            self._lleno = True
+            if self.base is not None:
+                logger.warning(
+                    "El índice de similares tiene más de %s empresas cambiadas en memoria; no se leerán más "
+                    "cambios hasta que se reconstruya con actualizar_similares.", self.cambios_maximo,
+                )
+            return
+
+        filas = []
+        pendientes = sorted(pendientes)
+        for inicio in range(0, len(pendientes), LECTURA_CHUNK):
+            filas += Empresa.objects.filter(id__in=pendientes[inicio:inicio + LECTURA_CHUNK]).values_list(
+                'id', 'sector', 'descripcion_negocio'
+            )
+        if ids:
+            self._ultimo_empresa_id = max(self._ultimo_empresa_id, ids[-1])
+        if cambios:
+            self._ultimo_cambio_id = max(self._ultimo_cambio_id, cambios[-1][0])
+            self._cambios_leidos.update(pk for pk, _ in cambios)
+        self._cambios_leidos = {pk for pk in self._cambios_leidos if pk > self._ultimo_cambio_id - self.ventana}
+        if not filas:
+            return
+        vectores = self.vectorizar([texto_empresa(sector, descripcion) for _, sector, descripcion in filas])
+        for posicion, (empresa_id, _, _) in enumerate(filas):
+            inicio, fin = vectores.indptr[posicion], vectores.indptr[posicion + 1]
+            self._cambiadas[empresa_id] = (vectores.indices[inicio:fin], vectores.data[inicio:fin])
+        terminos, pesos = zip(*self._cambiadas.values())
+        self._cambios = (
+            np.fromiter(self._cambiadas, dtype=np.int64, count=len(self._cambiadas)),
+            np.concatenate(terminos),
+            np.concatenate(pesos),
+            np.repeat(np.arange(len(terminos)), [len(t) for t in terminos]),
+        )
+
+    def buscar(self, texto, k=K_DEFECTO, excluir=()):
+        """Las `k` empresas más parecidas a `texto`: lista de (empresa_id, similitud)."""
+        import numpy as np
+        self.refrescar()
+        if self.base is None and self._lleno:
+            raise IndiceNoDisponible(
+                'El índice de empresas similares no está construido (python manage.py actualizar_similares).'
+            )
+        consulta = self.vectorizar([texto])
+        if not consulta.nnz:
+            return []
+        excluir = np.fromiter(excluir, dtype=np.int64)
+        cambios = self._cambios
+        ids_cambiadas = cambios[0]
+        ids, similitudes = [], []
+
+        base = self.base
+        if base is not None:
+            # Solo los términos de más peso de la consulta: son los que más suman
+            orden = np.argsort(-consulta.data)[:TERMINOS_CONSULTA]
+            encontradas, puntos = base.puntuar(consulta.indices[orden], consulta.data[orden], self.entradas_por_termino)
+            # La versión en memoria de una empresa cambiada sustituye a la de la base
+            validas = ~np.isin(encontradas, ids_cambiadas) & ~np.isin(encontradas, excluir)
+            ids.append(encontradas[validas])
+            similitudes.append(puntos[validas])
+        if len(ids_cambiadas):
+            puntos = _puntuar_cambios(cambios, consulta.indices, consulta.data)
+            validas = (puntos > 0) & ~np.isin(ids_cambiadas, excluir)
+            ids.append(ids_cambiadas[validas])
+            similitudes.append(puntos[validas])
+        if not ids:
+            return []
+
+        ids, similitudes = np.concatenate(ids), np.concatenate(similitudes)
+        if len(ids) > k:
+            mejores = np.argpartition(-similitudes, k)[:k]
+            ids, similitudes = ids[mejores], similitudes[mejores]
+        orden = np.lexsort((ids, -similitudes))
+        return [(int(ids[posicion]), float(similitudes[posicion])) for posicion in orden]
+
+
+def _puntuar_cambios(cambios, terminos_consulta, pesos_consulta):
+    # Producto escalar de la consulta con cada empresa cambiada, recorriendo solo sus
+    # entradas (sin arrays del tamaño del espacio de hashing)
+    import numpy as np
+    ids, terminos, pesos, posiciones = cambios
+    orden = np.argsort(terminos_consulta)
+    terminos_consulta, pesos_consulta = terminos_consulta[orden], pesos_consulta[orden]
+    encontrados = np.searchsorted(terminos_consulta, terminos).clip(max=len(terminos_consulta) - 1)
+    coinciden = terminos_consulta[encontrados] == terminos
+    return np.bincount(
+        posiciones[coinciden], weights=pesos[coinciden] * pesos_consulta[encontrados[coinciden]], minlength=len(ids)
+    )
+
+
+def construir(directorio=DIRECTORIO, chunk_size=CONSTRUCCION_CHUNK):
+    """
+    Construye el índice base con todas las empresas y lo escribe en `directorio`. Los
+    procesos que tengan cargada la base anterior la cambian por esta en su siguiente
+    refresco. Devuelve sus metadatos.
+    """
+    import numpy as np
+    import scipy.sparse
+
+    # Los cambios registrados hasta aquí quedan incluidos en la lectura de las empresas;
+    # los posteriores se siguen aplicando en memoria hasta la siguiente reconstrucción
+    ultimo_cambio_id = CambioIndiceSimilares.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    palabras_vacias = _palabras_vacias()
+    vectorizador = _vectorizador(palabras_vacias)
+    ids, matrices, tanda = [], [], []
+
+    def vectorizar_tanda():
+        ids.append(np.fromiter((empresa_id for empresa_id, _, _ in tanda), dtype=np.int64, count=len(tanda)))
+        matrices.append(vectorizador.transform([texto_empresa(sector, descripcion) for _, sector, descripcion in tanda]))
+        tanda.clear()
+
+    for fila in Empresa.objects.order_by('id').values_list('id', 'sector', 'descripcion_negocio').iterator(chunk_size=chunk_size):
+        tanda.append(fila)
+        if len(tanda) >= chunk_size:
+            vectorizar_tanda()
+    if tanda:
+        vectorizar_tanda()
+
+    empresas = np.concatenate(ids) if ids else np.empty(0, dtype=np.int64)
+    matriz = scipy.sparse.vstack(matrices, format='csr') if matrices else scipy.sparse.csr_matrix((0, N_FEATURES), dtype=np.float32)
+    filas = len(empresas)
+    # idf suavizado, como TfidfTransformer: log((1 + n) / (1 + df)) + 1
+    documentos = np.bincount(matriz.indices, minlength=N_FEATURES)
+    idf = (np.log((1 + filas) / (1 + documentos)) + 1).astype(np.float32)
+    matriz = _ponderar(matriz, idf)
+
+    # Índice invertido: entradas (fila, peso) agrupadas por término y, dentro de cada
+    # término, de mayor a menor peso
+    entradas_fila = np.repeat(np.arange(filas, dtype=np.int32), np.diff(matriz.indptr))
+    orden = np.lexsort((-matriz.data, matriz.indices))
+    inicio_terminos = np.zeros(N_FEATURES + 1, dtype=np.int64)
+    np.cumsum(np.bincount(matriz.indices, minlength=N_FEATURES), out=inicio_terminos[1:])
+
+    version = uuid.uuid4().hex[:12]
+    metadatos = {
+        'formato': FORMATO,
+        'version': version,
+        'segmento': f'segmento-{version}',
+        'filas': filas,
+        'ultimo_empresa_id': int(empresas.max()) if filas else 0,
+        'ultimo_cambio_id': ultimo_cambio_id,
+        'n_features': N_FEATURES,
+        'palabras_vacias': palabras_vacias,
+        'construido': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+    }
+    _escribir(directorio, metadatos, {
+        'idf': idf,
+        'inicio_terminos': inicio_terminos,
+        'entradas_fila': entradas_fila[orden],
+        'entradas_peso': matriz.data[orden],
+        'empresas': empresas,
+    })
+    CambioIndiceSimilares.objects.filter(id__lte=ultimo_cambio_id).delete()
+    return metadatos
+
+
+def _escribir(directorio, metadatos, arrays):
+    # Cada construcción va en su propia carpeta y actual.json se reemplaza al final de una
+    # vez: un proceso nunca ve una base a medio escribir. Las carpetas anteriores se borran;
+    # los procesos que aún las tienen mapeadas siguen leyéndolas hasta que recargan
+    import numpy as np
+    os.makedirs(directorio, exist_ok=True)
+    segmento = os.path.join(directorio, metadatos['segmento'])
+    os.makedirs(segmento)
+    for nombre, array in arrays.items():
+        np.save(os.path.join(segmento, f'{nombre}.npy'), array)
+    descriptor, temporal = tempfile.mkstemp(dir=directorio, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as archivo:
+            json.dump(metadatos, archivo)
+        os.replace(temporal, os.path.join(directorio, METADATOS))
+    except BaseException:
+        os.unlink(temporal)
+        raise
+    for nombre in os.listdir(directorio):
+        if nombre.startswith('segmento-') and nombre != metadatos['segmento']:
+            shutil.rmtree(os.path.join(directorio, nombre), ignore_errors=True)
+
+
+def obtener_indice():
+    global _indice
+    if _indice is _NO_CARGADO:
+        with _lock:
+            if _indice is _NO_CARGADO:
+                _indice = Indice()
+    return _indice
+
+
+def reiniciar():
+    """Olvida el índice cargado; la siguiente búsqueda vuelve a leer ESTRATEGIAS_SIMILARES_DIR."""
+    global _indice
+    with _lock:
+        _indice = _NO_CARGADO
+
+
+def registrar_cambios(empresa_ids):
+    """Anota empresas modificadas para que el índice las vuelva a leer (en la transacción en curso)."""
+    if empresa_ids:
+        CambioIndiceSimilares.objects.bulk_create([CambioIndiceSimilares(empresa_id=pk) for pk in empresa_ids])
+
+
+# Receptor de post_save de Empresa, conectado en EstrategiasConfig.ready(). Las empresas
+# nuevas no hace falta anotarlas: su id es mayor que el último indexado
+def empresa_guardada(sender, instance, created, **kwargs):
+    if not created:
+        registrar_cambios([instance.pk])
+
+
+def leer_parametros(parametros):
+    """
+    Valida los parámetros del endpoint: la empresa de referencia (estrategia=<id>,
+    empresa=<id> o descripcion=<texto> con sector opcional) y k (1 a K_MAXIMO). Lanza
+    FiltroInvalido.
+    """
+    consulta = {}
+    for nombre in ('estrategia', 'empresa'):
+        if parametros.get(nombre):
+            try:
+                consulta[nombre] = int(parametros[nombre])
+            except ValueError:
+                raise FiltroInvalido(f"'{nombre}' debe ser un número entero.")
+    descripcion = (parametros.get('descripcion') or '').strip()
+    if descripcion:
+        consulta['descripcion'] = descripcion
+        consulta['sector'] = (parametros.get('sector') or '').strip()
+    if len(consulta.keys() & {'estrategia', 'empresa', 'descripcion'}) != 1:
+        raise FiltroInvalido("Indica uno de 'estrategia', 'empresa' o 'descripcion'.")
+    try:
+        consulta['k'] = int(parametros.get('k') or K_DEFECTO)
+    except ValueError:
+        raise FiltroInvalido("'k' debe ser un número entero.")
+    if not 1 <= consulta['k'] <= K_MAXIMO:
+        raise FiltroInvalido(f"'k' debe estar entre 1 y {K_MAXIMO}.")
+    return consulta
+
+
+def _referencia(consulta):
+    # (texto, empresa_id a excluir) de la empresa de referencia, o None si no existe
+    if 'descripcion' in consulta:
+        return texto_empresa(consulta['sector'], consulta['descripcion']), None
+    if 'estrategia' in consulta:
+        filas = Estrategia.objects.filter(id=consulta['estrategia']).values_list(
+            'empresa_id', 'empresa__sector', 'empresa__descripcion_negocio'
+        )
+    else:
+        filas = Empresa.objects.filter(id=consulta['empresa']).values_list('id', 'sector', 'descripcion_negocio')
+    fila = filas.first()
+    if fila is None:
+        return None
+    empresa_id, sector, descripcion = fila
+    return texto_empresa(sector, descripcion), empresa_id
+
+
+def similares(consulta):
+    """
+    Las empresas más parecidas a la de referencia de leer_parametros, con su última
+    estrategia, de más a menos parecida; None si la estrategia o empresa no existe. Lanza
+    IndiceNoDisponible.
+    """
+    referencia = _referencia(consulta)
+    if referencia is None:
+        return None
+    texto, excluir = referencia
+    k = consulta['k']
+    # Se piden de más por si alguna se borró después de indexarla
+    encontradas = obtener_indice().buscar(texto, 2 * k, excluir=[excluir] if excluir else ())
+    if not encontradas:
+        return []
+
+    ultima_estrategia = Estrategia.objects.filter(empresa=OuterRef('pk')).order_by('-fecha_generacion', '-id')
+    empresas = Empresa.objects.filter(id__in=[empresa_id for empresa_id, _ in encontradas]).annotate(
+        ultima_estrategia_id=Subquery(ultima_estrategia.values('id')[:1]),
+    ).only('id', 'nombre', 'sector', 'tamano').in_bulk()
+    estrategias = Estrategia.objects.only(
+        'id', 'tipo_estrategia', 'descripcion_estrategia', 'fecha_generacion'
+    ).in_bulk([empresa.ultima_estrategia_id for empresa in empresas.values() if empresa.ultima_estrategia_id])
+
+    prefijo, sufijo = reverse('estrategias:detalle_estrategia', args=[0]).rsplit('0', 1)
+    resultados = []
+    for empresa_id, similitud in encontradas:
+        empresa = empresas.get(empresa_id)
+        if empresa is None:
+            continue
+        estrategia = estrategias.get(empresa.ultima_estrategia_id)
+        resultados.append({
+            'empresa_id': empresa.id,
+            'nombre': empresa.nombre,
+            'sector': empresa.sector,
+            'tamano': empresa.tamano,
+            'similitud': round(similitud, 4),
+            'estrategia': estrategia and {
+                'estrategia_id': estrategia.id,
+                'tipo_estrategia': estrategia.tipo_estrategia,
+                'descripcion_estrategia': estrategia.descripcion_estrategia,
+                'fecha_generacion': estrategia.fecha_generacion.isoformat(),
+                'url': f'{prefijo}{estrategia.id}{sufijo}',
+            },
+        })
+        if len(resultados) == k:
+            break
+    return resultados
@@ -0,0 +1,91 @@
+# estrategias/sintetico.py
+# Datos sintéticos reproducibles para pruebas de carga (seed_db --count).
+#
+# Cada empresa depende solo de (semilla, índice), así que el resultado es el mismo sin
+# importar cuántos procesos se usen ni cómo se repartan los lotes.
+import random
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from . import nlp as proveedor_nlp
+from .generacion import generar_estrategias_ia_lote
+from .models import Empresa, Estrategia
+from .servicios import CAMPOS_UPSERT
+
+SECTORES = ['restaurante', 'tienda de ropa', 'consultoria', 'tecnologia', 'educacion', 'salud', 'servicios', 'manufactura']
+TAMANOS = ['micro', 'pequena', 'mediana']
+
+PREFIJOS_NOMBRE = ['Grupo', 'Casa', 'Taller', 'Estudio', 'Centro', 'Distribuidora', 'Servicios', 'Comercial']
+NUCLEOS_NOMBRE = ['del Sol', 'Andino', 'Caribe', 'Horizonte', 'Alfa', 'Nova', 'Del Valle', 'Central', 'Norte', 'Vida']
+
+ACTIVIDADES = {
+    'restaurante': ['cafetería artesanal', 'restaurante familiar', 'panadería tradicional', 'comida rápida'],
+    'tienda de ropa': ['tienda de ropa juvenil', 'boutique de diseño', 'ropa deportiva', 'moda infantil'],
+    'consultoria': ['consultoría de procesos', 'asesoría contable', 'consultoría de software', 'auditoría'],
+    'tecnologia': ['desarrollo de software', 'soporte informático', 'aplicaciones móviles', 'ciberseguridad'],
+    'educacion': ['academia de idiomas', 'talleres de arte', 'refuerzo escolar', 'formación online'],
+    'salud': ['clínica de fisioterapia', 'consultorio dental', 'centro de nutrición', 'laboratorio'],
+    'servicios': ['limpieza de oficinas', 'mantenimiento de hogares', 'mensajería', 'jardinería'],
+    'manufactura': ['taller de muebles', 'fábrica de envases', 'textiles', 'alimentos procesados'],
+}
+DETALLES = [
+    'con servicio a domicilio y delivery', 'con venta online y web propia', 'con ambiente tematico',
+    'enfocada en pymes', 'con diseno exclusivo', 'con mucha competencia en la zona',
+    'que sufre retrasos y costos altos', 'con clientes fieles', 'en plena expansión', 'con tecnologia propia',
+]
+RECURSOS = [
+    'bajo presupuesto', 'buen local', 'equipo pequeno', 'experiencia tecnica', 'personal reducido',
+    'ubicacion privilegiada', 'conocimiento especializado', 'inventario variado', 'cartera de clientes', '',
+]
+
+# Ventana de fechas en la que se reparten las estrategias generadas
+DIAS_HISTORIA = 365
+
+
+def empresa_sintetica(semilla, indice):
+    azar = random.Random(f'{semilla}:{indice}')
+    sector = azar.choice(SECTORES)
+    detalles = azar.sample(DETALLES, 2)
+    recursos = [recurso for recurso in azar.sample(RECURSOS, 2) if recurso]
+    return {
+        'nombre': f'{azar.choice(PREFIJOS_NOMBRE)} {azar.choice(NUCLEOS_NOMBRE)} {semilla}-{indice}',
+        'sector': sector,
+        'tamano': azar.choice(TAMANOS),
+        'descripcion_negocio': f'{azar.choice(ACTIVIDADES[sector]).capitalize()} {detalles[0]}, {detalles[1]}.',
+        'recursos_disponibles': ', '.join(recursos).capitalize() or None,
+    }
+
+
+def fecha_sintetica(semilla, indice, ahora):
+    azar = random.Random(f'{semilla}:{indice}:fecha')
+    return ahora - timedelta(seconds=azar.randrange(DIAS_HISTORIA * 24 * 60 * 60))
+
+
+def sembrar_lote(semilla, inicio, fin, usar_nlp=False, ahora=None):
+    """
+    Crea las empresas [inicio, fin) con una estrategia cada una, en una transacción.
+    Devuelve el número de filas insertadas (empresas + estrategias).
+    """
+    ahora = ahora or timezone.now()
+    datos = [empresa_sintetica(semilla, indice) for indice in range(inicio, fin)]
+    nlp_model = proveedor_nlp.obtener_nlp() if usar_nlp else None
+    estrategias_info = generar_estrategias_ia_lote(
+        datos, nlp_model, proveedor_nlp.obtener_stopwords() if usar_nlp else frozenset(),
+        azares=[random.Random(f'{semilla}:{indice}:tipo') for indice in range(inicio, fin)],
+    )
+
+    with transaction.atomic():
+        # Con --keep y la misma semilla las empresas ya existen: ON CONFLICT las reutiliza
+        empresas = Empresa.objects.bulk_create(
+            [Empresa(**empresa_data) for empresa_data in datos],
+            update_conflicts=True, unique_fields=['nombre_normalizado'], update_fields=CAMPOS_UPSERT,
+        )
+        # Las estrategias se reparten en el tiempo: conservar_fechas evita que auto_now_add
+        # les ponga a todas la fecha actual
+        Estrategia.objects.bulk_create([
+            Estrategia(empresa=empresa, fecha_generacion=fecha_sintetica(semilla, indice, ahora), **info)
+            for indice, empresa, info in zip(range(inicio, fin), empresas, estrategias_info)
+        ], conservar_fechas=True)
+    return 2 * len(datos)
@@ -1,7 +1,42 @@
 # estrategias/sitemaps.py
+# Sitemaps del sitio: StaticViewSitemap (las páginas fijas, con el framework de Django) y el
+# sitemap de las estrategias, precalculado por páginas bajo un índice (sitemap.xml).
+#
+# Las páginas de estrategias se generan con el comando actualizar_sitemaps (p. ej. desde
+# cron) y se guardan en PaginaSitemap ya comprimidas, así que un rastreador nunca dispara
+# trabajo sobre la tabla de estrategias: el índice es una consulta sobre PaginaSitemap (una
+# fila por cada 50.000 estrategias) y cada página, una lectura por clave.
+#
+# Cada página cubre un rango de ids consecutivos, (desde_id, hasta_id], leído con keyset y
+# values_list('id', 'fecha_generacion') sobre la clave primaria. Los ids no se reutilizan y
+# crecen con cada estrategia nueva, también cuando llega con una fecha pasada (seed_db,
+# importaciones), así que las páginas llenas no vuelven a cambiar: la actualización
+# incremental solo rehace la última página (si no estaba llena) y añade las nuevas. Las
+# estrategias borradas siguen en su página hasta una regeneración completa (--completo).
+import re
+from xml.sax.saxutils import escape
+
+from django.conf import settings
 from django.contrib.sitemaps import Sitemap
+from django.db import transaction
 from django.urls import reverse # Para obtener las URLs por su nombre
 
+from .condicional import calcular_etag
+from .exportacion import comprimir_gzip
+from .models import Estrategia, PaginaSitemap
+
+# Límite del protocolo: 50.000 URLs (y 50 MB sin comprimir) por archivo
+SITEMAP_TAMANO = getattr(settings, 'ESTRATEGIAS_SITEMAP_TAMANO', 50_000)
+# Esquema y dominio de las URLs de las páginas precalculadas (p. ej. 'https://ejemplo.com');
+# se pueden indicar también con actualizar_sitemaps --url-base
+SITEMAP_URL_BASE = getattr(settings, 'ESTRATEGIAS_SITEMAP_URL_BASE', '')
+# El índice enlaza las páginas .xml.gz (el archivo comprimido tal cual) en lugar de .xml
+SITEMAP_GZIP = getattr(settings, 'ESTRATEGIAS_SITEMAP_GZIP', False)
+
+CABECERA = '<?xml version="1.0" encoding="UTF-8"?>\n'
+NAMESPACE = 'http://www.sitemaps.org/schemas/sitemap/0.9'
+
+
 class StaticViewSitemap(Sitemap):
     priority = 0.5
     changefreq = 'daily' # Con qué frecuencia cambia la página
@@ -14,12 +49,121 @@ class StaticViewSitemap(Sitemap):
         # Obtiene la URL real para cada elemento
         return reverse(item)
 
-# Si quisieras incluir URLs dinámicas (ej. cada estrategia generada si fueran públicas)
-# from .models import Estrategia
-# class EstrategiaSitemap(Sitemap):
-#     changefreq = "weekly"
-#     priority = 0.8
-#     def items(self):
-#         return Estrategia.objects.all() # Todas las estrategias
-#     def lastmod(self, obj):
-#         return obj.fecha_generacion # La última vez que fue modificada
\ No newline at end of file
+    def lastmod(self, item):
+        # El listado cambia con cada estrategia nueva; el formulario no cambia
+        if item == 'estrategias:listar_estrategias':
+            return Estrategia.objects.order_by('-fecha_generacion').values_list('fecha_generacion', flat=True).first()
+        return None
+
+
+def _fecha_w3c(fecha):
+    return fecha.isoformat(timespec='seconds')
+
+
+def _bloques_pagina(filas, url_base):
+    # reverse() una sola vez: para cada estrategia solo se inserta el id en la ruta
+    prefijo, sufijo = reverse('estrategias:detalle_estrategia', args=[0]).rsplit('0', 1)
+    prefijo = escape(url_base.rstrip('/') + prefijo)
+    yield f'{CABECERA}<urlset xmlns="{NAMESPACE}">\n'.encode()
+    yield ''.join(
+        f'<url><loc>{prefijo}{pk}{sufijo}</loc><lastmod>{_fecha_w3c(fecha)}</lastmod></url>\n'
+        for pk, fecha in filas
+    ).encode()
+    yield b'</urlset>\n'
+
+
+def _guardar_pagina(numero, desde_id, filas, url_base):
+    return PaginaSitemap.objects.update_or_create(numero=numero, defaults={
+        'desde_id': desde_id,
+        'hasta_id': filas[-1][0],
+        'urls': len(filas),
+        'ultima_modificacion': max(fecha for _, fecha in filas),
+        'contenido': b''.join(comprimir_gzip(_bloques_pagina(filas, url_base))),
+    })[0]
+
+
+def actualizar_paginas(url_base=SITEMAP_URL_BASE, completo=False, tamano=SITEMAP_TAMANO):
+    """
+    Genera las páginas del sitemap de estrategias que falten y devuelve las PaginaSitemap
+    escritas. Sin `completo`, solo se leen las estrategias de la última página (si no
+    estaba llena) y las posteriores; si no hay estrategias nuevas cuesta una consulta.
+    Con `completo` se borran y se regeneran todas (tras borrar estrategias o cambiar
+    `url_base` o `tamano`), en una transacción: si la regeneración falla, se conservan
+    las páginas anteriores.
+    """
+    if completo:
+        with transaction.atomic():
+            PaginaSitemap.objects.all().delete()
+            return _escribir_paginas(url_base, tamano)
+    return _escribir_paginas(url_base, tamano)
+
+
+def _escribir_paginas(url_base, tamano):
+    ultima = PaginaSitemap.objects.order_by('-numero').first()
+    if ultima is None:
+        numero, desde_id = 1, 0
+    else:
+        if not Estrategia.objects.filter(id__gt=ultima.hasta_id).exists():
+            return []
+        if ultima.urls < tamano:
+            numero, desde_id = ultima.numero, ultima.desde_id # Se rehace con las nuevas
+        else:
+            numero, desde_id = ultima.numero + 1, ultima.hasta_id
+
+    escritas = []
+    while True:
+        filas = list(
+            Estrategia.objects.filter(id__gt=desde_id).order_by('id')
+            .values_list('id', 'fecha_generacion')[:tamano]
+        )
+        if not filas:
+            break
+        escritas.append(_guardar_pagina(numero, desde_id, filas, url_base))
+        if len(filas) < tamano:
+            break
+        numero, desde_id = numero + 1, filas[-1][0]
+    return escritas
+
+
+def indice(paginas, url_base):
+    """
+    XML del índice de sitemaps: el sitemap de las páginas fijas y, para cada (número,
+    última modificación) de `paginas`, su página de estrategias.
+    """
+    url_base = url_base.rstrip('/')
+    nombre_pagina = 'sitemap_estrategias_gz' if SITEMAP_GZIP else 'sitemap_estrategias'
+    entradas = [f'<sitemap><loc>{escape(url_base + reverse("django.contrib.sitemaps.views.sitemap"))}</loc></sitemap>\n']
+    entradas.extend(
+        f'<sitemap><loc>{escape(url_base + reverse(nombre_pagina, args=[numero]))}</loc>'
+        f'<lastmod>{_fecha_w3c(ultima_modificacion)}</lastmod></sitemap>\n'
+        for numero, ultima_modificacion in paginas
+    )
+    return f'{CABECERA}<sitemapindex xmlns="{NAMESPACE}">\n{"".join(entradas)}</sitemapindex>\n'
+
+
+def acepta_gzip(request):
+    # La misma comprobación que GZipMiddleware
+    return re.search(r'\bgzip\b', request.headers.get('Accept-Encoding', '')) is not None
+
+
+def validadores_pagina(request, numero, comprimido=False):
+    """
+    (etag, última modificación) de una página precalculada, o (None, None) si no existe.
+    El ETag distingue las tres formas de servirla: .xml.gz, .xml con Content-Encoding gzip
+    y .xml sin comprimir.
+    """
+    fila = PaginaSitemap.objects.filter(numero=numero).values_list('fecha_actualizacion', 'urls').first()
+    if fila is None:
+        return None, None
+    fecha_actualizacion, urls = fila
+    forma = 'gz' if comprimido else 'gzip' if acepta_gzip(request) else 'xml'
+    return calcular_etag(numero, urls, fecha_actualizacion.isoformat(), forma), fecha_actualizacion
+
+
+def validadores_estaticas(request, *args, **kwargs):
+    """
+    (etag, última modificación) de sitemap-static.xml: su único dato variable es el lastmod
+    del listado (StaticViewSitemap.lastmod), la fecha de la estrategia más reciente.
+    """
+    fecha = Estrategia.objects.order_by('-fecha_generacion').values_list('fecha_generacion', flat=True).first()
+    return calcular_etag('estaticas', fecha.isoformat() if fecha else 'vacio'), fecha
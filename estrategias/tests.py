@@ -1,3 +1,1263 @@
-from django.test import TestCase
+import csv
+import gc
+import gzip
+import json
+import os
+import re
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import numpy
+
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import IntegrityError, connection
+from django.db.models import Max, Min
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import admin as estrategias_admin, cache_detalle, cache_generacion, clasificador, cola, conexiones, estadisticas, generacion, importacion, metricas, similares, sintetico, sitemaps, validacion
+from . import nlp as proveedor_nlp
+from .benchmarks import comparar
+from .forms import EmpresaForm
+from .generacion import generar_estrategia_ia, generar_estrategias_ia_lote
+from .models import (
+    CambioIndiceSimilares, Empresa, EstadisticaDiaria, Estrategia, Importacion, PaginaSitemap, TrabajoGeneracion,
+    calcular_hash_contenido,
+)
+from .pagination import CursorInvalido, PaginadorEstimado, codificar_cursor, decodificar_cursor
+from .reglas import MotorReglas, obtener_tabla
+from .servicios import generar_estrategias_en_lote, registrar_estrategia, upsert_empresa
+
+
+def crear_estrategias(cantidad, empresa=None):
+    # Crea `cantidad` estrategias con fechas distintas (la más reciente primero al listar)
+    empresa = empresa or Empresa.objects.create(
+        nombre='Cafetería del Sol', sector='restaurante', tamano='micro',
+        descripcion_negocio='Cafetería artesanal.', recursos_disponibles='Buen local.'
+    )
+    ahora = timezone.now()
+    return Estrategia.objects.bulk_create([
+        Estrategia(empresa=empresa, tipo_estrategia='marketing', fecha_generacion=ahora - timedelta(minutes=i),
+                   descripcion_estrategia=f'Estrategia {i}', impacto_estimado='Alto')
+        for i in range(cantidad)
+    ], conservar_fechas=True)
+
+
+class PaginacionCursorTests(TestCase):
+    def test_cursor_ida_y_vuelta(self):
+        fecha = timezone.now()
+        self.assertEqual(decodificar_cursor(codificar_cursor(fecha, 42)), (fecha, 42))
+        with self.assertRaises(CursorInvalido):
+            decodificar_cursor('no-es-un-cursor')
+
+    def test_lista_html_sin_n_mas_1(self):
+        crear_estrategias(30)
+        url = reverse('estrategias:listar_estrategias')
+        # La página y la consulta de los validadores de GET condicional (ver condicional.py)
+        with self.assertNumQueries(2):
+            respuesta = self.client.get(url, {'limite': 25})
+        self.assertEqual(len(respuesta.context['estrategias']), 25)
+        self.assertContains(respuesta, 'Cafetería del Sol')
+        self.assertIsNotNone(respuesta.context['siguiente_cursor'])
+
+    def test_api_recorre_todas_las_paginas(self):
+        creadas = crear_estrategias(7)
+        url = reverse('estrategias:api_listar_estrategias')
+        vistos, cursor = [], None
+        while True:
+            params = {'limite': 3, **({'cursor': cursor} if cursor else {})}
+            datos = self.client.get(url, params).json()
+            vistos += [fila['estrategia_id'] for fila in datos['resultados']]
+            cursor = datos['siguiente_cursor']
+            if not cursor:
+                break
+        self.assertEqual(vistos, [e.id for e in creadas])
+
+    def test_api_cursor_invalido(self):
+        respuesta = self.client.get(reverse('estrategias:api_listar_estrategias'), {'cursor': '%%%'})
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class GetCondicionalTests(TestCase):
+    def setUp(self):
+        # Los ids se reutilizan entre tests (rollback), así que la caché de detalle también
+        cache_detalle.invalidar_todo()
+        self.estrategias = crear_estrategias(3)
+        self.url_lista = reverse('estrategias:listar_estrategias')
+        self.url_detalle = reverse('estrategias:detalle_estrategia', args=[self.estrategias[0].id])
+
+    def test_lista_304_con_una_consulta(self):
+        primera = self.client.get(self.url_lista)
+        self.assertIn('s-maxage=60', primera['Cache-Control'])
+        self.assertIn('Accept-Encoding', primera['Vary'])
+        for cabeceras in ({'HTTP_IF_NONE_MATCH': primera['ETag']},
+                          {'HTTP_IF_MODIFIED_SINCE': primera['Last-Modified']}):
+            with self.assertNumQueries(1):
+                respuesta = self.client.get(self.url_lista, **cabeceras)
+            self.assertEqual(respuesta.status_code, 304)
+            self.assertEqual(respuesta['ETag'], primera['ETag'])
+
+        crear_estrategias(1, self.estrategias[0].empresa)
+        self.assertEqual(self.client.get(self.url_lista, HTTP_IF_NONE_MATCH=primera['ETag']).status_code, 200)
+
+    def test_lista_cambia_con_cualquier_escritura(self):
+        empresa = self.estrategias[0].empresa
+        cambios = [
+            # Estrategia con fecha pasada (no es la más reciente)
+            lambda: Estrategia.objects.bulk_create([Estrategia(
+                empresa=empresa, tipo_estrategia='ventas', descripcion_estrategia='Antigua.',
+            )]) and Estrategia.objects.filter(descripcion_estrategia='Antigua.').update(
+                fecha_generacion=timezone.now() - timedelta(days=30)),
+            lambda: Empresa.objects.filter(id=empresa.id).first().save(),
+            lambda: self.estrategias[2].delete(),
+        ]
+        for cambio in cambios:
+            antes = self.client.get(self.url_lista)
+            cambio()
+            # Last-Modified tiene resolución de segundos: el cambio lo marca el ETag
+            self.assertEqual(self.client.get(self.url_lista, HTTP_IF_NONE_MATCH=antes['ETag']).status_code, 200)
+
+    def test_detalle_cambia_con_la_empresa(self):
+        primera = self.client.get(self.url_detalle)
+        # Los validadores salen de la entrada de cache_detalle: sin consultas
+        with self.assertNumQueries(0):
+            respuesta = self.client.get(self.url_detalle, HTTP_IF_NONE_MATCH=primera['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+
+        empresa = self.estrategias[0].empresa
+        empresa.descripcion_negocio = 'Ahora también con catering.'
+        empresa.save()
+        self.assertContains(self.client.get(self.url_detalle, HTTP_IF_NONE_MATCH=primera['ETag']), 'catering')
+
+    def test_sitemap(self):
+        for url in ('/sitemap.xml', '/sitemap-static.xml'):
+            primera = self.client.get(url)
+            self.assertEqual(primera.status_code, 200)
+            with self.assertNumQueries(1):
+                respuesta = self.client.get(url, HTTP_IF_NONE_MATCH=primera['ETag'])
+            self.assertEqual(respuesta.status_code, 304)
+        self.assertContains(primera, '<lastmod>')
+
+
+class SitemapTests(TestCase):
+    url_base = 'https://ejemplo.com'
+
+    def setUp(self):
+        self.estrategias = crear_estrategias(5)
+
+    def urls_de(self, contenido):
+        return re.findall(r'<loc>([^<]+)</loc>', contenido)
+
+    def test_regeneracion_completa_atomica(self):
+        sitemaps.actualizar_paginas(self.url_base, tamano=2)
+        antes = list(PaginaSitemap.objects.order_by('numero').values_list('numero', 'contenido'))
+        # Falla al escribir la primera página, con las anteriores ya borradas
+        with mock.patch('estrategias.sitemaps._guardar_pagina', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                sitemaps.actualizar_paginas('https://otro.example', completo=True, tamano=2)
+        self.assertEqual(list(PaginaSitemap.objects.order_by('numero').values_list('numero', 'contenido')), antes)
+
+    def test_paginas_e_incremental(self):
+        self.assertEqual([p.numero for p in sitemaps.actualizar_paginas(self.url_base, tamano=2)], [1, 2, 3])
+        # Sin estrategias nuevas no se reescribe nada
+        with self.assertNumQueries(2):
+            self.assertEqual(sitemaps.actualizar_paginas(self.url_base, tamano=2), [])
+
+        nuevas = crear_estrategias(2, self.estrategias[0].empresa)
+        # Se rehace la página 3 (tenía una URL) y se añade la 4; las llenas no se tocan
+        self.assertEqual([p.numero for p in sitemaps.actualizar_paginas(self.url_base, tamano=2)], [3, 4])
+        contenido = gzip.decompress(PaginaSitemap.objects.get(numero=4).contenido).decode()
+        self.assertEqual(self.urls_de(contenido), [
+            self.url_base + reverse('estrategias:detalle_estrategia', args=[nuevas[-1].id])
+        ])
+        todas = []
+        for pagina in PaginaSitemap.objects.order_by('numero'):
+            todas += self.urls_de(gzip.decompress(pagina.contenido).decode())
+        self.assertEqual(len(todas), len(set(todas)))
+        self.assertEqual(len(todas), Estrategia.objects.count())
+
+    def test_indice_y_paginas_sin_tocar_estrategias(self):
+        call_command('actualizar_sitemaps', url_base=self.url_base, tamano=3, stdout=StringIO())
+        with CaptureQueriesContext(connection) as consultas:
+            indice = self.client.get('/sitemap.xml')
+            pagina = self.client.get('/sitemap-estrategias-2.xml')
+            comprimida = self.client.get('/sitemap-estrategias-2.xml', HTTP_ACCEPT_ENCODING='gzip, br')
+            archivo = self.client.get('/sitemap-estrategias-2.xml.gz')
+        self.assertFalse(any('estrategias_estrategia' in c['sql'] for c in consultas))
+
+        self.assertEqual(self.urls_de(indice.content.decode()), [
+            'http://testserver/sitemap-static.xml',
+            'http://testserver/sitemap-estrategias-1.xml',
+            'http://testserver/sitemap-estrategias-2.xml',
+        ])
+        self.assertEqual(len(self.urls_de(pagina.content.decode())), 2)
+        self.assertEqual(comprimida['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(comprimida.content), pagina.content)
+        self.assertEqual(gzip.decompress(archivo.content), pagina.content)
+        self.assertEqual(len({pagina['ETag'], comprimida['ETag'], archivo['ETag']}), 3)
+        self.assertEqual(self.client.get('/sitemap-estrategias-3.xml').status_code, 404)
+
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/sitemap-estrategias-2.xml', HTTP_IF_NONE_MATCH=pagina['ETag'])
+        self.assertEqual(respuesta.status_code, 304)
+
+
+class CacheDetalleTests(TestCase):
+    def setUp(self):
+        cache_detalle.invalidar_todo()
+        self.addCleanup(cache_detalle.invalidar_todo)
+        self.estrategia = crear_estrategias(2)[0]
+        self.url = reverse('estrategias:detalle_estrategia', args=[self.estrategia.id])
+
+    def test_acierto_sin_consultas_y_variante_json(self):
+        self.assertContains(self.client.get(self.url), 'Cafetería del Sol')
+        with self.assertNumQueries(0):
+            self.assertContains(self.client.get(self.url), 'Cafetería del Sol')
+
+        url_api = reverse('estrategias:api_detalle_estrategia', args=[self.estrategia.id])
+        datos = self.client.get(url_api).json()
+        self.assertEqual(datos['estrategia']['empresa']['sector'], 'restaurante')
+        with self.assertNumQueries(0):
+            self.client.get(url_api)
+
+    def test_invalidacion_por_senales_y_upsert(self):
+        self.client.get(self.url)
+        empresa = self.estrategia.empresa
+        empresa.nombre = 'Cafetería del Sol Naciente'
+        empresa.save()
+        self.assertContains(self.client.get(self.url), 'Cafetería del Sol Naciente')
+
+        # El upsert no pasa por save(): invalida él mismo
+        registrar_estrategia(
+            {**datos_empresa(nombre='Cafetería del Sol Naciente'), 'descripcion_negocio': 'Ahora con terraza.'},
+            {'tipo_estrategia': 'ventas', 'descripcion_estrategia': 'Otra.', 'impacto_estimado': ''},
+        )
+        self.assertContains(self.client.get(self.url), 'Ahora con terraza.')
+
+        self.estrategia.delete()
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_invalidar_todo_no_vacia_el_alias(self):
+        cache = caches[cache_detalle.CACHE_ALIAS]
+        cache.set('otra-app:clave', 'sigue aquí')
+        self.addCleanup(cache.delete, 'otra-app:clave')
+        self.client.get(self.url)
+        version_listado = cache_detalle.version_listado()[0]
+
+        cache_detalle.invalidar_todo()
+        self.assertEqual(cache.get('otra-app:clave'), 'sigue aquí')
+        self.assertNotEqual(cache_detalle.version_listado()[0], version_listado)
+        with self.assertNumQueries(2): # La entrada ya no vale: se reconstruye
+            self.assertContains(self.client.get(self.url), 'Cafetería del Sol')
+
+    def test_404_en_cache_solo_para_ids_pasados(self):
+        hueco = Estrategia.objects.order_by('id').first()
+        url_hueco = reverse('estrategias:detalle_estrategia', args=[hueco.id])
+        hueco.delete()
+        respuesta = self.client.get(url_hueco)
+        self.assertContains(respuesta, 'Estrategia no encontrada', status_code=404)
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url_hueco).status_code, 404)
+        # Un id futuro no se guarda: cuando se cree la estrategia se verá sin invalidar nada
+        futuro = reverse('estrategias:detalle_estrategia', args=[self.estrategia.id + 100])
+        self.client.get(futuro)
+        with self.assertNumQueries(2):
+            self.assertEqual(self.client.get(futuro).status_code, 404)
+
+    def test_sin_estampida(self):
+        # Otro proceso tiene el candado y guarda la entrada mientras esperamos: no se consulta
+        construida = cache_detalle._construir(self.estrategia.id, lambda estrategia: 'otra copia')
+        clave = cache_detalle._clave('html', self.estrategia.id)
+        caches[cache_detalle.CACHE_ALIAS].add(f'{clave}:construyendo', 1)
+
+        def otro_proceso_termina(segundos):
+            caches[cache_detalle.CACHE_ALIAS].set(clave, construida)
+
+        with mock.patch('estrategias.cache_detalle.time.sleep', otro_proceso_termina), \
+             self.assertNumQueries(0):
+            self.assertContains(self.client.get(self.url), 'otra copia')
+
+
+class ProveedorNLPTests(TestCase):
+    def setUp(self):
+        proveedor_nlp.reiniciar()
+        self.addCleanup(proveedor_nlp.reiniciar)
+
+    @override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+    def test_modo_tokenizador_se_carga_una_vez(self):
+        nlp = proveedor_nlp.obtener_nlp()
+        self.assertEqual(nlp.pipe_names, [])
+        self.assertIs(proveedor_nlp.obtener_nlp(), nlp)
+        self.assertEqual([t.text for t in nlp('servicio a domicilio') if t.is_alpha],
+                         ['servicio', 'a', 'domicilio'])
+
+    @override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+    def test_preparar_para_fork_congela_el_gc(self):
+        self.addCleanup(gc.unfreeze)
+        proveedor_nlp.preparar_para_fork()
+        self.assertIsNot(proveedor_nlp._nlp, proveedor_nlp._NO_CARGADO)
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+
+def datos_empresa(**cambios):
+    datos = {
+        'nombre': 'Cafetería del Sol', 'sector': 'restaurante', 'tamano': 'micro',
+        'descripcion_negocio': 'Cafetería artesanal con servicio a domicilio.',
+        'recursos_disponibles': 'Buen local, equipo pequeño.',
+    }
+    datos.update(cambios)
+    return datos
+
+
+@override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+class GeneracionLoteTests(TestCase):
+    def setUp(self):
+        proveedor_nlp.reiniciar()
+        self.addCleanup(proveedor_nlp.reiniciar)
+
+    def test_lote_equivale_a_generacion_individual(self):
+        lista = [
+            datos_empresa(),
+            datos_empresa(nombre='Moda Express', sector='tienda de ropa', tamano='pequena',
+                          descripcion_negocio='Tienda con venta online.'),
+            datos_empresa(nombre='Consultores Alpha', sector='consultoria', tamano='mediana',
+                          descripcion_negocio='Consultoría de software.', recursos_disponibles=None),
+        ]
+        nlp, stopwords = proveedor_nlp.obtener_nlp(), proveedor_nlp.obtener_stopwords()
+        self.assertEqual(
+            generar_estrategias_ia_lote(lista, nlp, stopwords, batch_size=2),
+            [generar_estrategia_ia(datos, nlp, stopwords) for datos in lista],
+        )
+
+    def test_endpoint_lote_conserva_orden_y_errores(self):
+        Empresa.objects.create(**datos_empresa(tamano='mediana'))
+        empresas = [
+            datos_empresa(),
+            datos_empresa(nombre='X', sector='astronautica'),
+            datos_empresa(nombre='Moda Express', sector='tienda de ropa'),
+        ]
+        respuesta = self.client.post(
+            reverse('estrategias:generar_estrategias_lote'),
+            {'empresas': empresas}, content_type='application/json',
+        )
+        resultados = respuesta.json()['resultados']
+        self.assertEqual([r['success'] for r in resultados], [True, False, True])
+        self.assertIn('nombre', resultados[1]['errors'])
+        self.assertIn('sector', resultados[1]['errors'])
+        self.assertEqual(Empresa.objects.count(), 2)
+        self.assertEqual(Empresa.objects.get(nombre='Cafetería del Sol').tamano, 'micro')
+        self.assertEqual(
+            list(Estrategia.objects.order_by('id').values_list('id', flat=True)),
+            [resultados[0]['estrategia_id'], resultados[2]['estrategia_id']],
+        )
+
+    def test_endpoint_lote_cuerpo_acotado(self):
+        url = reverse('estrategias:generar_estrategias_lote')
+        with mock.patch.object(validacion, 'LOTE_JSON_MAXIMO', 100):
+            respuesta = self.client.post(url, {'empresas': [datos_empresa()]}, content_type='application/json')
+        self.assertEqual(respuesta.status_code, 413)
+        self.assertFalse(respuesta.json()['success'])
+        respuesta = self.client.post(url, '{no es json', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['error'], 'El cuerpo debe ser JSON.')
+        self.assertFalse(Empresa.objects.exists())
+
+
+@override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+class NombreNormalizadoTests(TestCase):
+    def test_mismo_nombre_con_otras_mayusculas_reutiliza_la_empresa(self):
+        url = reverse('estrategias:generar_estrategia')
+        self.client.post(url, datos_empresa(), content_type='application/json')
+        self.client.post(url, datos_empresa(nombre='  cafetería   DEL sol ', tamano='pequena'),
+                         content_type='application/json')
+        empresa = Empresa.objects.get()
+        self.assertEqual((empresa.nombre, empresa.tamano), ('cafetería   DEL sol', 'pequena'))
+        self.assertEqual(empresa.estrategia_set.count(), 2)
+
+    def test_bulk_create_rellena_el_nombre_normalizado_y_es_unico(self):
+        Empresa.objects.bulk_create([Empresa(**datos_empresa(nombre='Moda  Express'))])
+        self.assertEqual(Empresa.objects.get().nombre_normalizado, 'moda express')
+        with self.assertRaises(IntegrityError):
+            Empresa.objects.create(**datos_empresa(nombre='MODA EXPRESS'))
+
+
+class UpsertEmpresaTests(TestCase):
+    def info(self):
+        return {'tipo_estrategia': 'marketing', 'descripcion_estrategia': 'x', 'impacto_estimado': 'y'}
+
+    def test_sin_cambios_no_reescribe_la_empresa(self):
+        empresa, _ = registrar_estrategia(datos_empresa(), self.info())
+        with CaptureQueriesContext(connection) as capturadas:
+            repetida, _ = registrar_estrategia(datos_empresa(), self.info())
+        self.assertEqual(repetida.id, empresa.id)
+        self.assertEqual(Estrategia.objects.filter(empresa_id=empresa.id).count(), 2)
+        # La empresa sin cambios solo se lee (por índice único); se inserta la estrategia
+        sentencias = [consulta['sql'].split()[0].upper() for consulta in capturadas]
+        self.assertEqual([s for s in sentencias if s in ('INSERT', 'UPDATE', 'SELECT')], ['SELECT', 'INSERT'])
+
+    def test_fecha_generacion_explicita(self):
+        fecha = timezone.now() - timedelta(days=10)
+        _, estrategia = registrar_estrategia(datos_empresa(), self.info(), fecha_generacion=fecha)
+        self.assertEqual(Estrategia.objects.get(id=estrategia.id).fecha_generacion, fecha)
+        self.assertEqual(
+            list(EstadisticaDiaria.objects.values_list('dia', 'estrategias')), [(timezone.localdate(fecha), 1)]
+        )
+
+    def test_cambios_actualizan_la_misma_fila(self):
+        empresa, _ = registrar_estrategia(datos_empresa(), self.info())
+        actualizada, _ = registrar_estrategia(datos_empresa(nombre='CAFETERÍA DEL SOL', tamano='mediana'), self.info())
+        self.assertEqual(actualizada.id, empresa.id)
+        guardada = Empresa.objects.get()
+        self.assertEqual((guardada.nombre, guardada.tamano), ('CAFETERÍA DEL SOL', 'mediana'))
+        self.assertEqual(guardada.hash_contenido, calcular_hash_contenido(datos_empresa(
+            nombre='CAFETERÍA DEL SOL', tamano='mediana')))
+
+    def test_lote_solo_escribe_empresas_nuevas_o_modificadas(self):
+        registrar_estrategia(datos_empresa(), self.info())
+        registrar_estrategia(datos_empresa(nombre='Moda Express'), self.info())
+        with CaptureQueriesContext(connection) as capturadas:
+            resultados = generar_estrategias_en_lote([
+                datos_empresa(), datos_empresa(nombre='Moda Express', tamano='mediana'), datos_empresa(nombre='Nueva'),
+            ])
+        self.assertTrue(all(resultado['success'] for resultado in resultados))
+        self.assertEqual(Empresa.objects.count(), 3)
+        upserts = [c['sql'] for c in capturadas if c['sql'].startswith('INSERT INTO "estrategias_empresa"')]
+        self.assertEqual(len(upserts), 1)
+        self.assertNotIn("'cafetería del sol'", upserts[0]) # Sin cambios: no se reescribe
+        self.assertIn("'nueva'", upserts[0])
+        self.assertEqual(Empresa.objects.get(nombre='Moda Express').tamano, 'mediana')
+
+
+class ConexionesSQLiteTests(TestCase):
+    @mock.patch('estrategias.conexiones.SQLITE_PRAGMAS', {'cache_size': -4096})
+    def test_pragmas_sin_contar_como_consultas(self):
+        with CaptureQueriesContext(connection) as capturadas:
+            conexiones.configurar_sqlite(None, connection)
+        self.assertEqual(len(capturadas), 0)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -4096)
+
+
+class BusquedaTests(TestCase):
+    def setUp(self):
+        self.url = reverse('estrategias:api_buscar_estrategias')
+        self.cafeteria = Empresa.objects.create(**datos_empresa())
+        self.moda = Empresa.objects.create(**datos_empresa(
+            nombre='Moda Express', sector='tienda de ropa', descripcion_negocio='Ropa juvenil.'
+        ))
+        Estrategia.objects.bulk_create([
+            Estrategia(empresa=self.cafeteria, tipo_estrategia='digital',
+                       descripcion_estrategia='Lanzar una tienda online con envíos a domicilio.'),
+            Estrategia(empresa=self.moda, tipo_estrategia='marketing',
+                       descripcion_estrategia='Campañas en redes sociales para la colección de verano.'),
+            Estrategia(empresa=self.moda, tipo_estrategia='expansion',
+                       descripcion_estrategia='Abrir una segunda tienda física.'),
+        ])
+
+    def buscar(self, q, **parametros):
+        return self.client.get(self.url, {'q': q, **parametros}).json()
+
+    def test_ordena_por_relevancia_e_ignora_acentos(self):
+        resultados = self.buscar('tienda')['resultados']
+        self.assertEqual(len(resultados), 3)
+        # "tienda" en el sector y en el texto de la estrategia gana a tenerlo solo en uno de los dos
+        self.assertEqual(resultados[0]['tipo_estrategia'], 'expansion')
+        self.assertEqual([r['nombre_empresa'] for r in self.buscar('CAMPANAS')['resultados']], ['Moda Express'])
+
+    def test_paginacion_por_cursor(self):
+        primera = self.buscar('tienda', limite=2)
+        segunda = self.buscar('tienda', limite=2, cursor=primera['siguiente_cursor'])
+        self.assertIsNone(segunda['siguiente_cursor'])
+        self.assertEqual(
+            [r['estrategia_id'] for r in primera['resultados'] + segunda['resultados']],
+            [r['estrategia_id'] for r in self.buscar('tienda')['resultados']],
+        )
+
+    def test_indice_sigue_a_las_escrituras(self):
+        Empresa.objects.filter(id=self.cafeteria.id).update(nombre='Panadería Aurora')
+        self.assertEqual([r['nombre_empresa'] for r in self.buscar('aurora')['resultados']], ['Panadería Aurora'])
+        self.assertEqual(self.buscar('sol')['resultados'], [])
+        self.moda.delete()
+        self.assertEqual(self.buscar('campañas')['resultados'], [])
+
+    def test_consulta_vacia_o_con_operadores(self):
+        self.assertEqual(self.client.get(self.url, {'q': ' * '}).status_code, 400)
+        self.assertEqual(len(self.buscar('tienda" OR NEAR(')['resultados']), 0)
+
+    def test_filtro_en_el_listado(self):
+        respuesta = self.client.get(reverse('estrategias:listar_estrategias'), {'q': 'redes'})
+        self.assertEqual([e.tipo_estrategia for e in respuesta.context['estrategias']], ['marketing'])
+        self.assertFalse(respuesta.context['resultados_limitados'])
+        self.assertFalse(self.buscar('redes')['resultados_limitados'])
+
+    @mock.patch('estrategias.busqueda.BUSQUEDA_CANDIDATOS', 2)
+    def test_avisa_cuando_hay_mas_coincidencias_que_candidatos(self):
+        datos = self.buscar('tienda')
+        self.assertEqual((len(datos['resultados']), datos['resultados_limitados']), (2, True))
+
+        respuesta = self.client.get(reverse('estrategias:listar_estrategias'), {'q': 'tienda'})
+        self.assertEqual(len(respuesta.context['estrategias']), 2)
+        self.assertContains(respuesta, 'se muestran solo las 2 más recientes')
+
+        self.client.force_login(get_user_model().objects.create_superuser('admin', 'admin@example.com', 'admin'))
+        respuesta = self.client.get(reverse('admin:estrategias_estrategia_changelist'), {'q': 'tienda'})
+        self.assertEqual(respuesta.context['cl'].result_count, 2)
+        self.assertContains(respuesta, 'más de 2 coincidencias')
+
+
+class ExportacionTests(TestCase):
+    def setUp(self):
+        self.cafeteria = Empresa.objects.create(**datos_empresa())
+        self.moda = Empresa.objects.create(**datos_empresa(nombre='Moda, "Express"', sector='tienda de ropa'))
+        self.estrategias = crear_estrategias(3, self.cafeteria) + crear_estrategias(2, self.moda)
+        Estrategia.objects.filter(id=self.estrategias[-1].id).update(tipo_estrategia='ventas')
+
+    def exportar(self, formato, **parametros):
+        respuesta = self.client.get(reverse('estrategias:exportar_estrategias', args=[formato]), parametros)
+        self.assertTrue(respuesta.streaming)
+        return respuesta, b''.join(respuesta.streaming_content)
+
+    def test_csv_con_cabecera_y_escapado(self):
+        respuesta, contenido = self.exportar('csv')
+        self.assertEqual(respuesta['Content-Type'], 'text/csv; charset=utf-8')
+        self.assertIn('attachment; filename="estrategias-', respuesta['Content-Disposition'])
+        filas = list(csv.reader(StringIO(contenido.decode())))
+        self.assertEqual(filas[0][:3], ['estrategia_id', 'nombre_empresa', 'sector'])
+        self.assertEqual([int(fila[0]) for fila in filas[1:]], sorted(e.id for e in self.estrategias))
+        self.assertEqual(filas[-1][1], 'Moda, "Express"')
+
+    def test_jsonl_con_filtros(self):
+        _, contenido = self.exportar('jsonl', sector='Tienda de ropa', tipo='marketing')
+        filas = [json.loads(linea) for linea in contenido.decode().splitlines()]
+        self.assertEqual([fila['estrategia_id'] for fila in filas], [self.estrategias[3].id])
+        # Las fechas de crear_estrategias son de hoy hacia atrás, minuto a minuto
+        _, contenido = self.exportar('jsonl', hasta=(timezone.localdate() - timedelta(days=1)).isoformat())
+        self.assertEqual(contenido, b'')
+
+    def test_gzip_y_errores(self):
+        respuesta, contenido = self.exportar('jsonl', gzip='1')
+        self.assertEqual(respuesta['Content-Type'], 'application/gzip')
+        self.assertEqual(len(gzip.decompress(contenido).splitlines()), 5)
+        url = reverse('estrategias:exportar_estrategias', args=['csv'])
+        self.assertEqual(self.client.get(url, {'desde': '2024-13-01'}).status_code, 400)
+        self.assertEqual(self.client.get(url, {'tipo': 'otro'}).status_code, 400)
+        self.assertEqual(self.client.get(reverse('estrategias:exportar_estrategias', args=['xml'])).status_code, 404)
+
+    def test_comando_por_tandas(self):
+        with tempfile.TemporaryDirectory() as directorio:
+            salida = os.path.join(directorio, 'estrategias.csv.gz')
+            with CaptureQueriesContext(connection) as consultas:
+                call_command('export_estrategias', salida=salida, gzip=True, chunk_size=2, stderr=StringIO())
+            with gzip.open(salida, 'rt') as archivo:
+                self.assertEqual(len(list(csv.reader(archivo))), 6)
+        # values_list por tandas en una sola consulta (SQLite trae las filas de un cursor abierto)
+        self.assertEqual(len(consultas), 1)
+
+
+@override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+class EstadisticasTests(TestCase):
+    def setUp(self):
+        proveedor_nlp.reiniciar()
+        self.addCleanup(proveedor_nlp.reiniciar)
+
+    def contadores(self):
+        return sorted(
+            EstadisticaDiaria.objects.filter(estrategias__gt=0)
+            .values_list('dia', 'sector', 'tamano', 'tipo_estrategia', 'estrategias')
+        )
+
+    def assertContadoresCorrectos(self):
+        self.assertEqual(self.contadores(), sorted(estadisticas.contar_estrategias()))
+
+    def test_inserciones_y_borrados_mantienen_los_contadores(self):
+        info = {'tipo_estrategia': 'ventas', 'descripcion_estrategia': 'Promoción.', 'impacto_estimado': 'Alto'}
+        _, estrategia = registrar_estrategia(datos_empresa(), info)
+        generar_estrategias_en_lote([
+            datos_empresa(), datos_empresa(nombre='Moda Express', sector='tienda de ropa', tamano='mediana'),
+        ])
+        crear_estrategias(3, estrategia.empresa) # bulk_create directo
+        self.assertContadoresCorrectos()
+        self.assertEqual(sum(fila[-1] for fila in self.contadores()), 6)
+
+        estrategia.delete()
+        Empresa.objects.get(nombre='Moda Express').delete() # En cascada
+        self.assertContadoresCorrectos()
+
+        EstadisticaDiaria.objects.all().delete()
+        call_command('reconstruir_estadisticas', stdout=StringIO())
+        self.assertContadoresCorrectos()
+
+    def test_cambios_de_sector_o_tamano_mueven_las_estrategias(self):
+        info = {'tipo_estrategia': 'ventas', 'descripcion_estrategia': 'Promoción.', 'impacto_estimado': 'Alto'}
+        empresa, _ = registrar_estrategia(datos_empresa(), info)
+        crear_estrategias(2, Empresa.objects.get(id=empresa.id))
+        registrar_estrategia(datos_empresa(tamano='mediana'), info) # upsert_empresa
+        self.assertContadoresCorrectos()
+        generar_estrategias_en_lote([datos_empresa(sector='servicios', tamano='pequena')]) # bulk_create
+        self.assertContadoresCorrectos()
+        guardada = Empresa.objects.get(id=empresa.id)
+        guardada.sector = 'restaurante'
+        guardada.save()
+        self.assertContadoresCorrectos()
+        guardada.tamano = 'micro'
+        Empresa.objects.bulk_update([guardada], ['tamano'])
+        self.assertContadoresCorrectos()
+        self.assertEqual(sum(fila[-1] for fila in self.contadores()), 5)
+
+    def test_borrados_en_bloque_restan_de_una_vez(self):
+        empresa = Empresa.objects.create(**datos_empresa())
+        crear_estrategias(20, empresa)
+        otra = Empresa.objects.create(**datos_empresa(nombre='Clínica Norte', sector='salud'))
+        crear_estrategias(20, otra)
+        # Una consulta de estrategias por empresa y un UPSERT, no dos consultas por estrategia
+        with CaptureQueriesContext(connection) as capturadas:
+            empresa.delete()
+        self.assertLess(len(capturadas), 10)
+        self.assertContadoresCorrectos()
+        with CaptureQueriesContext(connection) as capturadas:
+            Estrategia.objects.filter(empresa=otra).delete()
+        self.assertLess(len(capturadas), 10)
+        self.assertContadoresCorrectos()
+        self.assertEqual(self.contadores(), [])
+
+    def test_endpoint_solo_lee_los_contadores(self):
+        crear_estrategias(4)
+        registrar_estrategia(datos_empresa(nombre='Moda Express', sector='tienda de ropa'), {
+            'tipo_estrategia': 'ventas', 'descripcion_estrategia': 'Rebajas.', 'impacto_estimado': 'Medio',
+        })
+        url = reverse('estrategias:api_estadisticas')
+        with self.assertNumQueries(1):
+            datos = self.client.get(url, {'agrupar': 'sector,tipo'}).json()
+        self.assertEqual(datos['total'], 5)
+        self.assertEqual(datos['filas'], [
+            {'sector': 'restaurante', 'tipo_estrategia': 'marketing', 'estrategias': 4},
+            {'sector': 'tienda de ropa', 'tipo_estrategia': 'ventas', 'estrategias': 1},
+        ])
+
+        hoy = timezone.localdate()
+        datos = self.client.get(url, {'tipo': 'ventas', 'desde': hoy.isoformat()}).json()
+        self.assertEqual(datos['filas'], [{'dia': hoy.isoformat(), 'estrategias': 1}])
+        self.assertEqual(self.client.get(url, {'agrupar': '', 'tamano': 'mediana'}).json()['total'], 0)
+
+        for parametros in ({'agrupar': 'empresa'}, {'tamano': 'enorme'}, {'desde': '2020-01-01'}):
+            self.assertEqual(self.client.get(url, parametros).status_code, 400)
+
+
+class ImportacionTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+
+    def escribir(self, nombre, contenido):
+        ruta = os.path.join(self.directorio, nombre)
+        with open(ruta, 'w', encoding='utf-8') as archivo:
+            archivo.write(contenido)
+        return ruta
+
+    def test_jsonl_con_rechazados(self):
+        lineas = [
+            json.dumps(datos_empresa(nombre=f'Empresa {i}')) for i in range(3)
+        ] + ['', '{roto', json.dumps(datos_empresa(sector='astrologia')), '[1, 2]']
+        ruta = self.escribir('empresas.jsonl', '\n'.join(lineas) + '\n')
+        salida = StringIO()
+        call_command('import_empresas', ruta, batch_size=2, stdout=salida)
+
+        self.assertEqual(Estrategia.objects.count(), 3)
+        self.assertIn('Imported 3 businesses and rejected 3', salida.getvalue())
+        with open(importacion.ruta_rechazados(ruta), encoding='utf-8') as archivo:
+            rechazados = [json.loads(linea) for linea in archivo]
+        self.assertEqual([r['registro'] for r in rechazados], [5, 6, 7])
+        self.assertIn('sector', rechazados[1]['errores'])
+
+    def test_csv_y_reanudacion_sin_duplicados(self):
+        filas = '\n'.join(
+            f'Empresa {i},restaurante,micro,"Cafetería, con terraza",' for i in range(5)
+        )
+        ruta = self.escribir('empresas.csv', 'nombre,sector,tamano,descripcion_negocio,recursos_disponibles\n' + filas)
+        # El proceso "muere" después de confirmar la primera tanda
+        next(importacion.importar(ruta, lote=2))
+        self.assertEqual(Importacion.objects.get().registros_procesados, 2)
+
+        salida = StringIO()
+        call_command('import_empresas', ruta, batch_size=2, reanudar=True, stdout=salida)
+        # El ritmo cuenta solo las filas de esta ejecución
+        self.assertIn('(3 rows in this run in', salida.getvalue())
+        self.assertEqual(
+            sorted(Estrategia.objects.values_list('empresa__nombre', flat=True)),
+            [f'Empresa {i}' for i in range(5)],
+        )
+        progreso = Importacion.objects.get()
+        self.assertEqual((progreso.registros_procesados, progreso.importadas), (5, 5))
+
+
+class MotorReglasTests(TestCase):
+    def setUp(self):
+        self.nlp = proveedor_nlp.cargar_nlp('tokenizador')
+        self.motor = MotorReglas(obtener_tabla(), self.nlp)
+
+    def aplicar(self, **cambios):
+        datos = datos_empresa(**cambios)
+        docs = (self.nlp(datos['descripcion_negocio'].lower()),
+                self.nlp((datos['recursos_disponibles'] or '').lower()))
+        return self.motor.aplicar(datos, docs)
+
+    def test_primera_regla_del_sector_gana(self):
+        resultado = self.aplicar(descripcion_negocio='Delivery con buen ambiente')
+        self.assertEqual(resultado['tipo_estrategia'], 'operaciones')
+        resultado = self.aplicar(descripcion_negocio='Un ambiente tranquilo')
+        self.assertEqual(resultado['tipo_estrategia'], 'marketing')
+        self.assertIn('experiencia culinaria', resultado['descripcion_estrategia'])
+
+    def test_frases_de_varias_palabras_coinciden(self):
+        resultado = self.aplicar(recursos_disponibles='Tenemos bajo presupuesto y buen local')
+        self.assertIn('presupuesto ajustado', resultado['descripcion_estrategia'])
+        self.assertNotIn('buen local para organizar', resultado['descripcion_estrategia'])
+        resultado = self.aplicar(sector='consultoria', descripcion_negocio='Servimos a pequenas empresas')
+        self.assertIn('enfocada en PYMES', resultado['descripcion_estrategia'])
+
+    def test_sin_pln_usa_reglas_por_defecto(self):
+        resultado = self.motor.aplicar(datos_empresa(tamano='mediana', recursos_disponibles='bajo presupuesto'), None)
+        self.assertEqual(resultado['tipo_estrategia'], 'marketing')
+        self.assertIn('marketing local', resultado['descripcion_estrategia'])
+        self.assertEqual(resultado['impacto_estimado'], 'Mayor reconocimiento local y aumento del tráfico peatonal.')
+
+
+class ClasificadorTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.ruta = os.path.join(directorio.name, 'clasificador.joblib')
+        clasificador.reiniciar()
+        self.addCleanup(clasificador.reiniciar)
+
+        # Historial en el que el tipo depende del texto en sectores sin reglas propias
+        ejemplos = [('tecnologia', 'Desarrollo de software y aplicaciones web', 'digital'),
+                    ('salud', 'Clínica con listas de espera y turnos largos', 'operaciones')]
+        for sector, descripcion, tipo in ejemplos:
+            empresas = Empresa.objects.bulk_create([
+                Empresa(nombre=f'{sector} {i}', sector=sector, tamano='micro', descripcion_negocio=f'{descripcion} {i}.')
+                for i in range(30)
+            ])
+            Estrategia.objects.bulk_create([
+                Estrategia(empresa=empresa, tipo_estrategia=tipo, descripcion_estrategia='-') for empresa in empresas
+            ])
+
+    def test_entrenar_cargar_con_mmap_y_predecir_el_lote(self):
+        salida = StringIO()
+        call_command('entrenar_clasificador', salida=self.ruta, epocas=10, n_features=2 ** 12, stdout=salida)
+        self.assertIn('Trained on 54 strategies', salida.getvalue())
+
+        version_reglas = generacion.version_generador()
+        with override_settings(ESTRATEGIAS_CLASIFICADOR_ARCHIVO=self.ruta):
+            clasificador.reiniciar()
+            modelo = clasificador.obtener_clasificador()
+            self.assertIsInstance(modelo._coeficientes, numpy.memmap)
+            self.assertNotEqual(generacion.version_generador(), version_reglas) # Otra clave de caché
+
+            resultados = generar_estrategias_ia_lote([
+                datos_empresa(sector='tecnologia', descripcion_negocio='Software a medida'),
+                datos_empresa(sector='salud', descripcion_negocio='Clínica dental con turnos'),
+                datos_empresa(descripcion_negocio='Restaurante con delivery'), # Reglas propias
+            ], proveedor_nlp.cargar_nlp('tokenizador'), frozenset())
+        self.assertEqual([r['tipo_estrategia'] for r in resultados], ['digital', 'operaciones', 'operaciones'])
+
+    def test_sin_modelo_valido_se_usan_las_reglas(self):
+        with open(self.ruta, 'wb') as archivo:
+            archivo.write(b'no es un modelo')
+        with override_settings(ESTRATEGIAS_CLASIFICADOR_ARCHIVO=self.ruta):
+            clasificador.reiniciar()
+            with self.assertLogs('estrategias.clasificador', 'WARNING'):
+                self.assertIsNone(clasificador.obtener_clasificador())
+            resultado = generar_estrategia_ia(datos_empresa(sector='salud'), None, frozenset())
+        self.assertIn("sector de 'salud'", resultado['descripcion_estrategia'])
+
+
+class SimilaresTests(TestCase):
+    def setUp(self):
+        directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(directorio.cleanup)
+        self.directorio = directorio.name
+        self.addCleanup(similares.reiniciar)
+
+        grupos = [('restaurante', 'Cafetería artesanal con pasteles y café de especialidad'),
+                  ('tecnologia', 'Desarrollo de aplicaciones móviles para comercios'),
+                  ('salud', 'Clínica dental con ortodoncia infantil')]
+        for sector, descripcion in grupos:
+            empresas = Empresa.objects.bulk_create([
+                Empresa(nombre=f'{sector} {i}', sector=sector, tamano='micro', descripcion_negocio=f'{descripcion} {i}')
+                for i in range(5)
+            ])
+            Estrategia.objects.bulk_create([
+                Estrategia(empresa=empresa, tipo_estrategia='marketing', descripcion_estrategia='-') for empresa in empresas
+            ])
+
+    def _indice(self):
+        call_command('actualizar_similares', directorio=self.directorio, stdout=StringIO())
+        indice = similares.Indice(self.directorio, refresco=60)
+        indice.refrescar(forzar=True)
+        similares._indice = indice
+        return indice
+
+    def _sectores(self, resultados):
+        return {Empresa.objects.get(id=empresa_id).sector for empresa_id, _ in resultados}
+
+    def test_base_mapeada_y_cambios_en_memoria(self):
+        indice = self._indice()
+        self.assertIsInstance(indice.base._entradas_peso, numpy.memmap)
+        self.assertEqual(indice.base.filas, 15)
+        texto = similares.texto_empresa('salud', 'Clínica dental para niños')
+        resultados = indice.buscar(texto, k=5)
+        self.assertEqual(self._sectores(resultados), {'salud'})
+        self.assertEqual(resultados, sorted(resultados, key=lambda r: -r[1]))
+
+        # Una empresa modificada (save() o upsert) se anota; una nueva no hace falta
+        cafeteria = Empresa.objects.filter(sector='restaurante').first()
+        cafeteria.descripcion_negocio = 'Clínica dental con ortodoncia y cafetería'
+        cafeteria.save()
+        upsert_empresa(datos_empresa(nombre='salud 0', sector='salud', descripcion_negocio='Taller de bicicletas'))
+        upsert_empresa(datos_empresa(nombre='Dental Nueva', sector='salud', descripcion_negocio='Clínica dental nueva'))
+        self.assertEqual(CambioIndiceSimilares.objects.count(), 2)
+
+        indice.refrescar(forzar=True)
+        esperadas = {cafeteria.id, Empresa.objects.get(nombre='Dental Nueva').id,
+                     *Empresa.objects.filter(nombre__in=[f'salud {i}' for i in range(1, 5)]).values_list('id', flat=True)}
+        self.assertEqual({empresa_id for empresa_id, _ in indice.buscar(texto, k=6)}, esperadas)
+
+        # La reconstrucción incluye los cambios y vacía la tabla
+        indice = self._indice()
+        self.assertEqual(indice.base.filas, 16)
+        self.assertFalse(CambioIndiceSimilares.objects.exists())
+        self.assertEqual({empresa_id for empresa_id, _ in indice.buscar(texto, k=6)}, esperadas)
+
+    def test_filas_confirmadas_tarde_y_limite_de_cambios(self):
+        indice = self._indice()
+        texto = similares.texto_empresa('salud', 'Clínica dental para niños')
+        # Una empresa y un cambio que se confirman después de leer otros con ids mayores
+        maximo = Empresa.objects.order_by('-id').values_list('id', flat=True).first()
+        ultima = Empresa.objects.create(id=maximo + 10, **datos_empresa(nombre='Otra', descripcion_negocio='Panadería'))
+        indice.refrescar(forzar=True)
+        tardia = Empresa.objects.create(id=maximo + 5, **datos_empresa(
+            nombre='Tardía', sector='salud', descripcion_negocio='Clínica dental para niños'))
+        cafeteria = Empresa.objects.filter(sector='restaurante').first()
+        Empresa.objects.filter(id=cafeteria.id).update(descripcion_negocio='Clínica dental para niños')
+        CambioIndiceSimilares.objects.create(id=100, empresa_id=ultima.id) # Posterior, leído antes
+        indice.refrescar(forzar=True)
+        CambioIndiceSimilares.objects.create(id=50, empresa_id=cafeteria.id)
+        indice.refrescar(forzar=True)
+        self.assertLessEqual({tardia.id, cafeteria.id}, {empresa_id for empresa_id, _ in indice.buscar(texto, k=3)})
+
+        # Sin base y con más empresas que el límite no se vectoriza la tabla: 503
+        similares._indice = similares.Indice(os.path.join(self.directorio, 'vacio'), cambios_maximo=10)
+        respuesta = self.client.get(reverse('estrategias:api_similares'), {'descripcion': 'café'})
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(similares._indice._cambiadas, {})
+
+    def test_upsert_por_lotes_solo_anota_las_existentes(self):
+        Empresa.objects.bulk_create(
+            [Empresa(**datos_empresa(nombre='salud 1', descripcion_negocio='Otra cosa')),
+             Empresa(**datos_empresa(nombre='Empresa nueva'))],
+            update_conflicts=True, unique_fields=['nombre_normalizado'], update_fields=['descripcion_negocio'],
+        )
+        self.assertEqual(
+            list(CambioIndiceSimilares.objects.values_list('empresa_id', flat=True)),
+            [Empresa.objects.get(nombre='salud 1').id],
+        )
+
+    def test_endpoint_con_la_ultima_estrategia_de_cada_empresa(self):
+        self._indice()
+        referencia = Estrategia.objects.filter(empresa__sector='tecnologia').first()
+        parecida = Empresa.objects.filter(sector='tecnologia').exclude(id=referencia.empresa_id).first()
+        ultima = Estrategia.objects.create(empresa=parecida, tipo_estrategia='digital', descripcion_estrategia='Nueva')
+
+        url = reverse('estrategias:api_similares')
+        with self.assertNumQueries(3): # Empresa de referencia, empresas encontradas y sus estrategias
+            respuesta = self.client.get(url, {'estrategia': referencia.id, 'k': 4})
+        datos = respuesta.json()
+        self.assertEqual(len(datos['similares']), 4)
+        self.assertEqual({similar['sector'] for similar in datos['similares']}, {'tecnologia'})
+        self.assertNotIn(referencia.empresa_id, [similar['empresa_id'] for similar in datos['similares']])
+        similar = next(similar for similar in datos['similares'] if similar['empresa_id'] == parecida.id)
+        self.assertEqual(similar['estrategia']['estrategia_id'], ultima.id)
+        self.assertEqual(similar['estrategia']['url'], reverse('estrategias:detalle_estrategia', args=[ultima.id]))
+
+        respuesta = self.client.get(url, {'descripcion': 'café y pasteles', 'sector': 'restaurante', 'k': 2})
+        self.assertEqual({similar['sector'] for similar in respuesta.json()['similares']}, {'restaurante'})
+        self.assertEqual(self.client.get(url, {'estrategia': 999999}).status_code, 404)
+        for parametros in ({}, {'estrategia': 'x'}, {'empresa': 1, 'descripcion': 'a'}, {'empresa': 1, 'k': 100}):
+            self.assertEqual(self.client.get(url, parametros).status_code, 400)
+
+        # La página de detalle las pide al endpoint
+        detalle = self.client.get(reverse('estrategias:detalle_estrategia', args=[referencia.id]))
+        self.assertContains(detalle, f'{url}?estrategia={referencia.id}')
+
+
+class CacheGeneracionTests(TestCase):
+    def setUp(self):
+        cache_generacion.invalidar()
+        self.addCleanup(cache_generacion.invalidar)
+        self.nlp = proveedor_nlp.cargar_nlp('tokenizador')
+
+    def test_lru_con_ttl_y_contadores(self):
+        ahora = [0.0]
+        lru = cache_generacion.CacheLRU(tamano_maximo=2, ttl=10, reloj=lambda: ahora[0])
+        lru.guardar('a', 1)
+        lru.guardar('b', 2)
+        self.assertEqual(lru.obtener('a'), 1)
+        lru.guardar('c', 3)  # Desaloja 'b', la menos usada
+        self.assertIsNone(lru.obtener('b'))
+        ahora[0] = 11
+        self.assertIsNone(lru.obtener('a'))
+        self.assertEqual(lru.estadisticas(), {
+            'aciertos': 1, 'fallos': 2, 'desalojos': 1, 'caducados': 1, 'entradas': 1,
+        })
+
+    def test_entrada_normalizada_y_rama_generica_determinista(self):
+        datos = datos_empresa(sector='salud', descripcion_negocio='Clínica  con Crisis')
+        with mock.patch('estrategias.reglas.MotorReglas.aplicar', autospec=True,
+                        side_effect=MotorReglas.aplicar) as aplicar:
+            primero = cache_generacion.generar_estrategia_cacheada(datos, self.nlp, set())
+            segundo = cache_generacion.generar_estrategia_cacheada(
+                dict(datos, descripcion_negocio=' clínica con crisis '), self.nlp, set()
+            )
+        self.assertEqual(aplicar.call_count, 1)
+        self.assertEqual(primero, segundo)
+        # Sin la LRU, la misma entrada vuelve a elegir el mismo tipo
+        cache_generacion.invalidar()
+        self.assertEqual(cache_generacion.generar_estrategia_cacheada(datos, self.nlp, set()), primero)
+
+    @override_settings(
+        ESTRATEGIAS_CACHE_ALIAS='default',
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    )
+    def test_segundo_nivel_compartido(self):
+        datos = datos_empresa()
+        resultado = cache_generacion.generar_estrategia_cacheada(datos, self.nlp, set())
+        cache_generacion._lru.limpiar()  # Simula otro proceso con la LRU vacía
+        self.assertEqual(cache_generacion.generar_estrategia_cacheada(datos, self.nlp, set()), resultado)
+        self.assertEqual(cache_generacion.estadisticas()['aciertos_nivel2'], 1)
+
+
+@override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+class ValidacionJSONTests(TestCase):
+    def setUp(self):
+        self.url = reverse('estrategias:generar_estrategia')
+
+    def test_mismo_resultado_que_empresaform(self):
+        casos = [
+            datos_empresa(), datos_empresa(nombre='  Abc  ', sector=' SALUD ', recursos_disponibles='  '),
+            datos_empresa(nombre='ab'), datos_empresa(nombre='a' * 201), datos_empresa(sector='otro'),
+            datos_empresa(tamano=' micro'), datos_empresa(tamano='grande'), datos_empresa(descripcion_negocio=''),
+            datos_empresa(recursos_disponibles=None), datos_empresa(nombre=12345, recursos_disponibles=7),
+            datos_empresa(descripcion_negocio='a\x00b'), {'nombre': 'Solo nombre'}, {},
+        ]
+        for datos in casos:
+            form = EmpresaForm(datos)
+            esperado = (form.cleaned_data, None) if form.is_valid() else (
+                None, {campo: list(mensajes) for campo, mensajes in form.errors.items()}
+            )
+            self.assertEqual(validacion.validar_empresa(datos), esperado, datos)
+        self.assertEqual(validacion.validar_empresa(['no', 'es', 'objeto']), (None, {'__all__': [validacion.NO_ES_OBJETO]}))
+
+    def test_json_y_formulario_responden_igual(self):
+        respuesta = self.client.post(self.url, datos_empresa(nombre='  Cafetería JSON '), content_type='application/json')
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        estrategia = Estrategia.objects.select_related('empresa').get(id=datos['estrategia_id'])
+        self.assertEqual(datos['nombre_empresa'], estrategia.empresa.nombre)
+        self.assertEqual(datos['tipo_estrategia'], estrategia.tipo_estrategia)
+        self.assertEqual(datos['descripcion_estrategia'], estrategia.descripcion_estrategia)
+
+        invalidos = datos_empresa(nombre='ab', sector='otro')
+        json_invalido = self.client.post(self.url, invalidos, content_type='application/json')
+        formulario_invalido = self.client.post(self.url, invalidos)
+        self.assertEqual(json_invalido.status_code, 400)
+        self.assertEqual(json_invalido.json(), formulario_invalido.json())
+        self.assertEqual(set(json_invalido.json()['errors']), {'nombre', 'sector'})
+
+    def test_cuerpo_acotado_y_json_invalido(self):
+        with mock.patch.object(validacion, 'GENERACION_JSON_MAXIMO', 100):
+            respuesta = self.client.post(
+                self.url, datos_empresa(descripcion_negocio='x' * 200), content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 413)
+        self.assertFalse(respuesta.json()['success'])
+        respuesta = self.client.post(self.url, '{no es json', content_type='application/json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.json()['error'], 'El cuerpo debe ser JSON.')
+        self.assertFalse(Empresa.objects.exists())
+
+
+class AdminTests(TestCase):
+    def setUp(self):
+        usuario = get_user_model().objects.create_superuser('admin', 'admin@example.com', 'clave')
+        self.client.force_login(usuario)
+
+    def crear_empresas(self, cantidad, sector='restaurante'):
+        return Empresa.objects.bulk_create([
+            Empresa(nombre=f'Empresa admin {sector} {i}', sector=sector, tamano='micro', descripcion_negocio='Negocio.')
+            for i in range(cantidad)
+        ])
+
+    def test_listado_de_estrategias_sin_consulta_por_fila(self):
+        url = reverse('admin:estrategias_estrategia_changelist')
+        for empresa in self.crear_empresas(3):
+            crear_estrategias(1, empresa)
+        with CaptureQueriesContext(connection) as pocas:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        for empresa in self.crear_empresas(30, sector='salud'):
+            crear_estrategias(1, empresa)
+        with CaptureQueriesContext(connection) as muchas:
+            respuesta = self.client.get(url)
+        self.assertContains(respuesta, 'Empresa admin salud 29')
+        self.assertEqual(len(muchas), len(pocas))
+        self.assertFalse([consulta for consulta in muchas if 'DISTINCT' in consulta['sql']])
+
+    def test_paginador_estimado(self):
+        self.crear_empresas(10)
+        Empresa.objects.filter(id__in=Empresa.objects.order_by('id').values('id')[:2]).delete()
+        with mock.patch('estrategias.pagination.ADMIN_CONTEO_MAXIMO', 5):
+            # Sin filtros, el mayor id (sobrestima las borradas); con filtros, acotado
+            self.assertEqual(PaginadorEstimado(Empresa.objects.order_by('id'), 2).count, Empresa.objects.latest('id').id)
+            self.assertEqual(PaginadorEstimado(Empresa.objects.filter(tamano='micro').order_by('id'), 2).count, 5)
+        self.assertEqual(PaginadorEstimado(Empresa.objects.order_by('id'), 2).count, 8)
+
+    def test_jerarquia_de_fechas_igual_que_datetimes(self):
+        estrategias = crear_estrategias(4)
+        ahora = timezone.now()
+        for dias, estrategia in zip((0, 3, 40, 400), estrategias):
+            estrategia.fecha_generacion = ahora - timedelta(days=dias)
+        Estrategia.objects.bulk_update(estrategias, ['fecha_generacion'])
+        queryset = estrategias_admin.JerarquiaFechasQuerySet(Estrategia)
+        for nivel in ('year', 'month', 'day'):
+            self.assertEqual(
+                queryset.datetimes('fecha_generacion', nivel),
+                list(Estrategia.objects.datetimes('fecha_generacion', nivel)),
+            )
+        self.assertEqual(queryset.filter(id=0).datetimes('fecha_generacion', 'day'), [])
+        rango = {'primero': Min('fecha_generacion'), 'ultimo': Max('fecha_generacion')}
+        self.assertEqual(queryset.aggregate(**rango), Estrategia.objects.aggregate(**rango))
+
+    def test_busquedas(self):
+        crear_estrategias(1)
+        Empresa.objects.create(nombre='Otra cafetería', sector='salud', tamano='micro', descripcion_negocio='x')
+        respuesta = self.client.get(reverse('admin:estrategias_empresa_changelist'), {'q': '  CAFETERÍA del'})
+        self.assertContains(respuesta, 'Cafetería del Sol')
+        self.assertNotContains(respuesta, 'Otra cafetería')
+        respuesta = self.client.get(reverse('admin:estrategias_estrategia_changelist'), {'q': 'artesanal'})
+        self.assertContains(respuesta, 'Cafetería del Sol')
+        respuesta = self.client.get(reverse('admin:estrategias_estrategia_changelist'), {'q': 'inexistente'})
+        self.assertNotContains(respuesta, 'Cafetería del Sol')
+
+
+class GenerarEstrategiaAsyncTests(TestCase):
+    def setUp(self):
+        cache_generacion.invalidar()
+        self.addCleanup(cache_generacion.invalidar)
+        # Un hilo en el mismo proceso en lugar de procesos hijos
+        patcher = mock.patch('estrategias.trabajadores.POOL_PROCESOS', 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def test_genera_y_guarda(self):
+        respuesta = await self.async_client.post(
+            reverse('estrategias:generar_estrategia_async'), datos_empresa(), content_type='application/json'
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['tipo_estrategia'], 'operaciones')
+        self.assertTrue(await Estrategia.objects.filter(id=datos['estrategia_id']).aexists())
+
+    async def test_cache_fuera_del_bucle(self):
+        # Calcular la clave puede cargar el clasificador del disco: no en el hilo del bucle
+        hilos = []
+        version_generador = cache_generacion.version_generador
+
+        def version_registrando_hilo():
+            hilos.append(threading.get_ident())
+            return version_generador()
+
+        with mock.patch('estrategias.cache_generacion.version_generador', version_registrando_hilo):
+            respuesta = await self.async_client.post(
+                reverse('estrategias:generar_estrategia_async'), datos_empresa(), content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(hilos)
+        self.assertNotIn(threading.get_ident(), hilos)
+
+    async def test_pool_saturado_responde_503(self):
+        with mock.patch('estrategias.trabajadores.POOL_COLA', 0):
+            respuesta = await self.async_client.post(
+                reverse('estrategias:generar_estrategia_async'), datos_empresa(), content_type='application/json'
+            )
+        self.assertEqual(respuesta.status_code, 503)
+        self.assertEqual(respuesta['Retry-After'], '1')
+        self.assertFalse(await Empresa.objects.aexists())
+
+
+@override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+class ColaGeneracionTests(TestCase):
+    def setUp(self):
+        cache_generacion.invalidar()
+        self.addCleanup(cache_generacion.invalidar)
+        self.url = reverse('estrategias:generar_estrategia')
+
+    def _encolar(self, **cambios):
+        return self.client.post(self.url, datos_empresa(**cambios), content_type='application/json',
+                                HTTP_PREFER='respond-async')
+
+    def test_encola_responde_202_y_el_trabajador_la_genera(self):
+        with self.assertNumQueries(1): # Solo el INSERT del trabajo
+            respuesta = self._encolar()
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(respuesta['Preference-Applied'], 'respond-async')
+        datos = respuesta.json()
+        self.assertEqual(respuesta['Location'], datos['url_estado'])
+        self.assertFalse(Estrategia.objects.exists())
+
+        pendiente = self.client.get(datos['url_estado'])
+        self.assertEqual(pendiente.json()['estado'], 'pendiente')
+        self.assertEqual(pendiente['Retry-After'], '1')
+
+        self._encolar(nombre='Otra Empresa', sector='salud')
+        self._encolar(nombre='Sector Raro', sector='astronomia') # Inválido: 400, no se encola
+        self.assertEqual(TrabajoGeneracion.objects.count(), 2)
+        salida = StringIO()
+        call_command('run_generation_workers', once=True, stdout=salida)
+        self.assertIn('Completed 2 jobs', salida.getvalue())
+
+        completado = self.client.get(datos['url_estado'])
+        self.assertFalse(completado.has_header('Retry-After'))
+        resultado = completado.json()
+        estrategia = Estrategia.objects.get(id=resultado['estrategia_id'])
+        self.assertEqual(resultado['estado'], 'completado')
+        self.assertEqual(resultado['nombre_empresa'], 'Cafetería del Sol')
+        self.assertEqual(resultado['tipo_estrategia'], estrategia.tipo_estrategia)
+        self.assertEqual(Estrategia.objects.count(), 2)
+        self.assertEqual(self.client.get(reverse('estrategias:estado_trabajo', args=[999])).status_code, 404)
+
+    def test_reclamaciones_sin_solapes_y_vencidos(self):
+        for i in range(5):
+            cola.encolar(datos_empresa(nombre=f'Empresa {i}'))
+        primeros, segundos = cola.reclamar(3), cola.reclamar(3)
+        self.assertEqual([len(primeros), len(segundos)], [3, 2])
+        self.assertFalse({t.id for t in primeros} & {t.id for t in segundos})
+        self.assertEqual(cola.reclamar(3), [])
+
+        # Un trabajador que murió: sus trabajos vuelven a la cola y, si otro los reclama, el
+        # primero ya no guarda nada al terminar
+        TrabajoGeneracion.objects.filter(id__in=[t.id for t in primeros]).update(
+            fecha_inicio=timezone.now() - timedelta(hours=1)
+        )
+        self.assertEqual(cola.liberar_vencidos(), (3, 0))
+        reclamados_otra_vez = cola.reclamar(3)
+        self.assertEqual(cola.procesar(primeros), 0)
+        self.assertEqual(cola.procesar(reclamados_otra_vez + segundos), 5)
+        self.assertEqual(Estrategia.objects.count(), 5)
+
+    def test_un_trabajo_que_falla_no_bloquea_el_lote(self):
+        cola.encolar(datos_empresa(nombre='Empresa buena'))
+        roto = cola.encolar({'nombre': 'Empresa rota'}) # Datos incompletos
+        with self.assertLogs('estrategias.cola', 'ERROR'):
+            for _ in range(cola.COLA_INTENTOS):
+                cola.procesar(cola.reclamar())
+        roto.refresh_from_db()
+        self.assertEqual(roto.estado, TrabajoGeneracion.FALLIDO)
+        self.assertEqual(roto.intentos, cola.COLA_INTENTOS)
+        self.assertEqual(list(TrabajoGeneracion.objects.values_list('estado', flat=True).order_by('id')),
+                         ['completado', 'fallido'])
+        respuesta = self.client.get(reverse('estrategias:estado_trabajo', args=[roto.id])).json()
+        self.assertFalse(respuesta['success'])
+        self.assertTrue(respuesta['error'])
+
+
+class ComparacionBenchmarksTests(TestCase):
+    def test_detecta_regresiones_segun_el_tipo_de_metrica(self):
+        base = {'vistas': {'lista_consultas': 1, 'lista_media_ms': 10.0, 'rama_por_segundo': 1000.0}}
+        self.assertEqual(comparar({'vistas': {
+            'lista_consultas': 1, 'lista_media_ms': 11.5, 'rama_por_segundo': 900.0, 'nueva_ms': 99.0,
+        }}, base, tolerancia=0.2), [])
+        self.assertEqual(len(comparar({'vistas': {
+            'lista_consultas': 2, 'lista_media_ms': 12.5, 'rama_por_segundo': 700.0,
+        }}, base, tolerancia=0.2)), 3)
+
+
+@override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+class MetricasTests(TestCase):
+    def setUp(self):
+        metricas.registro.limpiar()
+        cache_generacion.invalidar()
+        self.addCleanup(cache_generacion.invalidar)
+
+    def test_server_timing_con_fases_y_consultas(self):
+        respuesta = self.client.post(
+            reverse('estrategias:generar_estrategia'), datos_empresa(), content_type='application/json'
+        )
+        fases = dict(parte.split(';', 1) for parte in respuesta['Server-Timing'].split(', '))
+        self.assertTrue({'nlp', 'reglas', 'db', 'total'} <= set(fases))
+        self.assertIn('consultas', fases['db'])
+
+        respuesta = self.client.get(reverse('estrategias:listar_estrategias'))
+        self.assertIn('render;dur=', respuesta['Server-Timing'])
+
+    def test_endpoint_prometheus(self):
+        self.client.get(reverse('estrategias:listar_estrategias'))
+        texto = self.client.get(reverse('metricas')).content.decode()
+        self.assertIn('# TYPE estrategias_peticion_segundos histogram', texto)
+        self.assertIn('estrategias_peticion_consultas_count{vista="estrategias:listar_estrategias"} 1', texto)
+        self.assertIn('estrategias_cache_generacion_total{resultado="aciertos"}', texto)
+
+    @mock.patch('estrategias.metricas.MUESTREO', 0.0)
+    def test_sin_muestreo_no_se_mide(self):
+        respuesta = self.client.get(reverse('estrategias:listar_estrategias'))
+        self.assertNotIn('Server-Timing', respuesta)
+
+
+class SeedSinteticoTests(TestCase):
+    def sembrar(self, semilla):
+        call_command('seed_db', count=25, batch_size=10, seed=semilla, stdout=StringIO())
+        return list(Estrategia.objects.order_by('empresa__nombre').values_list(
+            'empresa__nombre', 'empresa__descripcion_negocio', 'tipo_estrategia'
+        ))
+
+    def test_reproducible_por_semilla(self):
+        primera = self.sembrar(3)
+        self.assertEqual(len(primera), 25)
+        self.assertEqual(Empresa.objects.count(), 25)
+        self.assertEqual(self.sembrar(3), primera)
+        self.assertNotEqual(self.sembrar(4), primera)
+
+    def test_fechas_repartidas(self):
+        self.sembrar(3)
+        self.assertGreater(Estrategia.objects.values('fecha_generacion').distinct().count(), 1)
+        # Las estadísticas cuentan cada estrategia en el día de su fecha sintética
+        self.assertEqual(
+            sorted(EstadisticaDiaria.objects.filter(estrategias__gt=0).values_list(
+                'dia', 'sector', 'tamano', 'tipo_estrategia', 'estrategias')),
+            sorted(estadisticas.contar_estrategias()),
+        )
+
+    @override_settings(ESTRATEGIAS_NLP_MODO='tokenizador')
+    def test_siembra_tras_un_trabajo_completado(self):
+        trabajo = cola.encolar(datos_empresa())
+        call_command('run_generation_workers', once=True, stdout=StringIO())
+        trabajo.refresh_from_db()
+        self.assertEqual(trabajo.estado, TrabajoGeneracion.COMPLETADO)
+
+        self.sembrar(3)
+        connection.check_constraints() # Las FK de SQLite se comprueban al confirmar
+        trabajo.refresh_from_db()
+        self.assertIsNone(trabajo.estrategia_id)
+        self.assertEqual(trabajo.estado, TrabajoGeneracion.COMPLETADO)
+
+    def test_empresa_sintetica_valida_para_el_formulario(self):
+        for indice in range(50):
+            self.assertTrue(EmpresaForm(sintetico.empresa_sintetica(0, indice)).is_valid())
@@ -0,0 +1,112 @@
+# estrategias/trabajadores.py
+# Pool acotado de trabajadores para la parte de CPU de la generación (spaCy + reglas).
+#
+# Bajo ASGI, ejecutar spaCy dentro del bucle de eventos bloquea todas las peticiones de ese
+# worker. La vista asíncrona manda el trabajo a este pool y espera sin bloquear. Cada
+# proceso del pool carga el modelo de PLN una sola vez, al arrancar.
+#
+# La consulta a la caché de generación tampoco corre en el bucle: calcular la clave puede
+# cargar el clasificador del disco (version_generador()) y el nivel 2 es una caché de red.
+#
+# La cola está acotada: si ya hay ESTRATEGIAS_POOL_COLA trabajos en curso se lanza
+# PoolSaturado y la vista responde 503 con Retry-After, en vez de acumular latencia.
+import asyncio
+import atexit
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+from . import cache_generacion, metricas
+from . import nlp as proveedor_nlp
+from .generacion import generar_estrategia_ia
+
+# 0 procesos = un hilo dentro del mismo proceso (útil en desarrollo y en tests)
+POOL_PROCESOS = getattr(settings, 'ESTRATEGIAS_POOL_PROCESOS', 2)
+POOL_COLA = getattr(settings, 'ESTRATEGIAS_POOL_COLA', max(POOL_PROCESOS, 1) * 4)
+POOL_METODO_INICIO = getattr(settings, 'ESTRATEGIAS_POOL_METODO_INICIO', 'spawn')
+POOL_RETRY_AFTER = getattr(settings, 'ESTRATEGIAS_POOL_RETRY_AFTER', 1) # Segundos
+
+_lock = threading.Lock()
+_executor = None
+_en_curso = 0
+
+
+class PoolSaturado(Exception):
+    """No quedan plazas en la cola del pool de generación."""
+
+
+def _inicializar_trabajador():
+    # Se ejecuta una vez por proceso del pool, antes de recibir trabajo
+    import django
+    django.setup()
+    proveedor_nlp.precargar()
+
+
+def _generar(datos, clave):
+    # Devuelve también los tiempos por fase, que se miden aquí pero se informan en el proceso web
+    with metricas.activar(metricas.MedicionPeticion()) as medicion:
+        resultado = generar_estrategia_ia(
+            datos, proveedor_nlp.obtener_nlp(), proveedor_nlp.obtener_stopwords(),
+            azar=cache_generacion.azar_para(clave),
+        )
+    return resultado, medicion.fases
+
+
+def _buscar_en_cache(empresa_data):
+    datos, clave = cache_generacion.preparar(empresa_data)
+    return datos, clave, cache_generacion.buscar(clave)
+
+
+def obtener_executor():
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                if POOL_PROCESOS > 0:
+                    _executor = ProcessPoolExecutor(
+                        max_workers=POOL_PROCESOS,
+                        mp_context=multiprocessing.get_context(POOL_METODO_INICIO),
+                        initializer=_inicializar_trabajador,
+                    )
+                else:
+                    _executor = ThreadPoolExecutor(max_workers=1, initializer=proveedor_nlp.precargar)
+                atexit.register(_executor.shutdown, wait=False, cancel_futures=True)
+    return _executor
+
+
+def _reservar_plaza():
+    global _en_curso
+    with _lock:
+        if _en_curso >= POOL_COLA:
+            raise PoolSaturado()
+        _en_curso += 1
+
+
+def _liberar_plaza():
+    global _en_curso
+    with _lock:
+        _en_curso -= 1
+
+
+async def generar_estrategia_async(empresa_data):
+    """
+    Versión asíncrona de generar_estrategia_cacheada: los aciertos de caché se
+    resuelven en el acto y los fallos se calculan en el pool sin bloquear el bucle.
+    Lanza PoolSaturado si la cola está llena.
+    """
+    datos, clave, resultado = await sync_to_async(_buscar_en_cache, thread_sensitive=False)(empresa_data)
+    if resultado is not None:
+        return resultado
+
+    _reservar_plaza()
+    try:
+        loop = asyncio.get_running_loop()
+        resultado, fases = await loop.run_in_executor(obtener_executor(), _generar, datos, clave)
+    finally:
+        _liberar_plaza()
+    metricas.sumar_fases(fases)
+    await sync_to_async(cache_generacion.guardar, thread_sensitive=False)(clave, resultado)
+    return resultado
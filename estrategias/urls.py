@@ -1,10 +1,19 @@
 from django.urls import path
-from .views import GenerarEstrategiaView, ListarEstrategiasView, DetalleEstrategiaView
+from .views import GenerarEstrategiaView, GenerarEstrategiaAsyncView, GenerarEstrategiasLoteView, EstadoTrabajoView, ListarEstrategiasView, ListarEstrategiasAPIView, BuscarEstrategiasAPIView, ExportarEstrategiasView, EstadisticasAPIView, SimilaresAPIView, DetalleEstrategiaView, DetalleEstrategiaAPIView
 
 app_name = 'estrategias' # Esto es útil para referenciar las URLs fácilmente
 
 urlpatterns = [
     path('generar/', GenerarEstrategiaView.as_view(), name='generar_estrategia'),
+    path('generar/async/', GenerarEstrategiaAsyncView.as_view(), name='generar_estrategia_async'),
+    path('generar/lote/', GenerarEstrategiasLoteView.as_view(), name='generar_estrategias_lote'),
+    path('trabajos/<int:trabajo_id>/', EstadoTrabajoView.as_view(), name='estado_trabajo'),
     path('lista/', ListarEstrategiasView.as_view(), name='listar_estrategias'),
+    path('api/lista/', ListarEstrategiasAPIView.as_view(), name='api_listar_estrategias'),
+    path('api/buscar/', BuscarEstrategiasAPIView.as_view(), name='api_buscar_estrategias'),
+    path('exportar/<str:formato>/', ExportarEstrategiasView.as_view(), name='exportar_estrategias'),
+    path('api/estadisticas/', EstadisticasAPIView.as_view(), name='api_estadisticas'),
+    path('api/similares/', SimilaresAPIView.as_view(), name='api_similares'),
     path('<int:estrategia_id>/', DetalleEstrategiaView.as_view(), name='detalle_estrategia'),
+    path('api/<int:estrategia_id>/', DetalleEstrategiaAPIView.as_view(), name='api_detalle_estrategia'),
 ]
\ No newline at end of file
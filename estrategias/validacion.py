@@ -0,0 +1,112 @@
+# estrategias/validacion.py
+# Camino JSON de la vista de generación (peticiones con Content-Type: application/json).
+#
+# Los formularios HTML siguen pasando por EmpresaForm. Para los clientes de la API, la vista
+# lee el cuerpo solo si no supera ESTRATEGIAS_GENERACION_JSON_MAXIMO bytes y lo valida con
+# validar_empresa(). Esa función no crea ningún formulario: las reglas se leen una vez al
+# importar el módulo de los campos de EmpresaForm y de Empresa (obligatorios, longitudes
+# máximas, opciones de tamano) y de forms.py (sectores y longitud mínima del nombre).
+#
+# Acepta exactamente lo mismo que EmpresaForm y devuelve el mismo cleaned_data. Los datos
+# inválidos se pasan al propio formulario para obtener los errores, así que los mensajes son
+# los mismos en los dos caminos. Solo el camino sin errores tiene que ser rápido.
+import json
+
+from django.conf import settings
+from django.core.validators import EMPTY_VALUES
+
+from .forms import CONJUNTO_SECTORES, LONGITUD_MINIMA_NOMBRE, EmpresaForm
+
+# Tamaño máximo en bytes del cuerpo JSON de una petición de generación
+GENERACION_JSON_MAXIMO = getattr(settings, 'ESTRATEGIAS_GENERACION_JSON_MAXIMO', 64 * 1024)
+# Y del endpoint por lotes (hasta LOTE_MAXIMO empresas)
+LOTE_JSON_MAXIMO = getattr(settings, 'ESTRATEGIAS_LOTE_JSON_MAXIMO', 4 * 1024 * 1024)
+
+NO_ES_OBJETO = 'Cada registro debe ser un objeto con los campos de la empresa.'
+
+
+class CuerpoInvalido(ValueError):
+    """El cuerpo de la petición es demasiado grande o no es JSON."""
+
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+def _compilar_campos():
+    # (campo, obligatorio, longitud máxima, valor vacío, opciones) en el orden del formulario.
+    # Las opciones, solo para los campos con choices (tamano), salen del modelo
+    modelo = EmpresaForm._meta.model
+    campos = []
+    for nombre, campo in EmpresaForm.base_fields.items():
+        choices = modelo._meta.get_field(nombre).choices
+        opciones = frozenset(str(valor) for valor, _ in choices) if choices else None
+        campos.append((
+            nombre, campo.required, getattr(campo, 'max_length', None),
+            getattr(campo, 'empty_value', ''), opciones,
+        ))
+    return tuple(campos)
+
+
+_CAMPOS = _compilar_campos()
+
+
+def _errores_formulario(datos):
+    form = EmpresaForm(datos)
+    form.is_valid()
+    return None, {campo: list(mensajes) for campo, mensajes in form.errors.items()}
+
+
+def validar_empresa(datos):
+    """
+    Valida un diccionario con los campos de EmpresaForm. Devuelve (cleaned_data, None) o
+    (None, {campo: [mensajes]}), con los mismos mensajes que el formulario.
+    """
+    if not isinstance(datos, dict):
+        return None, {'__all__': [NO_ES_OBJETO]}
+    limpios = {}
+    for nombre, obligatorio, max_length, vacio, opciones in _CAMPOS:
+        valor = datos.get(nombre)
+        # Igual que CharField/ChoiceField.to_python: los vacíos no se convierten a texto
+        if valor not in EMPTY_VALUES:
+            valor = str(valor)
+            if opciones is None:
+                valor = valor.strip()
+        if valor in EMPTY_VALUES:
+            if obligatorio:
+                return _errores_formulario(datos)
+            limpios[nombre] = vacio
+            continue
+        if opciones is not None:
+            if valor not in opciones:
+                return _errores_formulario(datos)
+        elif '\x00' in valor or (max_length is not None and len(valor) > max_length):
+            return _errores_formulario(datos)
+        limpios[nombre] = valor
+    # clean_nombre y clean_sector
+    if len(limpios['nombre']) < LONGITUD_MINIMA_NOMBRE:
+        return _errores_formulario(datos)
+    limpios['sector'] = limpios['sector'].lower()
+    if limpios['sector'] not in CONJUNTO_SECTORES:
+        return _errores_formulario(datos)
+    return limpios, None
+
+
+def leer_json(request, maximo=None):
+    """
+    El cuerpo JSON de la petición, decodificado. Lanza CuerpoInvalido (413) si supera
+    `maximo` bytes (por defecto GENERACION_JSON_MAXIMO), comprobándolo antes de leerlo si
+    llega Content-Length, o (400) si no es JSON.
+    """
+    if maximo is None:
+        maximo = GENERACION_JSON_MAXIMO
+    try:
+        longitud = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        longitud = 0
+    if longitud > maximo or len(request.body) > maximo:
+        raise CuerpoInvalido(f'El cuerpo no puede superar {maximo} bytes.', status=413)
+    try:
+        return json.loads(request.body)
+    except (json.JSONDecodeError, UnicodeDecodeError):
+        raise CuerpoInvalido('El cuerpo debe ser JSON.')
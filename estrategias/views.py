@@ -1,154 +1,85 @@
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils.decorators import method_decorator
 from django.views import View
-from .models import Empresa, Estrategia
+from .models import CAMPOS_CONTENIDO, Estrategia, PaginaSitemap, TrabajoGeneracion
 from .forms import EmpresaForm # ¡Importamos nuestro formulario!
-from django.http import JsonResponse
+from .condicional import calcular_etag, condicional, respuesta_condicional, validadores_listado
+from .pagination import CursorInvalido, leer_limite, paginar_por_cursor
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
+import gzip
 import json
-import random
-
-# Importaciones para PLN
-import spacy
-import nltk
-from nltk.corpus import stopwords
-from nltk.tokenize import word_tokenize
-
-# --- Carga de modelos PLN (se ejecuta una sola vez al iniciar el servidor) ---
-try:
-    nlp = spacy.load("es_core_news_sm")
-    # Descargar stopwords de NLTK si no están presentes
-    try:
-        spanish_stopwords = set(stopwords.words('spanish'))
-    except LookupError:
-        nltk.download('stopwords')
-        spanish_stopwords = set(stopwords.words('spanish'))
-    # Descargar punkt tokenizer de NLTK si no está presente
+
+from asgiref.sync import sync_to_async
+
+# Los modelos de PLN se cargan de forma perezosa (ver estrategias/nlp.py)
+from . import busqueda, cache_detalle, cache_generacion, cola, estadisticas, exportacion, metricas, similares, sitemaps, validacion
+from . import nlp as proveedor_nlp
+from .cache_generacion import generar_estrategia_cacheada
+from .generacion import generar_estrategia_ia  # noqa: F401 (se reexporta por compatibilidad)
+from .servicios import LOTE_MAXIMO, generar_estrategias_en_lote, registrar_estrategia
+from .trabajadores import POOL_RETRY_AFTER, PoolSaturado, generar_estrategia_async
+
+
+def _leer_datos(request):
     try:
-        nltk.data.find('tokenizers/punkt')
-    except LookupError:
-        nltk.download('punkt')
-
-except Exception as e:
-    print(f"Error al cargar modelos de PLN: {e}. Las funciones de PLN no estarán disponibles.")
-    # Si hay un error al cargar, definimos nlp como None para evitar fallos.
-    # Podrías considerar un mecanismo de fallback aquí.
-    nlp = None
-    spanish_stopwords = set()
-
-
-# Función auxiliar para la lógica de generación de estrategia (para mantener el código limpio)
-def generar_estrategia_ia(empresa_data, nlp_model, stopwords_set):
-    nombre_empresa = empresa_data['nombre']
-    sector_empresa = empresa_data['sector'].lower() # Convertir a minúsculas para consistencia
-    tamano_empresa = empresa_data['tamano']
-    descripcion_negocio = empresa_data['descripcion_negocio']
-    recursos_disponibles = empresa_data['recursos_disponibles'] or "" # Asegurar que no sea None
-
-    estrategia_generada = ""
-    impacto = ""
-    tipo_elegido = ""
-
-    # --- Análisis de texto con spaCy y NLTK ---
-    keywords_descripcion = []
-    keywords_recursos = []
-    tiene_desafio = False
-
-    if nlp_model: # Solo si el modelo de PLN se cargó correctamente
-        doc_descripcion = nlp_model(descripcion_negocio.lower())
-        doc_recursos = nlp_model(recursos_disponibles.lower())
-
-        keywords_descripcion = [
-            token.text for token in doc_descripcion
-            if token.is_alpha and token.text not in stopwords_set
-        ]
-        keywords_recursos = [
-            token.text for token in doc_recursos
-            if token.is_alpha and token.text not in stopwords_set
-        ]
-
-        # Detección de posibles desafíos (simulación de análisis de sentimiento básico)
-        desafios_palabras = ['competencia', 'crisis', 'problema', 'bajas ventas', 'costos altos', 'escasez', 'retrasos']
-        tiene_desafio = any(word in descripcion_negocio.lower() for word in desafios_palabras)
-
-    # --- Lógica de generación de estrategias basada en reglas ---
-
-    # Priorización de estrategias según el sector y tamaño
-    if sector_empresa == 'restaurante':
-        tipo_elegido = 'marketing' # Default para restaurante
-        if 'delivery' in keywords_descripcion or 'envio' in keywords_descripcion or 'domicilio' in keywords_descripcion:
-            tipo_elegido = 'operaciones'
-            estrategia_generada = f"Para tu {tamano_empresa} restaurante, optimiza tu servicio de delivery. Mejora tiempos de entrega, invierte en empaques adecuados y promociona en plataformas populares. Considera alianzas estratégicas con servicios de entrega."
-            impacto = "Aumento de pedidos a domicilio y expansión de la base de clientes."
-        elif 'experiencia' in keywords_descripcion or 'ambiente' in keywords_descripcion or 'tematico' in keywords_descripcion:
-            tipo_elegido = 'marketing'
-            estrategia_generada = f"Para tu {tamano_empresa} restaurante, crea una experiencia culinaria única. Organiza noches temáticas, talleres de cocina o eventos con música en vivo. Usa redes sociales para mostrar el ambiente y los platos más atractivos."
-            impacto = "Incremento de clientes en el local y mejora de la reputación de marca."
-        else:
-            estrategia_generada = f"Para tu {tamano_empresa} restaurante, céntrate en marketing local. Publica anuncios en medios comunitarios, participa en eventos del barrio y ofrece promociones especiales para atraer a residentes cercanos."
-            impacto = "Mayor reconocimiento local y aumento del tráfico peatonal."
-
-    elif sector_empresa == 'tienda de ropa':
-        tipo_elegido = 'ventas' # Default para tienda de ropa
-        if 'online' in keywords_descripcion or 'e-commerce' in keywords_descripcion or 'web' in keywords_descripcion:
-            tipo_elegido = 'digital'
-            estrategia_generada = f"Para tu {tamano_empresa} tienda de ropa, impulsa tu plataforma de e-commerce. Optimiza la experiencia de compra online, ofrece envíos rápidos y políticas de devolución claras, y utiliza publicidad digital segmentada."
-            impacto = "Expansión del alcance de clientes a nivel nacional (o regional) y aumento de ventas online."
-        elif 'boutique' in keywords_descripcion or 'exclusivo' in keywords_descripcion or 'diseno' in keywords_descripcion:
-            tipo_elegido = 'marketing'
-            estrategia_generada = f"Para tu {tamano_empresa} boutique de ropa, enfócate en marketing de exclusividad. Organiza eventos de lanzamiento de nuevas colecciones, colabora con influencers de moda y crea un programa de fidelización VIP."
-            impacto = "Posicionamiento de marca de lujo/exclusiva y aumento del valor promedio de compra."
-        else:
-            estrategia_generada = f"Para tu {tamano_empresa} tienda de ropa, mejora la experiencia en tienda. Capacita a tu personal en ventas consultivas, organiza vitrinas atractivas y ofrece asesoría de imagen personalizada."
-            impacto = "Incremento de la tasa de conversión en tienda y fidelización de clientes."
-
-    elif sector_empresa == 'consultoria':
-        tipo_elegido = 'ventas' # Default para consultoría
-        if 'digital' in keywords_descripcion or 'tecnologia' in keywords_descripcion or 'software' in keywords_descripcion:
-            tipo_elegido = 'marketing'
-            estrategia_generada = f"Para tu {tamano_empresa} consultoría tecnológica, posiciona tu marca como líder de pensamiento. Crea blogs, webinars y estudios de caso que demuestren tu experiencia. Participa en conferencias y eventos del sector."
-            impacto = "Atrae leads de alta calidad y establece autoridad en tu nicho."
-        elif 'pymes' in keywords_descripcion or 'pequenas empresas' in keywords_descripcion:
-            tipo_elegido = 'ventas'
-            estrategia_generada = f"Para tu {tamano_empresa} consultoría enfocada en PYMES, desarrolla paquetes de servicios accesibles y claros. Ofrece talleres gratuitos o diagnósticos iniciales de bajo costo para captar clientes potenciales."
-            impacto = "Aumento de la base de clientes PYME y generación de nuevas oportunidades."
-        else:
-            estrategia_generada = f"Para tu {tamano_empresa} consultoría, busca referencias y testimonios de clientes satisfechos. Crea un programa de incentivos por recomendaciones. Asiste a eventos de networking y ferias empresariales."
-            impacto = "Crecimiento orgánico a través de la reputación y la confianza."
+        # Intentar parsear como JSON (clientes que no envían Content-Type: application/json)
+        return json.loads(request.body)
+    except json.JSONDecodeError:
+        # Si no es JSON, asumir datos de formulario POST tradicional (para la demo HTML simple)
+        return request.POST.dict()
+
 
+def _validar_empresa(request):
+    """(cleaned_data, None) si los datos de la empresa son válidos, o (None, respuesta de error)."""
+    if request.content_type == 'application/json':
+        # Camino de la API: cuerpo acotado y validación sin instanciar EmpresaForm (ver validacion.py)
+        try:
+            cleaned_data, errores = validacion.validar_empresa(validacion.leer_json(request))
+        except validacion.CuerpoInvalido as e:
+            return None, JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+    elif request.content_type in ('application/x-www-form-urlencoded', 'multipart/form-data'):
+        # Formularios HTML: directamente request.POST, sin intentar antes decodificar JSON
+        cleaned_data, errores = _validar_formulario(request.POST.dict())
     else:
-        # Estrategia genérica si el sector no está cubierto por reglas específicas
-        tipo_elegido = random.choice(['marketing', 'ventas', 'operaciones', 'digital', 'expansion', 'financiera'])
-        estrategia_generada = f"Para tu {tamano_empresa} empresa en el sector de '{sector_empresa}', una estrategia general sería: "
-        if tiene_desafio:
-            estrategia_generada += "primero, identifica y aborda los desafíos internos o externos que enfrentas. Realiza un análisis FODA. "
-        estrategia_generada += "Luego, enfócate en mejorar tu presencia online (sitio web, redes sociales), optimizar tu propuesta de valor y fortalecer la relación con tus clientes existentes."
-        impacto = "Mejora general del rendimiento del negocio y mayor resiliencia ante desafíos."
-
-    # Lógica adicional basada en tamaño y recursos
-    if tamano_empresa == 'micro':
-        estrategia_generada += " Dada tu escala de microempresa, prioriza estrategias de bajo costo y alto impacto, como marketing de boca en boca, optimización de redes sociales orgánicas y colaboraciones locales."
-        impacto += " Ideal para recursos limitados."
-    elif tamano_empresa == 'pequena':
-        estrategia_generada += " Como pequeña empresa, considera invertir en herramientas que automaticen tareas repetitivas y te permitan escalar, como un CRM sencillo o software de gestión de proyectos."
-        impacto += " Permite un crecimiento más eficiente y mejor organización."
-
-    if 'bajo presupuesto' in keywords_recursos or 'limitados recursos' in keywords_recursos:
-        estrategia_generada += " Con un presupuesto ajustado, enfócate en estrategias de guerrilla marketing, maximiza el uso de herramientas gratuitas de análisis y promoción online, y busca alianzas estratégicas."
-        impacto += " Optimización del retorno de inversión con recursos escasos."
-    elif 'buen local' in keywords_recursos or 'ubicacion privilegiada' in keywords_recursos:
-        estrategia_generada += " Aprovecha tu buen local para organizar eventos, exhibiciones o demostraciones de productos que atraigan a clientes y creen comunidad. Asegura una señalización clara y atractiva."
-        impacto += " Aumento del tráfico en tienda y visibilidad local."
-    elif 'equipo pequeno' in keywords_recursos or 'personal reducido' in keywords_recursos:
-        estrategia_generada += " Con un equipo pequeño, la automatización y la delegación inteligente son clave. Capacita a tu personal en tareas multifuncionales y considera externalizar servicios no esenciales."
-        impacto += " Maximización de la productividad del personal existente."
-    elif 'experiencia tecnica' in keywords_recursos or 'conocimiento especializado' in keywords_recursos:
-        estrategia_generada += " Capitaliza tu experiencia técnica/conocimiento especializado creando contenido de valor (blogs, videos, podcasts) y ofreciendo talleres o consultorías personalizadas para posicionarte como referente."
-        impacto += " Posicionamiento como líder de la industria y atracción de clientes de alto valor."
-
-    return {
-        'tipo_estrategia': tipo_elegido,
-        'descripcion_estrategia': estrategia_generada,
-        'impacto_estimado': impacto
-    }
+        cleaned_data, errores = _validar_formulario(_leer_datos(request))
+    if errores:
+        return None, JsonResponse({'success': False, 'errors': errores}, status=400)
+    return cleaned_data, None
+
+
+def _validar_formulario(datos):
+    if not isinstance(datos, dict):
+        return None, {'__all__': [validacion.NO_ES_OBJETO]}
+    form = EmpresaForm(datos)
+    if form.is_valid():
+        return form.cleaned_data, None
+    return None, form.errors
+
+
+def _respuesta_estrategia(cleaned_data, estrategia_info, estrategia):
+    # Con los datos que ya tiene la vista: no vuelve a leer los atributos de los modelos
+    return JsonResponse({
+        'success': True,
+        'estrategia_id': estrategia.pk,
+        'nombre_empresa': cleaned_data['nombre'],
+        'tipo_estrategia': estrategia_info['tipo_estrategia'],
+        'descripcion_estrategia': estrategia_info['descripcion_estrategia'],
+        'impacto_estimado': estrategia_info['impacto_estimado'],
+    })
+
+
+def _respuesta_trabajo(request, trabajo):
+    # 202 Accepted: la estrategia se generará en run_generation_workers (ver cola.py)
+    url = reverse('estrategias:estado_trabajo', args=[trabajo.id])
+    respuesta = JsonResponse(
+        {'success': True, 'trabajo_id': trabajo.id, 'estado': trabajo.estado, 'url_estado': url}, status=202,
+    )
+    respuesta['Location'] = url
+    if 'respond-async' in request.headers.get('Prefer', '').lower():
+        respuesta['Preference-Applied'] = 'respond-async'
+    return respuesta
 
 
 # Vistas de la aplicación
@@ -158,85 +89,349 @@ class GenerarEstrategiaView(View):
         return render(request, 'estrategias/generar_estrategia.html')
 
     def post(self, request):
-        data = {}
+        # Validar los datos recibidos: JSON (API) o formulario según el Content-Type
+        cleaned_data, respuesta_error = _validar_empresa(request)
+        if respuesta_error is not None:
+            # Si los datos NO son válidos, devolvemos los errores del formulario
+            return respuesta_error
+
+        # Modo asíncrono: se encola y se responde 202 sin esperar al PLN
+        if cola.pide_respuesta_asincrona(request):
+            return _respuesta_trabajo(request, cola.encolar(cleaned_data))
+
+        # 1. Generar la estrategia usando la lógica de IA/ML (o reutilizarla de la caché)
+        estrategia_info = generar_estrategia_cacheada(
+            cleaned_data,
+            proveedor_nlp.obtener_nlp(), # Pasamos el modelo de PLN (se carga la primera vez)
+            proveedor_nlp.obtener_stopwords() # Pasamos las stopwords
+        )
+
+        # 2 y 3. Guardar la empresa (crearla, o actualizarla solo si cambió) y la estrategia,
+        # en una transacción y sin duplicados aunque lleguen dos peticiones a la vez
+        _, nueva_estrategia = registrar_estrategia(cleaned_data, estrategia_info)
+
+        # 4. Devolver la estrategia al usuario como JSON
+        return _respuesta_estrategia(cleaned_data, estrategia_info, nueva_estrategia)
+
+
+class GenerarEstrategiaAsyncView(View):
+    # Misma API que GenerarEstrategiaView, pero pensada para ASGI: el PLN corre en el pool de
+    # estrategias/trabajadores.py y la base de datos se usa con el ORM asíncrono
+    async def get(self, request):
+        return render(request, 'estrategias/generar_estrategia.html')
+
+    async def post(self, request):
+        cleaned_data, respuesta_error = _validar_empresa(request)
+        if respuesta_error is not None:
+            return respuesta_error
+        if cola.pide_respuesta_asincrona(request):
+            return _respuesta_trabajo(request, await sync_to_async(cola.encolar)(cleaned_data))
+
+        # Generamos antes de escribir: si el pool está saturado no se toca la base de datos
         try:
-            # Intentar parsear como JSON (para cuando se integre con Vue/React)
-            data = json.loads(request.body)
-        except json.JSONDecodeError:
-            # Si no es JSON, asumir datos de formulario POST tradicional (para la demo HTML simple)
-            data = request.POST.dict()
-
-        # Instanciar el formulario con los datos recibidos
-        form = EmpresaForm(data)
-
-        if form.is_valid():
-            # Si los datos son válidos, los obtenemos
-            cleaned_data = form.cleaned_data
-
-            # 1. Guardar la información de la empresa (o actualizar si ya existe)
-            # Usamos get_or_create para evitar duplicados si el nombre ya existe
-            empresa, created = Empresa.objects.get_or_create(
-                nombre=cleaned_data['nombre'],
-                defaults={
-                    'sector': cleaned_data['sector'],
-                    'tamano': cleaned_data['tamano'],
-                    'descripcion_negocio': cleaned_data['descripcion_negocio'],
-                    'recursos_disponibles': cleaned_data['recursos_disponibles']
-                }
+            estrategia_info = await generar_estrategia_async(cleaned_data)
+        except PoolSaturado:
+            respuesta = JsonResponse(
+                {'success': False, 'error': 'El servidor está ocupado. Inténtalo de nuevo en unos segundos.'},
+                status=503,
             )
-            if not created:
-                # Si la empresa ya existía, actualizamos sus datos
-                empresa.sector = cleaned_data['sector']
-                empresa.tamano = cleaned_data['tamano']
-                empresa.descripcion_negocio = cleaned_data['descripcion_negocio']
-                empresa.recursos_disponibles = cleaned_data['recursos_disponibles']
-                empresa.save()
-
-            # 2. Generar la estrategia usando la lógica de IA/ML
-            estrategia_info = generar_estrategia_ia(
-                {
-                    'nombre': empresa.nombre,
-                    'sector': empresa.sector,
-                    'tamano': empresa.tamano,
-                    'descripcion_negocio': empresa.descripcion_negocio,
-                    'recursos_disponibles': empresa.recursos_disponibles
-                },
-                nlp, # Pasamos el modelo de PLN
-                spanish_stopwords # Pasamos las stopwords
+            respuesta['Retry-After'] = str(POOL_RETRY_AFTER)
+            return respuesta
+
+        # Las transacciones del ORM son síncronas: el upsert corre en el hilo de sync_to_async
+        _, nueva_estrategia = await sync_to_async(registrar_estrategia)(cleaned_data, estrategia_info)
+        return _respuesta_estrategia(cleaned_data, estrategia_info, nueva_estrategia)
+
+
+class GenerarEstrategiasLoteView(View):
+    # Recibe {"empresas": [...]} (o directamente una lista) y genera todas las estrategias de una vez
+    def post(self, request):
+        try:
+            data = validacion.leer_json(request, validacion.LOTE_JSON_MAXIMO)
+        except validacion.CuerpoInvalido as e:
+            return JsonResponse({'success': False, 'error': str(e)}, status=e.status)
+
+        empresas = data.get('empresas') if isinstance(data, dict) else data
+        if not isinstance(empresas, list) or not empresas:
+            return JsonResponse({'success': False, 'error': 'Se esperaba una lista no vacía de empresas.'}, status=400)
+        if len(empresas) > LOTE_MAXIMO:
+            return JsonResponse({'success': False, 'error': f'Máximo {LOTE_MAXIMO} empresas por lote.'}, status=400)
+
+        resultados = generar_estrategias_en_lote(empresas)
+        return JsonResponse({
+            'success': all(resultado['success'] for resultado in resultados),
+            'resultados': resultados,
+        })
+
+
+class EstadoTrabajoView(View):
+    # Estado de un trabajo de la cola de generación (ver cola.py); al completarse incluye la
+    # estrategia con los mismos campos que la respuesta síncrona. Mientras no termina lleva
+    # Retry-After, el intervalo de sondeo sugerido
+    def get(self, request, trabajo_id):
+        datos = cola.estado(trabajo_id)
+        if datos is None:
+            return JsonResponse({'success': False, 'errors': {'trabajo_id': ['El trabajo no existe.']}}, status=404)
+        respuesta = JsonResponse(datos)
+        if datos['estado'] in (TrabajoGeneracion.PENDIENTE, TrabajoGeneracion.EN_CURSO):
+            respuesta['Retry-After'] = str(cola.COLA_RETRY_AFTER)
+        return respuesta
+
+
+@method_decorator(condicional(validadores_listado), name='get')
+class ListarEstrategiasView(View):
+    def get(self, request):
+        # select_related evita una consulta por fila al mostrar empresa.nombre,
+        # y only() trae únicamente las columnas que pinta la plantilla
+        estrategias = Estrategia.objects.select_related('empresa').only(
+            'id', 'tipo_estrategia', 'fecha_generacion', 'empresa__nombre'
+        )
+        # ?q= filtra con el índice de texto completo y mantiene el orden por fecha, entre los
+        # mismos candidatos que la búsqueda por relevancia (y avisa si son menos que las coincidencias)
+        texto = request.GET.get('q', '').strip()
+        filtro = busqueda.filtro_ids(texto, limite=busqueda.BUSQUEDA_CANDIDATOS)
+        if filtro is not None:
+            estrategias = estrategias.filter(id__in=filtro)
+        try:
+            estrategias, siguiente_cursor = paginar_por_cursor(
+                estrategias, request.GET.get('cursor'), leer_limite(request.GET.get('limite'))
+            )
+        except CursorInvalido:
+            # Un cursor manipulado o caducado simplemente vuelve a la primera página
+            return redirect('estrategias:listar_estrategias')
+        with metricas.fase('render'):
+            return render(request, 'estrategias/listar_estrategias.html', {
+                'estrategias': estrategias,
+                'siguiente_cursor': siguiente_cursor,
+                'q': texto,
+                'resultados_limitados': filtro is not None and busqueda.supera_candidatos(texto),
+                'candidatos': busqueda.BUSQUEDA_CANDIDATOS,
+            })
+
+
+class ListarEstrategiasAPIView(View):
+    # Misma paginación por cursor que la lista HTML, pero en JSON para clientes de la API
+    def get(self, request):
+        filas = Estrategia.objects.values(
+            'id', 'tipo_estrategia', 'fecha_generacion', 'empresa__nombre'
+        )
+        try:
+            filas, siguiente_cursor = paginar_por_cursor(
+                filas, request.GET.get('cursor'), leer_limite(request.GET.get('limite')),
+                clave=lambda fila: (fila['fecha_generacion'], fila['id'])
             )
+        except CursorInvalido as e:
+            return JsonResponse({'success': False, 'errors': {'cursor': [str(e)]}}, status=400)
+
+        return JsonResponse({
+            'success': True,
+            'resultados': [
+                {
+                    'estrategia_id': fila['id'],
+                    'nombre_empresa': fila['empresa__nombre'],
+                    'tipo_estrategia': fila['tipo_estrategia'],
+                    'fecha_generacion': fila['fecha_generacion'].isoformat(),
+                }
+                for fila in filas
+            ],
+            'siguiente_cursor': siguiente_cursor,
+        })
+
 
-            # 3. Guardar la estrategia generada en nuestra base de datos
-            nueva_estrategia = Estrategia.objects.create(
-                empresa=empresa,
-                tipo_estrategia=estrategia_info['tipo_estrategia'],
-                descripcion_estrategia=estrategia_info['descripcion_estrategia'],
-                impacto_estimado=estrategia_info['impacto_estimado']
+class BuscarEstrategiasAPIView(View):
+    # Búsqueda de texto completo (ver busqueda.py), de más a menos relevante y paginada por cursor
+    def get(self, request):
+        texto = request.GET.get('q', '').strip()
+        if busqueda.preparar_consulta(texto) is None:
+            return JsonResponse(
+                {'success': False, 'errors': {'q': ['Indica al menos un término de búsqueda.']}}, status=400
+            )
+        try:
+            estrategias, siguiente_cursor = busqueda.buscar(
+                texto, request.GET.get('cursor'), leer_limite(request.GET.get('limite'))
             )
+        except CursorInvalido as e:
+            return JsonResponse({'success': False, 'errors': {'cursor': [str(e)]}}, status=400)
 
-            # 4. Devolver la estrategia al usuario como JSON
-            return JsonResponse({
-                'success': True,
-                'estrategia_id': nueva_estrategia.id,
-                'nombre_empresa': empresa.nombre,
-                'tipo_estrategia': nueva_estrategia.tipo_estrategia,
-                'descripcion_estrategia': nueva_estrategia.descripcion_estrategia,
-                'impacto_estimado': nueva_estrategia.impacto_estimado
-            })
-        else:
-            # Si los datos NO son válidos, devolvemos los errores del formulario
-            return JsonResponse({'success': False, 'errors': form.errors}, status=400)
+        return JsonResponse({
+            'success': True,
+            'resultados': [
+                {
+                    'estrategia_id': estrategia.id,
+                    'nombre_empresa': estrategia.nombre_empresa,
+                    'tipo_estrategia': estrategia.tipo_estrategia,
+                    'fecha_generacion': estrategia.fecha_generacion.isoformat(),
+                    'puntuacion': estrategia.puntuacion,
+                }
+                for estrategia in estrategias
+            ],
+            'siguiente_cursor': siguiente_cursor,
+            # Hay más coincidencias que BUSQUEDA_CANDIDATOS: solo se ordenaron las más recientes
+            'resultados_limitados': busqueda.supera_candidatos(texto),
+        })
 
 
-class ListarEstrategiasView(View):
+class ExportarEstrategiasView(View):
+    # exportar/csv/ o exportar/jsonl/, con ?gzip=1 y filtros ?desde=&hasta=&sector=&tipo=
+    # La respuesta se genera mientras se envía: memoria constante sea cual sea el tamaño de la tabla
+    def get(self, request, formato):
+        if formato not in exportacion.FORMATOS:
+            raise Http404(f"Formato de exportación desconocido: '{formato}'")
+        try:
+            filtros = exportacion.leer_filtros(request.GET)
+        except exportacion.FiltroInvalido as e:
+            return JsonResponse({'success': False, 'errors': {'filtros': [str(e)]}}, status=400)
+
+        comprimido = request.GET.get('gzip') in ('1', 'true')
+        respuesta = StreamingHttpResponse(
+            exportacion.exportar(formato, filtros, gzip=comprimido),
+            content_type='application/gzip' if comprimido else exportacion.FORMATOS[formato],
+        )
+        respuesta['Content-Disposition'] = (
+            f'attachment; filename="{exportacion.nombre_archivo(formato, comprimido)}"'
+        )
+        return respuesta
+
+
+class EstadisticasAPIView(View):
+    # Estrategias generadas por día, sector, tamaño y tipo (?desde=&hasta=&sector=&tamano=
+    # &tipo=&agrupar=dia,sector,...). Solo lee los contadores de EstadisticaDiaria (ver
+    # estadisticas.py): una consulta cuyo coste no depende del número de estrategias
     def get(self, request):
-        estrategias = Estrategia.objects.all().order_by('-fecha_generacion')
-        return render(request, 'estrategias/listar_estrategias.html', {'estrategias': estrategias})
+        try:
+            filtros = estadisticas.leer_parametros(request.GET)
+        except exportacion.FiltroInvalido as e:
+            return JsonResponse({'success': False, 'errors': {'filtros': [str(e)]}}, status=400)
+        total, filas = estadisticas.consultar(filtros)
+        return JsonResponse({
+            'success': True,
+            'desde': filtros['desde'].isoformat(),
+            'hasta': filtros['hasta'].isoformat(),
+            'agrupar': filtros['agrupar'],
+            'total': total,
+            'filas': filas,
+        })
+
+
+class SimilaresAPIView(View):
+    # Empresas parecidas a la de una estrategia (?estrategia=<id>), a una empresa (?empresa=<id>)
+    # o a una descripción (?descripcion=&sector=), con su última estrategia (?k=, por defecto 5).
+    # Busca en el índice en memoria (ver similares.py) y lee de la base de datos solo las k
+    # empresas encontradas. La página de detalle la pide desde el navegador, así que su HTML
+    # en caché no cambia cuando cambian las empresas parecidas
+    def get(self, request):
+        try:
+            consulta = similares.leer_parametros(request.GET)
+        except exportacion.FiltroInvalido as e:
+            return JsonResponse({'success': False, 'errors': {'parametros': [str(e)]}}, status=400)
+        try:
+            resultados = similares.similares(consulta)
+        except similares.IndiceNoDisponible as e:
+            return JsonResponse({'success': False, 'errors': {'indice': [str(e)]}}, status=503)
+        if resultados is None:
+            nombre = 'estrategia' if 'estrategia' in consulta else 'empresa'
+            return JsonResponse(
+                {'success': False, 'errors': {nombre: [f'La {nombre} no existe.']}}, status=404
+            )
+        return JsonResponse({'success': True, 'similares': resultados})
+
+
+def _renderizar_detalle(estrategia):
+    # Sin request: la página no lleva formularios ni datos de la sesión, así que el mismo
+    # HTML sirve a todos los visitantes
+    with metricas.fase('render'):
+        return render_to_string('estrategias/detalle_estrategia.html', {'estrategia': estrategia})
+
+
+def _serializar_detalle(estrategia):
+    if estrategia is None:
+        return json.dumps({'success': False, 'errors': {'estrategia_id': ['La estrategia no existe.']}})
+    empresa = estrategia.empresa
+    return json.dumps({
+        'success': True,
+        'estrategia': {
+            'estrategia_id': estrategia.id,
+            'tipo_estrategia': estrategia.tipo_estrategia,
+            'descripcion_estrategia': estrategia.descripcion_estrategia,
+            'impacto_estimado': estrategia.impacto_estimado,
+            'fecha_generacion': estrategia.fecha_generacion.isoformat(),
+            'empresa': {campo: getattr(empresa, campo) for campo in CAMPOS_CONTENIDO},
+        },
+    }, ensure_ascii=False)
 
 
 class DetalleEstrategiaView(View):
+    # HTML renderizado en caché por estrategia (ver cache_detalle.py); un acierto no consulta
+    # la base de datos y, con If-None-Match o If-Modified-Since, responde 304
+    variante = 'html'
+    content_type = 'text/html; charset=utf-8'
+
+    def construir(self, estrategia):
+        return _renderizar_detalle(estrategia)
+
     def get(self, request, estrategia_id):
-        try:
-            estrategia = Estrategia.objects.get(id=estrategia_id)
-        except Estrategia.DoesNotExist:
-            estrategia = None # O podrías devolver un error 404
-        return render(request, 'estrategias/detalle_estrategia.html', {'estrategia': estrategia})
\ No newline at end of file
+        entrada = cache_detalle.obtener(estrategia_id, self.variante, self.construir)
+        if not entrada['existe']:
+            return HttpResponse(entrada['contenido'], content_type=self.content_type, status=404)
+        return respuesta_condicional(
+            request, entrada['etag'], entrada['ultima_modificacion'],
+            lambda: HttpResponse(entrada['contenido'], content_type=self.content_type),
+        )
+
+
+class DetalleEstrategiaAPIView(DetalleEstrategiaView):
+    # Misma caché e invalidación, con los datos de la estrategia y su empresa serializados
+    variante = 'json'
+    content_type = 'application/json'
+
+    def construir(self, estrategia):
+        return _serializar_detalle(estrategia)
+
+
+class SitemapIndiceView(View):
+    # sitemap.xml: índice con el sitemap de las páginas fijas y las páginas precalculadas de
+    # estrategias. Una consulta sobre PaginaSitemap, nunca sobre la tabla de estrategias
+    def get(self, request):
+        paginas = list(
+            PaginaSitemap.objects.order_by('numero')
+            .values_list('numero', 'ultima_modificacion', 'fecha_actualizacion')
+        )
+        actualizada = max((fecha for _, _, fecha in paginas), default=None)
+        url_base = request.build_absolute_uri('/')
+        etag = calcular_etag(url_base, len(paginas), actualizada.isoformat() if actualizada else 'vacio')
+        return respuesta_condicional(request, etag, actualizada, lambda: HttpResponse(
+            sitemaps.indice([(numero, ultima) for numero, ultima, _ in paginas], url_base),
+            content_type='application/xml',
+        ))
+
+
+@method_decorator(condicional(sitemaps.validadores_pagina), name='get')
+class SitemapEstrategiasView(View):
+    # sitemap-estrategias-<n>.xml y .xml.gz: el archivo guardado por actualizar_sitemaps, ya
+    # comprimido. Se envía tal cual (.xml.gz, o .xml con Content-Encoding si el cliente acepta
+    # gzip) y solo se descomprime para los clientes que no lo aceptan
+    def get(self, request, numero, comprimido=False):
+        contenido = PaginaSitemap.objects.filter(numero=numero).values_list('contenido', flat=True).first()
+        if contenido is None:
+            raise Http404(f'La página {numero} del sitemap no existe.')
+        contenido = bytes(contenido) # memoryview en PostgreSQL
+        if comprimido:
+            return HttpResponse(contenido, content_type='application/gzip')
+        if sitemaps.acepta_gzip(request):
+            respuesta = HttpResponse(contenido, content_type='application/xml')
+            respuesta['Content-Encoding'] = 'gzip'
+            return respuesta
+        return HttpResponse(gzip.decompress(contenido), content_type='application/xml')
+
+
+class MetricasView(View):
+    # Histogramas de metricas.py y contadores de la caché de generación, en formato Prometheus
+    def get(self, request):
+        lineas = [metricas.registro.exportar()]
+        estadisticas = cache_generacion.estadisticas()
+        lineas.append('# TYPE estrategias_cache_generacion_total counter\n')
+        for resultado in ('aciertos', 'aciertos_nivel2', 'fallos', 'desalojos', 'caducados'):
+            lineas.append(f'estrategias_cache_generacion_total{{resultado="{resultado}"}} {estadisticas[resultado]}\n')
+        lineas.append('# TYPE estrategias_cache_generacion_entradas gauge\n')
+        lineas.append(f'estrategias_cache_generacion_entradas {estadisticas["entradas"]}\n')
+        return HttpResponse(''.join(lineas), content_type='text/plain; version=0.0.4; charset=utf-8')
\ No newline at end of file
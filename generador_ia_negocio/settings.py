@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'estrategias.metricas.MetricasMiddleware', # Primero, para medir la petición completa
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -74,13 +78,73 @@ WSGI_APPLICATION = 'generador_ia_negocio.wsgi.application'
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+#
+# El perfil se elige con la variable de entorno ESTRATEGIAS_DB_PERFIL:
+#   'sqlite'         (por defecto) SQLite con WAL, synchronous=NORMAL, busy_timeout y mmap
+#                    (ver estrategias/conexiones.py) y conexiones persistentes
+#   'sqlite-basico'  SQLite con las opciones por defecto, para comparar en los benchmarks
+#   'postgresql'     PostgreSQL con conexiones persistentes y health checks; con
+#                    ESTRATEGIAS_DB_POOL=1 usa el pool de conexiones de Django (requiere psycopg 3
+#                    con psycopg_pool; con psycopg2 usar un pooler externo como PgBouncer)
+
+ESTRATEGIAS_DB_PERFIL = os.environ.get('ESTRATEGIAS_DB_PERFIL', 'sqlite')
+ESTRATEGIAS_SQLITE_PRAGMAS = {}
+
+if ESTRATEGIAS_DB_PERFIL == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'CONN_MAX_AGE': 60,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {
+                # Las transacciones piden el lock de escritura al empezar: sin esto, dos
+                # transacciones que leen y luego escriben pueden fallar sin esperar a busy_timeout
+                'transaction_mode': 'IMMEDIATE',
+            },
+        }
+    }
+    ESTRATEGIAS_SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000, # Milisegundos
+        'mmap_size': 256 * 1024 * 1024, # Bytes
+    }
+elif ESTRATEGIAS_DB_PERFIL == 'sqlite-basico':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
     }
-}
+elif ESTRATEGIAS_DB_PERFIL == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'generador_ia_negocio'),
+            'USER': os.environ.get('POSTGRES_USER', 'postgres'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', ''),
+            'HOST': os.environ.get('POSTGRES_HOST', 'localhost'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # Reutiliza la conexión entre peticiones y comprueba que sigue viva antes de usarla
+            'CONN_MAX_AGE': int(os.environ.get('POSTGRES_CONN_MAX_AGE', 600)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    if os.environ.get('ESTRATEGIAS_DB_POOL') == '1':
+        from psycopg_pool import ConnectionPool
+
+        # El pool sustituye a las conexiones persistentes (Django exige CONN_MAX_AGE = 0)
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': 2,
+            'max_size': int(os.environ.get('ESTRATEGIAS_DB_POOL_MAXIMO', 10)),
+            'timeout': 10,
+            'check': ConnectionPool.check_connection, # Health check al sacar una conexión del pool
+        }
+else:
+    raise ImproperlyConfigured(f"ESTRATEGIAS_DB_PERFIL desconocido: '{ESTRATEGIAS_DB_PERFIL}'")
 
 
 # Password validation
@@ -123,3 +187,120 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+
+# Procesamiento de lenguaje natural (ver estrategias/nlp.py)
+# 'completo' carga el pipeline entero del modelo, 'recortado' solo su tokenizador
+# y 'tokenizador' usa spacy.blank('es') sin necesitar el modelo instalado.
+
+ESTRATEGIAS_NLP_MODELO = 'es_core_news_sm'
+ESTRATEGIAS_NLP_MODO = 'recortado'
+# True para cargar el modelo al arrancar el proceso en vez de en la primera petición
+ESTRATEGIAS_NLP_CARGA_ANTICIPADA = False
+# True para cargar, calentar y congelar (gc.freeze) el modelo antes de que el servidor haga
+# fork de sus workers, que así comparten una sola copia (gunicorn --preload, o
+# ESTRATEGIAS_POOL_METODO_INICIO = 'fork' para el pool de la vista asíncrona)
+ESTRATEGIAS_NLP_PREFORK = False
+
+# Tabla de reglas del generador; por defecto estrategias/reglas.json
+# ESTRATEGIAS_REGLAS_ARCHIVO = BASE_DIR / 'reglas_propias.json'
+
+# Caché de estrategias generadas (ver estrategias/cache_generacion.py): una LRU por proceso
+# y, si se indica un alias de CACHES, un segundo nivel compartido entre procesos
+ESTRATEGIAS_CACHE_TAMANO = 1024
+ESTRATEGIAS_CACHE_TTL = 60 * 60
+ESTRATEGIAS_CACHE_ALIAS = None
+
+# Pool de procesos para la vista asíncrona de generación (ver estrategias/trabajadores.py).
+# Con 0 procesos se usa un único hilo dentro del proceso del servidor.
+ESTRATEGIAS_POOL_PROCESOS = 2
+# Trabajos en curso admitidos antes de responder 503 con Retry-After
+ESTRATEGIAS_POOL_COLA = 8
+ESTRATEGIAS_POOL_RETRY_AFTER = 1
+
+# Fracción de peticiones que mide MetricasMiddleware (Server-Timing e histogramas de /metrics).
+# Con mucho tráfico basta con muestrear, p. ej. 0.05
+ESTRATEGIAS_METRICAS_MUESTREO = 1.0
+
+# Búsqueda de texto completo (ver estrategias/busqueda.py): cuántas coincidencias, de las más
+# recientes, se ordenan por relevancia o se muestran en el ?q= del listado y en el admin.
+# Acota el coste de los términos muy frecuentes; si hay más, las tres lo indican
+ESTRATEGIAS_BUSQUEDA_CANDIDATOS = 2000
+
+# Exportación CSV/JSONL (ver estrategias/exportacion.py): filas que se piden a la base de datos
+# en cada tanda. La memoria usada depende de este valor, no del tamaño de la tabla
+ESTRATEGIAS_EXPORTACION_CHUNK = 2000
+
+# Importación con import_empresas (ver estrategias/importacion.py): registros validados,
+# generados y guardados en cada transacción
+ESTRATEGIAS_IMPORTACION_LOTE = 2000
+
+# Cache-Control de las páginas con GET condicional (listado, detalle, sitemap.xml; ver
+# estrategias/condicional.py). Por defecto el navegador revalida siempre y un proxy inverso
+# puede servir su copia 60 s. Sin proxy compartido: {'private': True, 'no_cache': True}
+ESTRATEGIAS_CACHE_CONTROL = {'public': True, 'max_age': 0, 's_maxage': 60, 'stale_while_revalidate': 30}
+
+# Caché de la página de detalle y de su variante JSON (ver estrategias/cache_detalle.py).
+# Con varios procesos conviene un alias de CACHES compartido (Redis, Memcached) para que
+# las invalidaciones lleguen a todos; con la LocMemCache por defecto las ve cada proceso
+ESTRATEGIAS_DETALLE_CACHE_ALIAS = 'default'
+ESTRATEGIAS_DETALLE_CACHE_TTL = 10 * 60
+ESTRATEGIAS_DETALLE_CACHE_TTL_404 = 60
+
+# Sitemap de estrategias precalculado (ver estrategias/sitemaps.py). Las páginas se generan
+# con "python manage.py actualizar_sitemaps" (incremental; conviene ejecutarlo desde cron) y
+# necesitan el esquema y dominio públicos para sus URLs. Con GZIP el índice enlaza los
+# archivos .xml.gz en lugar de .xml
+ESTRATEGIAS_SITEMAP_URL_BASE = ''
+ESTRATEGIAS_SITEMAP_TAMANO = 50_000
+ESTRATEGIAS_SITEMAP_GZIP = False
+
+# Endpoint de estadísticas (ver estrategias/estadisticas.py): rango máximo de días por
+# consulta. Los contadores se mantienen solos; "python manage.py reconstruir_estadisticas"
+# los recalcula desde las estrategias
+ESTRATEGIAS_ESTADISTICAS_DIAS_MAXIMO = 366
+
+# Clasificador entrenado para tipo_estrategia (ver estrategias/clasificador.py): con la ruta
+# de un modelo creado con "python manage.py entrenar_clasificador --salida <ruta>", el tipo de
+# los sectores sin reglas propias lo predice el modelo en lugar de elegirse al azar. Sin
+# modelo (None) o si no se puede cargar, se usan solo las reglas
+ESTRATEGIAS_CLASIFICADOR_ARCHIVO = None
+
+# Empresas parecidas (ver estrategias/similares.py). El índice base se construye con
+# "python manage.py actualizar_similares" (conviene ejecutarlo desde cron) y se guarda en
+# SIMILARES_DIR (None: <BASE_DIR>/indice_similares); cada proceso añade en memoria las
+# empresas creadas o modificadas después, leyéndolas cada SIMILARES_REFRESCO segundos.
+# ENTRADAS acota las coincidencias leídas por término de la búsqueda. Cada lectura vuelve a
+# comprobar los SIMILARES_VENTANA ids anteriores al último leído (transacciones que
+# confirman tarde); un proceso guarda en memoria como mucho SIMILARES_CAMBIOS_MAXIMO empresas
+# (sin base y con más empresas que eso, el endpoint responde 503)
+ESTRATEGIAS_SIMILARES_DIR = None
+ESTRATEGIAS_SIMILARES_REFRESCO = 5
+ESTRATEGIAS_SIMILARES_ENTRADAS = 2000
+ESTRATEGIAS_SIMILARES_VENTANA = 1000
+ESTRATEGIAS_SIMILARES_CAMBIOS_MAXIMO = 50_000
+
+# Cola de generación (ver estrategias/cola.py). Los clientes que envían
+# "Prefer: respond-async" reciben 202 con la URL de estado del trabajo; con COLA_GENERACION
+# todas las generaciones se encolan. Los trabajos los procesa
+# "python manage.py run_generation_workers --concurrency N", en lotes de COLA_LOTE; un
+# trabajo en curso durante más de COLA_TIEMPO_MAXIMO segundos vuelve a la cola, hasta
+# COLA_INTENTOS veces
+ESTRATEGIAS_COLA_GENERACION = False
+ESTRATEGIAS_COLA_LOTE = 50
+ESTRATEGIAS_COLA_ESPERA = 0.5
+ESTRATEGIAS_COLA_TIEMPO_MAXIMO = 5 * 60
+ESTRATEGIAS_COLA_INTENTOS = 3
+ESTRATEGIAS_COLA_RETRY_AFTER = 1
+
+# Camino JSON de la vista de generación (ver estrategias/validacion.py): las peticiones con
+# Content-Type: application/json se validan sin instanciar EmpresaForm (mismos errores) y
+# su cuerpo no puede superar GENERACION_JSON_MAXIMO bytes (413); el del endpoint por
+# lotes, LOTE_JSON_MAXIMO bytes
+ESTRATEGIAS_GENERACION_JSON_MAXIMO = 64 * 1024
+ESTRATEGIAS_LOTE_JSON_MAXIMO = 4 * 1024 * 1024
+
+# Listados del admin (ver estrategias/admin.py): en vez de un COUNT(*) exacto, las tablas
+# con más de ADMIN_CONTEO_MAXIMO filas muestran un total estimado y, con filtros o
+# búsqueda, se cuentan como mucho ADMIN_CONTEO_MAXIMO resultados
+ESTRATEGIAS_ADMIN_CONTEO_MAXIMO = 10_000
@@ -1,14 +1,15 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.contrib.sitemaps.views import sitemap
-from estrategias.sitemaps import StaticViewSitemap
+from estrategias.sitemaps import StaticViewSitemap, validadores_estaticas
+from estrategias.condicional import condicional
+from estrategias.views import MetricasView, SitemapEstrategiasView, SitemapIndiceView
 # Importa RedirectView para la redirección
 from django.views.generic.base import RedirectView
 from django.urls import reverse_lazy # Para obtener la URL de forma segura
 
 sitemaps = {
     'static': StaticViewSitemap,
-    # 'estrategias_dinamicas': EstrategiaSitemap, # Si decidieras hacer tus estrategias públicas
 }
 
 urlpatterns = [
@@ -18,5 +19,12 @@ urlpatterns = [
 
     path('admin/', admin.site.urls),
     path('estrategias/', include('estrategias.urls')), # ¡Aquí conectamos las URLs de nuestra app!
-    path('sitemap.xml', sitemap, {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    # Índice de sitemaps: las páginas fijas y las páginas precalculadas de estrategias
+    # (ver estrategias/sitemaps.py y el comando actualizar_sitemaps)
+    path('sitemap.xml', SitemapIndiceView.as_view(), name='sitemap_indice'),
+    # 304 sin generar el XML si el lastmod del listado no cambió desde la última visita
+    path('sitemap-static.xml', condicional(validadores_estaticas)(sitemap), {'sitemaps': sitemaps}, name='django.contrib.sitemaps.views.sitemap'),
+    path('sitemap-estrategias-<int:numero>.xml', SitemapEstrategiasView.as_view(), name='sitemap_estrategias'),
+    path('sitemap-estrategias-<int:numero>.xml.gz', SitemapEstrategiasView.as_view(), {'comprimido': True}, name='sitemap_estrategias_gz'),
+    path('metrics', MetricasView.as_view(), name='metricas'), # Para Prometheus
 ]